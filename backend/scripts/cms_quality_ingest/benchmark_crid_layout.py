@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Benchmark metrics.crid_monthly Table Layouts
+
+Copies the live metrics.crid_monthly into one scratch table per layout
+(standard: NUMERIC columns + every index in CRID_INDEXES; lean: float
+columns + deduplicated indexes), then measures for each:
+
+    - load time and index build time (serial, or parallel with --workers)
+    - table and index size on disk
+    - latency of the common app lookups: facility history, state-month ranking,
+      national month ranking and flag filters
+
+The scratch tables (metrics.crid_bench_<layout>) are dropped afterwards
+unless --keep is given. The live table is only read.
+
+Usage:
+    python benchmark_crid_layout.py
+    python benchmark_crid_layout.py --workers 4 --iterations 200
+    python benchmark_crid_layout.py --layout lean --keep
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+from materialize_crid import (
+    DEFAULT_DB_URL,
+    LAYOUTS,
+    create_indexes,
+    get_connection,
+    table_rolling_windows,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Lookups the app runs against metrics.crid_monthly
+QUERIES = {
+    'facility_history': """
+        SELECT extract_id, crid_value, crid_volatility, flags
+        FROM {table}
+        WHERE ccn = %(ccn)s
+        ORDER BY extract_id
+    """,
+    'state_month_ranking': """
+        SELECT ccn, crid_value, flags
+        FROM {table}
+        WHERE state = %(state)s AND extract_id = %(extract_id)s
+        ORDER BY crid_value DESC NULLS LAST
+        LIMIT 50
+    """,
+    'national_month_ranking': """
+        SELECT ccn, state, crid_value
+        FROM {table}
+        WHERE extract_id = %(extract_id)s
+        ORDER BY crid_value DESC NULLS LAST
+        LIMIT 100
+    """,
+    'high_crid_all_months': """
+        SELECT ccn, extract_id, crid_value
+        FROM {table}
+        WHERE crid_value > 2
+        ORDER BY crid_value DESC
+        LIMIT 100
+    """,
+    'flag_filter': """
+        SELECT ccn, extract_id, crid_value
+        FROM {table}
+        WHERE flags @> ARRAY[%(flag)s]::text[]
+          AND extract_id = %(extract_id)s
+    """,
+}
+
+FLAGS = ['HIGH_POSITIVE_CRID', 'HIGH_NEGATIVE_CRID', 'HIGH_VOLATILITY', 'MDS_OUTLIER']
+
+
+def sample_parameters(conn, iterations: int) -> List[Dict]:
+    """Random lookup parameters drawn from the live table."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT ccn FROM metrics.crid_monthly")
+        ccns = [row[0] for row in cur.fetchall()]
+        cur.execute("SELECT DISTINCT state, extract_id FROM metrics.crid_monthly")
+        state_months = cur.fetchall()
+    if not ccns or not state_months:
+        return []
+
+    rng = random.Random(42)
+    params = []
+    for _ in range(iterations):
+        state, extract_id = rng.choice(state_months)
+        params.append({
+            'ccn': rng.choice(ccns),
+            'state': state,
+            'extract_id': extract_id,
+            'flag': rng.choice(FLAGS),
+        })
+    return params
+
+
+def build_table(conn, layout: str, db_url: str, workers: int) -> Dict:
+    """Create and fill metrics.crid_bench_<layout> from the live table. Returns timings."""
+    table = f"metrics.crid_bench_{layout}"
+    suffix = f"_bench_{layout}"
+    table_ddl, indexes = LAYOUTS[layout]
+    rolling_windows = table_rolling_windows(conn)
+
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(table_ddl(table, suffix, rolling_windows))
+        cur.execute("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = 'metrics' AND table_name = 'crid_monthly'
+              AND column_name NOT IN ('id', 'created_at')
+            ORDER BY ordinal_position
+        """)
+        columns = ', '.join(row[0] for row in cur.fetchall())
+    conn.commit()
+
+    start = time.time()
+    with conn.cursor() as cur:
+        cur.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM metrics.crid_monthly")
+    conn.commit()
+    load_seconds = time.time() - start
+
+    start = time.time()
+    create_indexes(conn, table=table, suffix=suffix, indexes=indexes, db_url=db_url, workers=workers)
+    index_seconds = time.time() - start
+
+    # VACUUM sets the visibility map so index-only scans are measured fairly
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"VACUUM ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+    return {'table': table, 'load_seconds': load_seconds, 'index_seconds': index_seconds,
+            'index_count': len(indexes) + 2}  # + primary key and unique constraint
+
+
+def measure_sizes(conn, table: str) -> Dict:
+    """Heap (incl. TOAST) and total index size in bytes."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_table_size(%s), pg_indexes_size(%s)", (table, table))
+        table_bytes, index_bytes = cur.fetchone()
+    return {'table_bytes': table_bytes, 'index_bytes': index_bytes}
+
+
+def measure_latency(conn, table: str, params: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """Median and p95 latency (ms) per query, after one warm-up pass."""
+    results = {}
+    with conn.cursor() as cur:
+        for name, query in QUERIES.items():
+            sql = query.format(table=table)
+            for p in params[:5]:
+                cur.execute(sql, p)
+                cur.fetchall()
+
+            timings = []
+            for p in params:
+                start = time.perf_counter()
+                cur.execute(sql, p)
+                cur.fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                'median_ms': statistics.median(timings),
+                'p95_ms': timings[min(int(len(timings) * 0.95), len(timings) - 1)],
+            }
+    conn.rollback()
+    return results
+
+
+def print_report(reports: Dict[str, Dict]):
+    """Side-by-side comparison of the benchmarked layouts."""
+    layouts = list(reports)
+    width = 16
+
+    def row(label: str, values: List[str]):
+        print(f"    {label:<34}" + ''.join(f"{v:>{width}}" for v in values))
+
+    def mb(n: int) -> str:
+        return f"{n / 1024 / 1024:.1f} MB"
+
+    print("\n" + "=" * 70)
+    print("CRID TABLE LAYOUT BENCHMARK")
+    print("=" * 70 + "\n")
+    row('', layouts)
+    row('Indexes (incl. pkey/unique)', [str(reports[l]['index_count']) for l in layouts])
+    row('Load time', [f"{reports[l]['load_seconds']:.2f} s" for l in layouts])
+    row('Index build time', [f"{reports[l]['index_seconds']:.2f} s" for l in layouts])
+    row('Table size', [mb(reports[l]['table_bytes']) for l in layouts])
+    row('Index size', [mb(reports[l]['index_bytes']) for l in layouts])
+    print()
+    for name in QUERIES:
+        row(f"{name} median / p95", [
+            f"{reports[l]['latency'][name]['median_ms']:.2f}/{reports[l]['latency'][name]['p95_ms']:.2f} ms"
+            for l in layouts
+        ])
+    print("\n" + "=" * 70 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark metrics.crid_monthly layouts: build time, size and lookup latency'
+    )
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    parser.add_argument(
+        '--layout',
+        action='append',
+        choices=sorted(LAYOUTS),
+        help='Layout to benchmark (repeatable; default: all)'
+    )
+    parser.add_argument('--workers', type=int, default=1, help='Parallel index builds (default: 1)')
+    parser.add_argument('--iterations', type=int, default=100, help='Executions per lookup (default: 100)')
+    parser.add_argument('--keep', action='store_true', help='Keep the metrics.crid_bench_* tables')
+
+    args = parser.parse_args()
+    layouts = args.layout or list(LAYOUTS)
+
+    logger.info("Connecting to marketplace database...")
+    conn = get_connection(args.db_url)
+
+    try:
+        params = sample_parameters(conn, args.iterations)
+        if not params:
+            logger.error("metrics.crid_monthly is empty; run materialize_crid.py first")
+            return 1
+
+        reports = {}
+        for layout in layouts:
+            logger.info(f"Building {layout} layout...")
+            report = build_table(conn, layout, args.db_url, args.workers)
+            report.update(measure_sizes(conn, report['table']))
+            logger.info(f"Timing lookups on {report['table']} ({args.iterations} iterations each)...")
+            report['latency'] = measure_latency(conn, report['table'], params)
+            reports[layout] = report
+
+        print_report(reports)
+
+        if not args.keep:
+            with conn.cursor() as cur:
+                for report in reports.values():
+                    cur.execute(f"DROP TABLE IF EXISTS {report['table']}")
+            conn.commit()
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
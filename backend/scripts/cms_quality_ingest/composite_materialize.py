@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Composite Metric Materialization (definition-driven)
+
+Computes any number of composite indices defined in gold.nh_composite_definitions
+and writes them to metrics.composite_monthly. The pivot, completeness and
+composite SQL is generated from the definition rows, so adding a metric is an
+INSERT into the definitions table rather than a new hand-written CTE.
+
+Every composite is computed from one shared scan of gold.nh_quality_mds and one
+of gold.nh_quality_claims (restricted to the union of all referenced measure
+codes), so new metrics do not each cost another full-history pass.
+
+Definition rows (one per composite × measure):
+    composite_name   e.g. 'crid'
+    component        e.g. 'mds_composite', 'claims_utilization'
+    component_sign   +1 / -1: how the component's state z-score enters the composite
+    measure_code     FK to gold.nh_measure_definitions (measure_type picks the source table)
+    weight           weight of the measure inside its component
+
+For each composite:
+    component = Σ weight × score      (complete facilities only)
+    composite = Σ sign × z(component) (z within (state, extract_id), >= 10 complete facilities)
+
+The 'crid' composite is seeded from gold.nh_measure_definitions (used_in_crid,
+crid_weight, crid_component), so composite_value matches metrics.crid_monthly.crid_value.
+
+Usage:
+    python composite_materialize.py                    # All defined composites
+    python composite_materialize.py --composite crid   # Only selected composites
+    python composite_materialize.py --dry-run          # Print the generated SQL
+"""
+
+import argparse
+import logging
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from materialize_crid import DEFAULT_DB_URL, create_schema, get_connection
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Minimum complete facilities in a (state, extract_id) for z-scores
+MIN_STATE_FACILITIES = 10
+
+# measure_type -> (gold table, score column)
+SOURCES = {
+    'mds': ('gold.nh_quality_mds', 'four_quarter_avg'),
+    'claims': ('gold.nh_quality_claims', 'adjusted_score'),
+}
+
+NAME_PATTERN = re.compile(r'^[a-z][a-z0-9_]*$')
+CODE_PATTERN = re.compile(r'^[A-Za-z0-9]+$')
+
+# Composite metric definitions, seeded with CRID as a generic composite:
+# z(mds_composite) - z(claims_utilization)
+DEFINITIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS gold.nh_composite_definitions (
+        composite_name VARCHAR(40) NOT NULL,      -- e.g. 'crid'
+        component VARCHAR(40) NOT NULL,           -- e.g. 'mds_composite'
+        component_sign SMALLINT NOT NULL DEFAULT 1 CHECK (component_sign IN (-1, 1)),
+        measure_code VARCHAR(10) NOT NULL REFERENCES gold.nh_measure_definitions(measure_code),
+        weight NUMERIC(6,3) NOT NULL,             -- Weight within the component
+        created_at TIMESTAMP DEFAULT NOW(),
+        PRIMARY KEY (composite_name, measure_code)
+    );
+    COMMENT ON TABLE gold.nh_composite_definitions IS
+        'Composite metric definitions: weighted measures per component, combined as signed state z-scores';
+
+    INSERT INTO gold.nh_composite_definitions (composite_name, component, component_sign, measure_code, weight)
+    SELECT
+        'crid',
+        crid_component,
+        CASE WHEN crid_component = 'claims_utilization' THEN -1 ELSE 1 END,
+        measure_code,
+        crid_weight
+    FROM gold.nh_measure_definitions
+    WHERE used_in_crid = TRUE
+    ON CONFLICT (composite_name, measure_code) DO NOTHING;
+"""
+
+OUTPUT_DDL = """
+    CREATE TABLE IF NOT EXISTS metrics.composite_monthly (
+        composite_name VARCHAR(40) NOT NULL,
+        ccn VARCHAR(6) NOT NULL,
+        extract_id VARCHAR(6) NOT NULL,
+        as_of_date DATE,
+        state VARCHAR(2),
+
+        composite_value NUMERIC(10,6),            -- Σ sign × z(component); NULL if incomplete/small state
+        component_values JSONB,                   -- {"component": weighted sum}
+        component_z_scores JSONB,                 -- {"component": state z-score}
+
+        measures_present SMALLINT,                -- Non-null, non-suppressed measures
+        measures_expected SMALLINT,               -- Measures in the definition
+        is_complete BOOLEAN,
+        state_facility_count INTEGER,             -- Complete facilities in (state, extract_id)
+
+        calculated_at TIMESTAMP DEFAULT NOW(),
+
+        PRIMARY KEY (composite_name, extract_id, ccn)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_composite_ccn ON metrics.composite_monthly(composite_name, ccn);
+"""
+
+
+# ============================================================================
+# DEFINITIONS
+# ============================================================================
+
+def create_definitions_table(conn):
+    """Create gold.nh_composite_definitions (seeded with 'crid') if missing."""
+    with conn.cursor() as cur:
+        cur.execute(DEFINITIONS_DDL)
+    conn.commit()
+
+
+def create_tables(conn):
+    """Create the definitions table (seeded with 'crid') and the output table if missing."""
+    create_schema(conn)
+    create_definitions_table(conn)
+    with conn.cursor() as cur:
+        cur.execute(OUTPUT_DDL)
+    conn.commit()
+
+
+def load_definitions(conn, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Load composite definitions.
+
+    Returns:
+        {composite_name: {'components': {component: {'sign': int,
+                                                       'measures': [(measure_code, measure_type, weight)]}}}}
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT d.composite_name, d.component, d.component_sign,
+                   d.measure_code, m.measure_type, d.weight
+            FROM gold.nh_composite_definitions d
+            JOIN gold.nh_measure_definitions m ON m.measure_code = d.measure_code
+            WHERE %(names)s::text[] IS NULL OR d.composite_name = ANY(%(names)s::text[])
+            ORDER BY d.composite_name, d.component, d.measure_code
+        """, {'names': names})
+        rows = cur.fetchall()
+
+    definitions = {}
+    for name, component, sign, code, measure_type, weight in rows:
+        if not NAME_PATTERN.match(name) or not NAME_PATTERN.match(component):
+            raise ValueError(f"Invalid composite/component name: {name}.{component}")
+        if not CODE_PATTERN.match(code):
+            raise ValueError(f"Invalid measure code in {name}: {code}")
+        if measure_type not in SOURCES:
+            raise ValueError(f"Measure {code} has unsupported measure_type {measure_type!r}")
+        comp = definitions.setdefault(name, {'components': {}})['components'].setdefault(
+            component, {'sign': sign, 'measures': []}
+        )
+        if comp['sign'] != sign:
+            raise ValueError(f"Composite {name}: component {component} has mixed component_sign values")
+        comp['measures'].append((code, measure_type, weight))
+
+    missing = sorted(set(names or []) - set(definitions))
+    if missing:
+        raise ValueError(f"No definitions found for composite(s): {', '.join(missing)}")
+    return definitions
+
+
+# ============================================================================
+# SQL GENERATION
+# ============================================================================
+
+def _pivot_cte(measure_type: str, codes: List[str]) -> str:
+    """One grouped scan of a gold table producing v_/s_/r_ columns per measure code."""
+    table, score_col = SOURCES[measure_type]
+    code_list = ', '.join(f"'{code}'" for code in codes)
+    columns = []
+    for code in codes:
+        columns.append(f"MAX(CASE WHEN measure_code = '{code}' THEN {score_col} END) AS v_{code}")
+        columns.append(f"COALESCE(BOOL_OR(measure_code = '{code}' AND has_suppression), FALSE) AS s_{code}")
+        columns.append(f"BOOL_OR(measure_code = '{code}') AS r_{code}")
+    column_sql = ',\n            '.join(columns)
+    return f"""{measure_type}_pivot AS (
+        SELECT
+            ccn,
+            extract_id,
+            MIN(as_of_date) AS as_of_date,
+            MIN(state) AS state,
+            {column_sql}
+        FROM {table}
+        WHERE measure_code IN ({code_list})
+        GROUP BY ccn, extract_id
+    )"""
+
+
+def _composite_ctes(index: int, name: str, definition: Dict) -> Tuple[str, str]:
+    """Generate the component/z-score CTEs and the final SELECT for one composite."""
+    components = definition['components']
+    measures = [m for comp in components.values() for m in comp['measures']]
+
+    present = ' AND '.join(f"(v_{code} IS NOT NULL AND NOT COALESCE(s_{code}, FALSE))" for code, _, _ in measures)
+    present_count = ' +\n                '.join(
+        f"(v_{code} IS NOT NULL AND NOT COALESCE(s_{code}, FALSE))::int" for code, _, _ in measures
+    )
+    reported = ' OR '.join(f"COALESCE(r_{code}, FALSE)" for code, _, _ in measures)
+
+    component_cols = []
+    z_cols = []
+    for j, (component, comp) in enumerate(components.items()):
+        weighted = ' + '.join(f"{weight} * v_{code}" for code, _, weight in comp['measures'])
+        component_cols.append(f"CASE WHEN ({present}) THEN {weighted} END AS c_{j}")
+        z_cols.append(
+            f"CASE WHEN COUNT(*) FILTER (WHERE is_complete) OVER w >= {MIN_STATE_FACILITIES}\n"
+            f"                 THEN (c_{j} - AVG(c_{j}) OVER w) / NULLIF(STDDEV_POP(c_{j}) OVER w, 0)\n"
+            f"            END AS z_{j}"
+        )
+    component_sql = ',\n            '.join(component_cols)
+    z_sql = ',\n            '.join(z_cols)
+
+    composite_value = ' + '.join(
+        f"{'-' if comp['sign'] < 0 else ''}z_{j}" for j, comp in enumerate(components.values())
+    )
+    values_json = ', '.join(f"'{component}', ROUND(c_{j}, 6)" for j, component in enumerate(components))
+    z_json = ', '.join(f"'{component}', ROUND(z_{j}::numeric, 6)" for j, component in enumerate(components))
+
+    ctes = f"""comp_{index} AS (
+        SELECT
+            ccn, extract_id, as_of_date, state,
+            ({present_count}) AS measures_present,
+            ({present}) AS is_complete,
+            {component_sql}
+        FROM facilities
+        WHERE {reported}
+    ),
+
+    z_{index} AS (
+        SELECT
+            *,
+            COUNT(*) FILTER (WHERE is_complete) OVER w AS state_facility_count,
+            {z_sql}
+        FROM comp_{index}
+        WINDOW w AS (PARTITION BY state, extract_id)
+    )"""
+
+    select = f"""SELECT
+        '{name}', ccn, extract_id, as_of_date, state,
+        ROUND(({composite_value})::numeric, 6),
+        jsonb_strip_nulls(jsonb_build_object({values_json})),
+        jsonb_strip_nulls(jsonb_build_object({z_json})),
+        measures_present, {len(measures)}, is_complete, state_facility_count
+    FROM z_{index}"""
+
+    return ctes, select
+
+
+def build_composite_sql(definitions: Dict[str, Dict]) -> str:
+    """Generate one INSERT ... SELECT computing every composite from a shared scan."""
+    codes_by_type: Dict[str, List[str]] = {}
+    for definition in definitions.values():
+        for comp in definition['components'].values():
+            for code, measure_type, _ in comp['measures']:
+                codes = codes_by_type.setdefault(measure_type, [])
+                if code not in codes:
+                    codes.append(code)
+
+    pivots = [_pivot_cte(measure_type, sorted(codes)) for measure_type, codes in sorted(codes_by_type.items())]
+
+    # Full join the per-source pivots into one facility-month row
+    types = sorted(codes_by_type)
+    aliases = {measure_type: measure_type[0] for measure_type in types}
+    key_cols = ['ccn', 'extract_id', 'as_of_date', 'state']
+    select_keys = ',\n            '.join(
+        f"COALESCE({', '.join(f'{aliases[t]}.{col}' for t in types)}) AS {col}" if len(types) > 1
+        else f"{aliases[types[0]]}.{col}"
+        for col in key_cols
+    )
+    measure_cols = ',\n            '.join(
+        f"{aliases[measure_type]}.{prefix}_{code}"
+        for measure_type in types
+        for code in sorted(codes_by_type[measure_type])
+        for prefix in ('v', 's', 'r')
+    )
+    from_sql = f"{types[0]}_pivot {aliases[types[0]]}"
+    for measure_type in types[1:]:
+        alias = aliases[measure_type]
+        first = aliases[types[0]]
+        from_sql += (
+            f"\n        FULL OUTER JOIN {measure_type}_pivot {alias}"
+            f" ON {alias}.ccn = {first}.ccn AND {alias}.extract_id = {first}.extract_id"
+        )
+    facilities = f"""facilities AS (
+        SELECT
+            {select_keys},
+            {measure_cols}
+        FROM {from_sql}
+    )"""
+
+    ctes = pivots + [facilities]
+    selects = []
+    for index, (name, definition) in enumerate(sorted(definitions.items())):
+        composite_ctes, select = _composite_ctes(index, name, definition)
+        ctes.append(composite_ctes)
+        selects.append(select)
+
+    with_sql = ',\n\n    '.join(ctes)
+    union_sql = '\n\n    UNION ALL\n\n    '.join(selects)
+    return f"""
+    WITH {with_sql}
+
+    INSERT INTO metrics.composite_monthly (
+        composite_name, ccn, extract_id, as_of_date, state,
+        composite_value, component_values, component_z_scores,
+        measures_present, measures_expected, is_complete, state_facility_count
+    )
+    {union_sql}
+    """
+
+
+# ============================================================================
+# MATERIALIZATION
+# ============================================================================
+
+def materialize_composites(conn, definitions: Dict[str, Dict]) -> int:
+    """Replace metrics.composite_monthly rows for the given composites in one transaction."""
+    names = sorted(definitions)
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM metrics.composite_monthly WHERE composite_name = ANY(%s)", (names,))
+        cur.execute(build_composite_sql(definitions))
+        rows = cur.rowcount
+    conn.commit()
+    return rows
+
+
+def log_summary(conn, names: List[str]):
+    """Per-composite row counts and value distribution."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT composite_name,
+                   COUNT(*),
+                   COUNT(composite_value),
+                   COUNT(DISTINCT extract_id),
+                   ROUND(AVG(composite_value), 4),
+                   ROUND(STDDEV(composite_value), 4)
+            FROM metrics.composite_monthly
+            WHERE composite_name = ANY(%s)
+            GROUP BY composite_name
+            ORDER BY composite_name
+        """, (names,))
+        for name, rows, valued, extracts, mean, stddev in cur.fetchall():
+            logger.info(
+                f"  {name}: {rows:,} rows, {valued:,} with values, {extracts} extracts, "
+                f"mean={mean}, stddev={stddev}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Materialize definition-driven composite metrics into metrics.composite_monthly'
+    )
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    parser.add_argument(
+        '--composite',
+        action='append',
+        help='Only materialize this composite (repeatable; default: all defined)'
+    )
+    parser.add_argument('--dry-run', action='store_true', help='Print the generated SQL without executing')
+
+    args = parser.parse_args()
+
+    logger.info("Connecting to marketplace database...")
+    conn = get_connection(args.db_url)
+
+    try:
+        create_tables(conn)
+        definitions = load_definitions(conn, args.composite)
+        if not definitions:
+            logger.error("No composites defined in gold.nh_composite_definitions")
+            return 1
+
+        if args.dry_run:
+            print(build_composite_sql(definitions))
+            return 0
+
+        names = sorted(definitions)
+        logger.info(f"Materializing {len(names)} composite(s) from one scan: {', '.join(names)}")
+        start_time = time.time()
+        rows = materialize_composites(conn, definitions)
+        logger.info(f"Inserted {rows:,} rows in {time.time() - start_time:.1f} seconds")
+        log_summary(conn, names)
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""
+NH-IR-007: In-process NumPy CRID Engine
+
+Alternative to the SQL CTE in materialize_crid.py. Pulls the six CRID measures
+once (from the gold tables, or from the local Parquet mirror written by
+export_parquet.py), computes composites, per-(state, extract_id) z-scores,
+rolling volatility / mean / trend and flags with vectorized array operations, and bulk-loads
+the result with COPY.
+
+The output matches materialize_crid.materialize_crid() row for row; use
+`python materialize_crid.py --check-equivalence` to verify that against the
+SQL output before switching engines.
+
+Usage (via materialize_crid.py):
+    python materialize_crid.py --engine numpy
+    python materialize_crid.py --engine numpy --parquet-dir /path/to/nh_quality_parquet
+    python materialize_crid.py --check-equivalence
+"""
+
+import csv
+import logging
+from io import BytesIO, StringIO
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from materialize_crid import (
+    DECILES,
+    DEFAULT_ROLLING_WINDOWS,
+    PERCENTILE_RANKS,
+    rank_columns,
+    rolling_columns,
+    validate_window,
+)
+
+logger = logging.getLogger(__name__)
+
+MDS_CODES = ['410', '453', '407', '409']
+CLAIMS_CODES = ['551', '552']
+CRID_CODES = MDS_CODES + CLAIMS_CODES
+
+# States with fewer complete facilities than this get no z-scores (SMALL_STATE)
+MIN_STATE_FACILITIES = 10
+
+# Column order of metrics.crid_monthly (excluding id / created_at and the
+# rolling columns, which follow crid_volatility; see output_columns())
+OUTPUT_COLUMNS = [
+    'ccn', 'extract_id', 'as_of_date', 'state',
+    'mds_composite', 'claims_utilization',
+    'mds_z_score', 'claims_z_score', 'crid_value', 'crid_volatility',
+    'completeness_pct', 'measures_present', 'measures_suppressed',
+    'flags',
+    'measure_410_score', 'measure_453_score', 'measure_407_score', 'measure_409_score',
+    'measure_551_score', 'measure_552_score',
+    'state_facility_count', 'state_mds_mean', 'state_mds_stddev',
+    'state_claims_mean', 'state_claims_stddev',
+]
+
+NUMERIC_COLUMNS = [
+    'mds_composite', 'claims_utilization',
+    'mds_z_score', 'claims_z_score', 'crid_value', 'crid_volatility',
+    'completeness_pct',
+    'measure_410_score', 'measure_453_score', 'measure_407_score', 'measure_409_score',
+    'measure_551_score', 'measure_552_score',
+    'state_mds_mean', 'state_mds_stddev', 'state_claims_mean', 'state_claims_stddev',
+]
+
+INTEGER_COLUMNS = ['measures_present', 'measures_suppressed', 'state_facility_count'] + [col for col, _ in DECILES]
+
+# Percentiles are stored with 4 decimals (NUMERIC(7,4))
+PERCENTILE_COLUMNS = [col for col, _, _ in PERCENTILE_RANKS]
+
+
+def output_columns(rolling_windows=DEFAULT_ROLLING_WINDOWS) -> List[str]:
+    """OUTPUT_COLUMNS with the rolling statistic and rank columns inserted after crid_volatility."""
+    i = OUTPUT_COLUMNS.index('crid_volatility') + 1
+    return OUTPUT_COLUMNS[:i] + rolling_columns(rolling_windows) + rank_columns() + OUTPUT_COLUMNS[i:]
+
+
+def numeric_columns(rolling_windows=DEFAULT_ROLLING_WINDOWS) -> List[str]:
+    """NUMERIC_COLUMNS plus the rolling statistic and percentile columns."""
+    return NUMERIC_COLUMNS + rolling_columns(rolling_windows) + PERCENTILE_COLUMNS
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def fetch_weights(conn) -> Dict[str, float]:
+    """CRID weights from gold.nh_measure_definitions, keyed by measure_code."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT measure_code, crid_weight
+            FROM gold.nh_measure_definitions
+            WHERE used_in_crid = TRUE
+        """)
+        weights = {row[0]: float(row[1]) if row[1] is not None else np.nan for row in cur.fetchall()}
+    # Missing weights behave like the SQL: the composite becomes NULL
+    return {code: weights.get(code, np.nan) for code in CRID_CODES}
+
+
+def copy_to_frame(conn, query: str, dtype: Dict[str, str]) -> pd.DataFrame:
+    """Run COPY (query) TO STDOUT and parse the CSV into a DataFrame."""
+    buffer = BytesIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+    buffer.seek(0)
+    return pd.read_csv(buffer, dtype=dtype, keep_default_na=False, na_values=[''])
+
+
+def load_measures_from_db(conn) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Pull the six CRID measures from the gold tables in one pass each (long form)."""
+    mds_codes = ', '.join(f"'{c}'" for c in MDS_CODES)
+    claims_codes = ', '.join(f"'{c}'" for c in CLAIMS_CODES)
+
+    mds = copy_to_frame(conn, f"""
+        SELECT ccn, extract_id, as_of_date, state, measure_code,
+               four_quarter_avg AS score, has_suppression
+        FROM gold.nh_quality_mds
+        WHERE measure_code IN ({mds_codes})
+    """, dtype={'ccn': str, 'extract_id': str, 'as_of_date': str, 'state': str,
+                'measure_code': str, 'score': float, 'has_suppression': str})
+    claims = copy_to_frame(conn, f"""
+        SELECT ccn, extract_id, measure_code,
+               adjusted_score AS score, has_suppression
+        FROM gold.nh_quality_claims
+        WHERE measure_code IN ({claims_codes})
+    """, dtype={'ccn': str, 'extract_id': str, 'measure_code': str,
+                'score': float, 'has_suppression': str})
+
+    for df in (mds, claims):
+        df['has_suppression'] = df['has_suppression'].eq('t')
+    return mds, claims
+
+
+def load_measures_from_parquet(parquet_dir: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Read the six CRID measures from the local Parquet mirror (export_parquet.py)."""
+    import pyarrow.dataset as ds
+
+    def read(measure_type: str, codes: List[str], columns: List[str]) -> pd.DataFrame:
+        dataset = ds.dataset(f"{parquet_dir}/measure_type={measure_type}", partitioning='hive')
+        table = dataset.to_table(columns=columns, filter=ds.field('measure_code').isin(codes))
+        df = table.to_pandas()
+        df['extract_id'] = df['extract_id'].astype(str).str.zfill(6)
+        return df
+
+    mds = read('mds', MDS_CODES, ['ccn', 'extract_id', 'as_of_date', 'state', 'measure_code',
+                                  'four_quarter_avg', 'has_suppression'])
+    mds = mds.rename(columns={'four_quarter_avg': 'score'})
+    mds['as_of_date'] = mds['as_of_date'].astype(str)
+
+    claims = read('claims', CLAIMS_CODES, ['ccn', 'extract_id', 'measure_code',
+                                           'adjusted_score', 'has_suppression'])
+    claims = claims.rename(columns={'adjusted_score': 'score'})
+
+    for df in (mds, claims):
+        df['has_suppression'] = df['has_suppression'].fillna(False).astype(bool)
+    return mds, claims
+
+
+def pivot_measures(mds: pd.DataFrame, claims: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per (ccn, extract_id) present in MDS, with measure_<code> score
+    and sup_<code> suppression columns. Claims are left-joined, as in the SQL.
+    """
+    keys = ['ccn', 'extract_id']
+
+    mds_wide = mds.set_index(keys + ['measure_code'])[['score', 'has_suppression']].unstack('measure_code')
+    claims_wide = claims.set_index(keys + ['measure_code'])[['score', 'has_suppression']].unstack('measure_code')
+
+    base = mds.drop_duplicates(keys)[keys + ['as_of_date', 'state']].set_index(keys)
+    for frame, codes in ((mds_wide, MDS_CODES), (claims_wide, CLAIMS_CODES)):
+        scores = frame['score'].reindex(columns=codes) if 'score' in frame else pd.DataFrame(columns=codes)
+        sups = frame['has_suppression'].reindex(columns=codes) if 'has_suppression' in frame else pd.DataFrame(columns=codes)
+        scores = scores.reindex(base.index)
+        sups = sups.reindex(base.index)
+        for code in codes:
+            base[f'measure_{code}'] = scores[code].astype(float).to_numpy()
+            base[f'sup_{code}'] = sups[code].fillna(False).astype(bool).to_numpy()
+
+    return base.reset_index()
+
+
+# ============================================================================
+# COMPUTATION
+# ============================================================================
+
+def _group_stats(codes: np.ndarray, mask: np.ndarray, values: np.ndarray, n_groups: int):
+    """Population mean and stddev of values[mask] per group code (two-pass)."""
+    count = np.bincount(codes[mask], minlength=n_groups).astype(float)
+    total = np.bincount(codes[mask], weights=values[mask], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    dev = values[mask] - mean[codes[mask]]
+    sq = np.bincount(codes[mask], weights=dev * dev, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(sq / count)
+    return count, mean, std
+
+
+def _trailing_matrix(values: np.ndarray, group_start: np.ndarray, window: int) -> np.ndarray:
+    """
+    (n, window) matrix of each row's trailing `window` values within its group,
+    NaN where the window runs past the group start. Rows must be sorted by group
+    then time; group_start[i] is the row index where row i's group begins.
+    """
+    n = len(values)
+    idx = np.arange(n)
+    stacked = np.full((n, window), np.nan)
+    for k in range(window):
+        src = idx - k
+        valid = src >= group_start
+        stacked[valid, k] = values[src[valid]]
+    return stacked
+
+
+def rolling_pop_std(values: np.ndarray, group_start: np.ndarray, window: int) -> np.ndarray:
+    """
+    Population stddev over the trailing `window` rows of each group, ignoring NaN
+    (same as STDDEV_POP(...) OVER (ROWS BETWEEN window-1 PRECEDING AND CURRENT ROW)).
+    """
+    return rolling_stats(values, np.zeros(len(values)), group_start, window)[0]
+
+
+def rolling_stats(
+    values: np.ndarray,
+    x: np.ndarray,
+    group_start: np.ndarray,
+    window: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Trailing-window STDDEV_POP, AVG and REGR_SLOPE(values, x) per row, ignoring
+    NaN values, from one stacked pass. The slope is NaN where the window holds
+    fewer than two distinct x (as REGR_SLOPE returns NULL).
+    """
+    y = _trailing_matrix(values, group_start, window)
+    xs = _trailing_matrix(x.astype(float), group_start, window)
+
+    present = ~np.isnan(y)
+    count = present.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(present, y, 0.0).sum(axis=1) / count
+        dev = np.where(present, y - mean[:, None], 0.0)
+        std = np.sqrt((dev * dev).sum(axis=1) / count)
+
+        x_mean = np.where(present, xs, 0.0).sum(axis=1) / count
+        x_dev = np.where(present, xs - x_mean[:, None], 0.0)
+        sxx = (x_dev * x_dev).sum(axis=1)
+        sxy = (x_dev * dev).sum(axis=1)
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+    return std, mean, slope
+
+
+def percent_rank(values: pd.Series, groups: List[pd.Series]) -> np.ndarray:
+    """
+    SQL PERCENT_RANK() * 100 of each non-NaN value within its group:
+    (rank - 1) / (count - 1) with ties sharing the lowest rank; NaN stays NaN.
+    """
+    grouped = values.groupby(groups)
+    rank = grouped.rank(method='min').to_numpy()
+    count = grouped.transform('count').to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = np.where(count > 1, (rank - 1) / (count - 1), 0.0) * 100
+    return np.where(np.isnan(values.to_numpy()), np.nan, pct)
+
+
+def build_flags(df: pd.DataFrame) -> np.ndarray:
+    """Postgres TEXT[] literals for the flags column, in the SQL's flag order."""
+    crid = df['crid_value'].to_numpy()
+    vol = df['crid_volatility'].to_numpy()
+    mz = np.abs(df['mds_z_score'].to_numpy())
+    cz = np.abs(df['claims_z_score'].to_numpy())
+
+    # NaN comparisons are False, matching NULL semantics in the CASE expressions
+    with np.errstate(invalid='ignore'):
+        conditions = [
+            ('INCOMPLETE_MEASURES', ~df['is_complete'].to_numpy()),
+            ('SMALL_STATE', df['is_small_state'].to_numpy()),
+            ('HIGH_POSITIVE_CRID', crid > 2),
+            ('HIGH_NEGATIVE_CRID', crid < -2),
+            ('EXTREME_POSITIVE_CRID', crid > 3),
+            ('EXTREME_NEGATIVE_CRID', crid < -3),
+            ('HIGH_VOLATILITY', vol > 1.5),
+            ('MDS_OUTLIER', (mz > 2) & (cz < 1)),
+            ('CLAIMS_OUTLIER', (cz > 2) & (mz < 1)),
+        ]
+
+    joined = np.full(len(df), '', dtype=object)
+    for name, cond in conditions:
+        joined = np.where(cond, joined + name + ',', joined)
+    return np.array(['{' + s.rstrip(',') + '}' for s in joined], dtype=object)
+
+
+def compute_crid(
+    base: pd.DataFrame,
+    weights: Dict[str, float],
+    volatility_window: int = 3,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> pd.DataFrame:
+    """
+    Compute the metrics.crid_monthly rows from the pivoted measures.
+    Mirrors the SQL CTE in materialize_crid.materialize_crid().
+    """
+    for window in (volatility_window, *rolling_windows):
+        validate_window(window)
+
+    df = base.copy()
+    df['_extract_int'] = df['extract_id'].astype(int)
+    df = df.sort_values(['ccn', '_extract_int'], kind='mergesort').reset_index(drop=True)
+
+    scores = {code: df[f'measure_{code}'].to_numpy() for code in CRID_CODES}
+    sups = {code: df[f'sup_{code}'].to_numpy() for code in CRID_CODES}
+
+    # Completeness
+    present = np.column_stack([~np.isnan(scores[c]) & ~sups[c] for c in CRID_CODES])
+    is_complete = present.all(axis=1)
+    df['measures_present'] = present.sum(axis=1)
+    df['measures_suppressed'] = np.column_stack([sups[c] for c in CRID_CODES]).sum(axis=1)
+    df['completeness_pct'] = np.round(df['measures_present'].to_numpy() * 100.0 / 6, 2)
+    df['is_complete'] = is_complete
+
+    # Weighted composites (complete facilities only)
+    mds_composite = sum(weights[c] * scores[c] for c in MDS_CODES)
+    claims_utilization = sum(weights[c] * scores[c] for c in CLAIMS_CODES)
+    mds_composite = np.where(is_complete, mds_composite, np.nan)
+    claims_utilization = np.where(is_complete, claims_utilization, np.nan)
+    df['mds_composite'] = mds_composite
+    df['claims_utilization'] = claims_utilization
+
+    # State statistics within (state, extract_id), complete facilities only
+    group_codes, _ = pd.factorize(df['state'] + '|' + df['extract_id'])
+    n_groups = group_codes.max() + 1 if len(group_codes) else 0
+    count, mds_mean, mds_std = _group_stats(group_codes, is_complete, mds_composite, n_groups)
+    _, claims_mean, claims_std = _group_stats(group_codes, is_complete, claims_utilization, n_groups)
+
+    fac_count = count[group_codes]
+    has_stats = fac_count > 0
+    df['state_facility_count'] = pd.Series(np.where(has_stats, fac_count, np.nan)).astype('Int64')
+    df['state_mds_mean'] = np.where(has_stats, mds_mean[group_codes], np.nan)
+    df['state_mds_stddev'] = np.where(has_stats, mds_std[group_codes], np.nan)
+    df['state_claims_mean'] = np.where(has_stats, claims_mean[group_codes], np.nan)
+    df['state_claims_stddev'] = np.where(has_stats, claims_std[group_codes], np.nan)
+    df['is_small_state'] = fac_count < MIN_STATE_FACILITIES
+
+    # Z-scores: NULL if incomplete, small state or zero spread
+    big_enough = is_complete & (fac_count >= MIN_STATE_FACILITIES)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mds_z = np.where(big_enough & (df['state_mds_stddev'].to_numpy() > 0),
+                         (mds_composite - df['state_mds_mean'].to_numpy()) / df['state_mds_stddev'].to_numpy(),
+                         np.nan)
+        claims_z = np.where(big_enough & (df['state_claims_stddev'].to_numpy() > 0),
+                            (claims_utilization - df['state_claims_mean'].to_numpy()) / df['state_claims_stddev'].to_numpy(),
+                            np.nan)
+    df['mds_z_score'] = mds_z
+    df['claims_z_score'] = claims_z
+
+    crid = mds_z - claims_z
+    df['crid_value'] = crid
+
+    # Rolling volatility / mean / trend per facility over the trailing N rows;
+    # trend is CRID per calendar month
+    ccn_codes, _ = pd.factorize(df['ccn'])
+    starts = np.r_[0, np.flatnonzero(np.diff(ccn_codes)) + 1]
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(df)]))
+    extract_int = df['_extract_int'].to_numpy()
+    month_index = (extract_int // 100) * 12 + extract_int % 100
+    missing = np.isnan(crid)
+
+    volatility = rolling_pop_std(crid, group_start, volatility_window)
+    df['crid_volatility'] = np.where(missing, np.nan, volatility)
+    for window in rolling_windows:
+        std, mean, slope = rolling_stats(crid, month_index, group_start, window)
+        df[f'crid_volatility_{window}m'] = np.where(missing, np.nan, std)
+        df[f'crid_mean_{window}m'] = np.where(missing, np.nan, mean)
+        df[f'crid_trend_{window}m'] = np.where(missing, np.nan, slope)
+
+    # Percentile ranks within (state, extract_id) / extract_id and in-state deciles
+    for col, value, partition in PERCENTILE_RANKS:
+        groups = [df[key.strip()] for key in partition.split(',')]
+        pct = percent_rank(df[value], groups)
+        df[f'_{col}_raw'] = pct
+        # Round half up like NUMERIC(7,4)
+        df[col] = np.floor(pct * 1e4 + 0.5) / 1e4
+    for col, pct_col in DECILES:
+        pct = df[f'_{pct_col}_raw'].to_numpy()
+        with np.errstate(invalid='ignore'):
+            decile = np.minimum(10, 1 + np.floor(pct / 10))
+        df[col] = pd.Series(decile).astype('Int64')
+
+    df['flags'] = build_flags(df)
+
+    for code in CRID_CODES:
+        df[f'measure_{code}_score'] = df[f'measure_{code}']
+
+    return df
+
+
+def run_engine(
+    conn,
+    volatility_window: int = 3,
+    parquet_dir: Optional[str] = None,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> pd.DataFrame:
+    """Load inputs, compute CRID and return the rows in output_columns() layout."""
+    if parquet_dir:
+        logger.info(f"Reading CRID measures from Parquet mirror: {parquet_dir}")
+        mds, claims = load_measures_from_parquet(parquet_dir)
+    else:
+        logger.info("Pulling CRID measures from gold tables...")
+        mds, claims = load_measures_from_db(conn)
+    logger.info(f"Loaded {len(mds):,} MDS and {len(claims):,} Claims measure rows")
+
+    base = pivot_measures(mds, claims)
+    result = compute_crid(base, fetch_weights(conn), volatility_window, rolling_windows)
+    return result[output_columns(rolling_windows)]
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def bulk_load(
+    conn,
+    df: pd.DataFrame,
+    table: str = 'metrics.crid_monthly',
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> int:
+    """COPY computed CRID rows into the target table. Returns rows loaded."""
+    if df.empty:
+        return 0
+
+    columns = output_columns(rolling_windows)
+    numeric = numeric_columns(rolling_windows)
+    out = df[columns].copy()
+    out[numeric] = out[numeric].round(6)
+    for col in INTEGER_COLUMNS:
+        out[col] = out[col].astype('Int64')
+
+    buffer = StringIO()
+    out.to_csv(buffer, index=False, header=False, na_rep='', quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+
+    with conn.cursor() as cur:
+        cur.copy_expert(
+            f"COPY {table} ({','.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+            buffer
+        )
+    conn.commit()
+    return len(out)
+
+
+def fetch_table_frame(conn, table: str, rolling_windows=DEFAULT_ROLLING_WINDOWS) -> pd.DataFrame:
+    """Read a CRID table back into a DataFrame (for equivalence checks)."""
+    dtype = {c: float for c in numeric_columns(rolling_windows)}
+    dtype.update({'ccn': str, 'extract_id': str, 'as_of_date': str, 'state': str, 'flags': str})
+    return copy_to_frame(conn, f"SELECT {', '.join(output_columns(rolling_windows))} FROM {table}", dtype)
+
+
+def compare_frames(
+    engine_df: pd.DataFrame,
+    sql_df: pd.DataFrame,
+    tolerance: float = 1e-5,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS,
+    labels: Tuple[str, str] = ('numpy', 'SQL')
+) -> bool:
+    """
+    Compare engine output with SQL output keyed on (ccn, extract_id).
+    Numeric columns must agree within `tolerance` (SQL stores NUMERIC(12,6)),
+    NULLs must match exactly and flag sets must be identical. `labels` names
+    the two sides in the report.
+    """
+    keys = ['ccn', 'extract_id']
+    merged = engine_df.merge(sql_df, on=keys, how='outer', suffixes=('_np', '_sql'), indicator=True)
+
+    print("\n" + "=" * 70)
+    print(f"CRID EQUIVALENCE CHECK ({labels[0]} vs {labels[1]})")
+    print("=" * 70)
+
+    failures = 0
+    only_np = int((merged['_merge'] == 'left_only').sum())
+    only_sql = int((merged['_merge'] == 'right_only').sum())
+    print(f"\n    Rows ({labels[0]} / {labels[1]}): {len(engine_df):,} / {len(sql_df):,}")
+    if only_np or only_sql:
+        print(f"    MISMATCH: {only_np:,} rows only in {labels[0]}, {only_sql:,} rows only in {labels[1]}")
+        failures += only_np + only_sql
+
+    both = merged[merged['_merge'] == 'both']
+    for col in numeric_columns(rolling_windows) + INTEGER_COLUMNS:
+        a = pd.to_numeric(both[f'{col}_np'], errors='coerce').astype(float).to_numpy()
+        b = pd.to_numeric(both[f'{col}_sql'], errors='coerce').astype(float).to_numpy()
+        null_mismatch = np.isnan(a) != np.isnan(b)
+        with np.errstate(invalid='ignore'):
+            value_mismatch = ~np.isnan(a) & ~np.isnan(b) & (np.abs(a - b) > tolerance)
+        bad = int(null_mismatch.sum() + value_mismatch.sum())
+        if bad:
+            max_diff = np.nanmax(np.abs(a - b)) if value_mismatch.any() else 0.0
+            print(f"    MISMATCH {col}: {bad:,} rows (max diff {max_diff:.3g})")
+            failures += bad
+
+    def flag_set(value) -> frozenset:
+        if not isinstance(value, str):
+            return frozenset()
+        return frozenset(f for f in value.strip('{}').split(',') if f)
+
+    flag_bad = int(sum(
+        flag_set(a) != flag_set(b) for a, b in zip(both['flags_np'], both['flags_sql'])
+    ))
+    if flag_bad:
+        print(f"    MISMATCH flags: {flag_bad:,} rows")
+        failures += flag_bad
+
+    print("\n" + "=" * 70)
+    if failures:
+        print(f"EQUIVALENCE FAILED - {failures:,} mismatching values")
+    else:
+        print(f"EQUIVALENCE PASSED - {len(both):,} rows identical within {tolerance}")
+    print("=" * 70 + "\n")
+    return failures == 0
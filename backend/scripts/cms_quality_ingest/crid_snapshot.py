@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+NH-IR-007: Versioned CRID Snapshot for the Web Tier
+
+Writes metrics.crid_monthly (one file per extract) and
+metrics.crid_facility_summary to immutable Arrow IPC files plus a manifest,
+so the app tier can memory-map or cache CRID data instead of querying the
+database for values that change once a month.
+
+Layout:
+    <out-dir>/manifest.json                              (the only file rewritten in place)
+    <out-dir>/manifest.previous.json                     (manifest before the last change)
+    <out-dir>/extracts/crid_<extract_id>.<hash12>.arrow  (rows of one extract, sorted by ccn)
+    <out-dir>/facility_summary.<hash12>.arrow            (one row per ccn, sorted by ccn)
+
+Files are uncompressed Arrow IPC (file format), so readers can memory-map
+them. Each file name carries the first 12 hex digits of its SHA-256; a file
+whose content is unchanged keeps its name and is not rewritten. The manifest
+lists every file with its hash, row count and size, and its `version` is a
+hash over all file hashes, so it only changes when some data changed.
+Files referenced by neither the current nor the previous manifest are removed.
+
+Usage:
+    python crid_snapshot.py --out-dir /path/to/crid_snapshot
+    python materialize_crid.py --incremental --snapshot-dir /path/to/crid_snapshot
+
+Reading it back (Python; apache-arrow's tableFromIPC does the same in Node):
+    import json, pyarrow as pa
+    manifest = json.load(open('/path/to/crid_snapshot/manifest.json'))
+    entry = manifest['crid_monthly']['202401']
+    with pa.memory_map('/path/to/crid_snapshot/' + entry['file']) as source:
+        table = pa.ipc.open_file(source).read_all()
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from materialize_crid import DEFAULT_DB_URL, get_connection
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+PREVIOUS_MANIFEST_FILE = 'manifest.previous.json'
+HASH_PREFIX = 12
+
+# Columns that change on every rebuild without the data changing
+VOLATILE_COLUMNS = ('id', 'created_at', 'refreshed_at')
+
+# Postgres udt_name -> (SELECT cast, Arrow type)
+COLUMN_TYPES = {
+    'numeric': ('float8', pa.float64()),
+    'float8': ('float8', pa.float64()),
+    'float4': ('float4', pa.float32()),
+    'int2': ('int2', pa.int16()),
+    'int4': ('int4', pa.int32()),
+    'int8': ('int8', pa.int64()),
+    'bool': ('bool', pa.bool_()),
+    'date': ('date', pa.date32()),
+    'varchar': ('text', pa.string()),
+    'bpchar': ('text', pa.string()),
+    'text': ('text', pa.string()),
+    'json': ('text', pa.string()),
+    'jsonb': ('text', pa.string()),
+    '_text': ('text[]', pa.list_(pa.string())),
+    '_varchar': ('text[]', pa.list_(pa.string())),
+    '_numeric': ('float8[]', pa.list_(pa.float64())),
+    '_float8': ('float8[]', pa.list_(pa.float64())),
+}
+
+
+# ============================================================================
+# ARROW EXPORT
+# ============================================================================
+
+def table_columns(conn, table: str) -> List[Tuple[str, str, pa.DataType]]:
+    """(name, select expression, Arrow type) for every exported column of a metrics table."""
+    schema, name = table.split('.')
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT column_name, udt_name
+            FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+            ORDER BY ordinal_position
+        """, (schema, name))
+        rows = cur.fetchall()
+
+    columns = []
+    for column, udt in rows:
+        if column in VOLATILE_COLUMNS:
+            continue
+        if udt not in COLUMN_TYPES:
+            raise ValueError(f"{table}.{column}: no Arrow mapping for type {udt}")
+        cast, arrow_type = COLUMN_TYPES[udt]
+        columns.append((column, f"{column}::{cast}", arrow_type))
+    return columns
+
+
+def fetch_arrow(conn, table: str, columns, where: str = '', params=None) -> pa.Table:
+    """Rows of a metrics table (sorted by ccn) as an Arrow table with a fixed schema."""
+    select = ', '.join(expr for _, expr, _ in columns)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {select} FROM {table} {where} ORDER BY ccn", params)
+        rows = cur.fetchall()
+
+    arrays = [
+        pa.array([row[i] for row in rows], type=arrow_type)
+        for i, (_, _, arrow_type) in enumerate(columns)
+    ]
+    schema = pa.schema([(name, arrow_type) for name, _, arrow_type in columns])
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def ipc_bytes(table: pa.Table, metadata: Dict[str, str]) -> bytes:
+    """Serialize to the Arrow IPC file format (uncompressed, memory-mappable)."""
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def write_immutable(out_dir: Path, stem: str, data: bytes, rows: int) -> Dict:
+    """
+    Write data to <stem>.<hash12>.arrow unless that file already exists.
+    Returns the manifest entry.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    relative = f"{stem}.{digest[:HASH_PREFIX]}.arrow"
+    path = out_dir / relative
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.arrow.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return {'file': relative, 'sha256': digest, 'rows': rows, 'bytes': len(data)}
+
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+def load_manifest(path: Path) -> Optional[Dict]:
+    """Load a manifest (None if it does not exist)."""
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(out_dir: Path, manifest: Dict):
+    """Write the manifest atomically, keeping the one it replaces."""
+    path = out_dir / MANIFEST_FILE
+    if path.exists():
+        os.replace(path, out_dir / PREVIOUS_MANIFEST_FILE)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def manifest_files(manifest: Optional[Dict]) -> List[str]:
+    """Every data file a manifest references."""
+    if not manifest:
+        return []
+    files = [entry['file'] for entry in manifest['crid_monthly'].values()]
+    if manifest.get('facility_summary'):
+        files.append(manifest['facility_summary']['file'])
+    return files
+
+
+def snapshot_version(crid_files: Dict[str, Dict], summary: Optional[Dict]) -> str:
+    """Hash over all file hashes; changes only when some file's content changes."""
+    digest = hashlib.sha256()
+    for extract_id in sorted(crid_files):
+        digest.update(f"{extract_id}:{crid_files[extract_id]['sha256']}\n".encode())
+    if summary:
+        digest.update(f"summary:{summary['sha256']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def prune_files(out_dir: Path, keep: List[str]) -> int:
+    """Remove .arrow files referenced by neither the current nor the previous manifest."""
+    keep = {out_dir / f for f in keep}
+    removed = 0
+    for path in out_dir.rglob('*.arrow'):
+        if path not in keep:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+
+def export_snapshot(conn, out_dir: Path) -> Dict:
+    """
+    Export every extract of metrics.crid_monthly and the facility summary.
+    Unchanged files are left in place; the manifest is only rewritten when
+    the snapshot version changes. Returns the current manifest.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    current = load_manifest(out_dir / MANIFEST_FILE)
+
+    crid_columns = table_columns(conn, 'metrics.crid_monthly')
+    with conn.cursor() as cur:
+        cur.execute("SELECT DISTINCT extract_id FROM metrics.crid_monthly ORDER BY extract_id")
+        extract_ids = [row[0] for row in cur.fetchall()]
+
+    crid_files = {}
+    for extract_id in extract_ids:
+        table = fetch_arrow(conn, 'metrics.crid_monthly', crid_columns, 'WHERE extract_id = %s', (extract_id,))
+        data = ipc_bytes(table, {'table': 'metrics.crid_monthly', 'extract_id': extract_id})
+        crid_files[extract_id] = write_immutable(out_dir, f"extracts/crid_{extract_id}", data, table.num_rows)
+
+    summary = None
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('metrics.crid_facility_summary') IS NOT NULL")
+        has_summary = cur.fetchone()[0]
+    if has_summary:
+        table = fetch_arrow(conn, 'metrics.crid_facility_summary',
+                            table_columns(conn, 'metrics.crid_facility_summary'))
+        data = ipc_bytes(table, {'table': 'metrics.crid_facility_summary'})
+        summary = write_immutable(out_dir, 'facility_summary', data, table.num_rows)
+
+    version = snapshot_version(crid_files, summary)
+    if current and current.get('version') == version:
+        logger.info(f"Snapshot unchanged (version {version})")
+        return current
+
+    manifest = {
+        'version': version,
+        'previous_version': current.get('version') if current else None,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'format': 'arrow-ipc-file',
+        'crid_monthly': crid_files,
+        'facility_summary': summary,
+    }
+    save_manifest(out_dir, manifest)
+    removed = prune_files(out_dir, manifest_files(manifest) + manifest_files(current))
+
+    changed = [e for e, entry in crid_files.items()
+               if not current or current['crid_monthly'].get(e, {}).get('sha256') != entry['sha256']]
+    logger.info(
+        f"Snapshot {version}: {len(crid_files)} extract file(s), {len(changed)} new or changed"
+        f"{', facility summary' if summary else ''}; removed {removed} stale file(s)"
+    )
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export CRID to versioned Arrow IPC snapshot files for the web tier'
+    )
+    parser.add_argument('--out-dir', required=True, help='Snapshot directory')
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+
+    args = parser.parse_args()
+
+    logger.info("Connecting to marketplace database...")
+    conn = get_connection(args.db_url)
+
+    try:
+        start_time = time.time()
+        manifest = export_snapshot(conn, Path(args.out_dir))
+        logger.info(f"Snapshot version {manifest['version']} ready in {time.time() - start_time:.1f} seconds")
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Dataset Registry for the Monthly CMS Nursing Home Archives
+
+One entry per CSV family in a monthly archive. Each entry declares:
+
+    pattern   file name pattern (fnmatch, case-sensitive); the MonYYYY in the
+              name gives the extract_id
+    table     staging table the parsed rows are COPY'd into
+    columns   (target column, cleaning rule, source header names) in table
+              order; the first source header present in the file is used,
+              which absorbs the 2020 vs 2021+ renames. A column with no
+              header present is loaded as NULL
+    required  target columns that must be non-null; other rows are dropped
+    quality   True for the two quality-measure files, which continue through
+              the gold transform in ingest_fast.process_month
+
+Every table also gets extract_id, as_of_date and source_file (prepended).
+
+Cleaning rules:
+    text      kept as read
+    ccn       standardized 6-character CCN
+    code      str().strip()
+    numeric   pd.to_numeric(errors='coerce')
+    percent   '12.5%' -> 12.5; anything non-numeric -> NULL
+    date      parsed date as YYYY-MM-DD; unparseable -> NULL
+
+Adding a dataset is a new entry here; ingest_archives.py creates its
+staging table on first use and loads it on the same pass over each archive.
+"""
+
+from typing import List
+
+# Header aliases shared by every CMS nursing home file
+CCN = ('CMS Certification Number (CCN)', 'CMS Certification Number', 'Federal Provider Number')
+PROVIDER_COLUMNS = [
+    ('ccn', 'ccn', CCN),
+    ('provider_name', 'text', ('Provider Name',)),
+    ('provider_address', 'text', ('Provider Address',)),
+    ('city', 'text', ('City/Town', 'Provider City', 'City')),
+    ('state', 'text', ('State', 'Provider State')),
+    ('zip_code', 'text', ('ZIP Code', 'Provider Zip Code', 'Zip Code')),
+]
+TRAILER_COLUMNS = [
+    ('location', 'text', ('Location',)),
+    ('processing_date', 'date', ('Processing Date',)),
+]
+
+# Column type per cleaning rule (for staging tables created from the registry)
+RULE_TYPES = {
+    'text': 'TEXT',
+    'ccn': 'VARCHAR(6)',
+    'code': 'VARCHAR(20)',
+    'numeric': 'NUMERIC',
+    'percent': 'NUMERIC(6,2)',
+    'date': 'DATE',
+}
+
+DATASETS = {
+    'mds': {
+        'pattern': 'NH_QualityMsr_MDS_*.csv',
+        'table': 'staging.nh_quality_mds_raw',
+        'quality': True,
+        'required': ['ccn', 'measure_code'],
+        'columns': PROVIDER_COLUMNS + [
+            ('measure_code', 'code', ('Measure Code',)),
+            ('measure_description', 'text', ('Measure Description',)),
+            ('resident_type', 'text', ('Resident type',)),
+            ('q1_score', 'numeric', ('Q1 Measure Score',)),
+            ('q1_footnote', 'text', ('Footnote for Q1 Measure Score',)),
+            ('q2_score', 'numeric', ('Q2 Measure Score',)),
+            ('q2_footnote', 'text', ('Footnote for Q2 Measure Score',)),
+            ('q3_score', 'numeric', ('Q3 Measure Score',)),
+            ('q3_footnote', 'text', ('Footnote for Q3 Measure Score',)),
+            ('q4_score', 'numeric', ('Q4 Measure Score',)),
+            ('q4_footnote', 'text', ('Footnote for Q4 Measure Score',)),
+            ('four_quarter_avg', 'numeric', ('Four Quarter Average Score',)),
+            ('four_quarter_footnote', 'text', ('Footnote for Four Quarter Average Score',)),
+            ('used_in_star_rating', 'text', ('Used in Quality Measure Five Star Rating',)),
+            ('measure_period', 'text', ('Measure Period',)),
+        ] + TRAILER_COLUMNS,
+    },
+    'claims': {
+        'pattern': 'NH_QualityMsr_Claims_*.csv',
+        'table': 'staging.nh_quality_claims_raw',
+        'quality': True,
+        'required': ['ccn', 'measure_code'],
+        'columns': PROVIDER_COLUMNS + [
+            ('measure_code', 'code', ('Measure Code',)),
+            ('measure_description', 'text', ('Measure Description',)),
+            ('resident_type', 'text', ('Resident type',)),
+            ('adjusted_score', 'numeric', ('Adjusted Score',)),
+            ('observed_score', 'numeric', ('Observed Score',)),
+            ('expected_score', 'numeric', ('Expected Score',)),
+            ('footnote', 'text', ('Footnote for Score',)),
+            ('used_in_star_rating', 'text', ('Used in Quality Measure Five Star Rating',)),
+            ('measure_period', 'text', ('Measure Period',)),
+        ] + TRAILER_COLUMNS,
+    },
+    'provider_info': {
+        'pattern': 'NH_ProviderInfo_*.csv',
+        'table': 'staging.nh_provider_info_raw',
+        'required': ['ccn'],
+        'columns': PROVIDER_COLUMNS + [
+            ('county', 'text', ('County/Parish', 'Provider County Name')),
+            ('ownership_type', 'text', ('Ownership Type',)),
+            ('certified_beds', 'numeric', ('Number of Certified Beds',)),
+            ('average_residents_per_day', 'numeric', ('Average Number of Residents per Day',)),
+            ('provider_type', 'text', ('Provider Type',)),
+            ('legal_business_name', 'text', ('Legal Business Name',)),
+            ('first_approved_date', 'date', ('Date First Approved to Provide Medicare and Medicaid Services',
+                                             'Date First Approved to Provide Medicare and Medicaid services')),
+            ('overall_rating', 'numeric', ('Overall Rating',)),
+            ('health_inspection_rating', 'numeric', ('Health Inspection Rating',)),
+            ('qm_rating', 'numeric', ('QM Rating',)),
+            ('staffing_rating', 'numeric', ('Staffing Rating',)),
+            ('weighted_health_survey_score', 'numeric', ('Total Weighted Health Survey Score',)),
+            ('number_of_fines', 'numeric', ('Number of Fines',)),
+            ('total_fines_dollars', 'numeric', ('Total Amount of Fines in Dollars',)),
+            ('number_of_payment_denials', 'numeric', ('Number of Payment Denials',)),
+            ('total_penalties', 'numeric', ('Total Number of Penalties',)),
+        ] + TRAILER_COLUMNS,
+    },
+    'penalties': {
+        'pattern': 'NH_Penalties_*.csv',
+        'table': 'staging.nh_penalties_raw',
+        'required': ['ccn'],
+        'columns': PROVIDER_COLUMNS + [
+            ('penalty_date', 'date', ('Penalty Date',)),
+            ('penalty_type', 'text', ('Penalty Type',)),
+            ('fine_amount', 'numeric', ('Fine Amount',)),
+            ('payment_denial_start_date', 'date', ('Payment Denial Start Date',)),
+            ('payment_denial_days', 'numeric', ('Payment Denial Length in Days',)),
+        ] + TRAILER_COLUMNS,
+    },
+    'health_citations': {
+        'pattern': 'NH_HealthCitations_*.csv',
+        'table': 'staging.nh_health_citations_raw',
+        'required': ['ccn'],
+        'columns': PROVIDER_COLUMNS + [
+            ('survey_date', 'date', ('Survey Date',)),
+            ('survey_type', 'text', ('Survey Type',)),
+            ('deficiency_prefix', 'text', ('Deficiency Prefix',)),
+            ('deficiency_category', 'text', ('Deficiency Category',)),
+            ('deficiency_tag', 'code', ('Deficiency Tag Number',)),
+            ('deficiency_description', 'text', ('Deficiency Description',)),
+            ('scope_severity', 'code', ('Scope Severity Code',)),
+            ('deficiency_corrected', 'text', ('Deficiency Corrected',)),
+            ('correction_date', 'date', ('Correction Date',)),
+            ('inspection_cycle', 'numeric', ('Inspection Cycle',)),
+            ('standard_deficiency', 'text', ('Standard Deficiency',)),
+            ('complaint_deficiency', 'text', ('Complaint Deficiency',)),
+            ('infection_control_deficiency', 'text', ('Infection Control Inspection Deficiency',)),
+        ] + TRAILER_COLUMNS,
+    },
+    'ownership': {
+        'pattern': 'NH_Ownership_*.csv',
+        'table': 'staging.nh_ownership_raw',
+        'required': ['ccn'],
+        'columns': PROVIDER_COLUMNS + [
+            ('owner_role', 'text', ('Role played by Owner or Manager in Facility', 'Role Played by Owner or Manager in Facility')),
+            ('owner_type', 'text', ('Owner Type',)),
+            ('owner_name', 'text', ('Owner Name',)),
+            ('ownership_percentage', 'percent', ('Ownership Percentage',)),
+            ('association_date', 'text', ('Association Date',)),
+        ] + TRAILER_COLUMNS,
+    },
+}
+
+# Columns every staging table starts with
+KEY_COLUMNS = [
+    ('extract_id', 'VARCHAR(6) NOT NULL'),
+    ('as_of_date', 'DATE NOT NULL'),
+    ('source_file', 'VARCHAR(255) NOT NULL'),
+]
+
+
+def staging_columns(dataset: str) -> List[str]:
+    """Staging table columns in COPY order."""
+    return [name for name, _ in KEY_COLUMNS] + [column for column, _, _ in DATASETS[dataset]['columns']]
+
+
+def staging_ddl(dataset: str) -> str:
+    """CREATE UNLOGGED TABLE for a registry dataset (the quality tables are in schema.sql)."""
+    spec = DATASETS[dataset]
+    table = spec['table']
+    columns = [f"{name} {sql_type}" for name, sql_type in KEY_COLUMNS]
+    for column, rule, _ in spec['columns']:
+        not_null = ' NOT NULL' if column in spec['required'] else ''
+        columns.append(f"{column} {RULE_TYPES[rule]}{not_null}")
+    index = table.split('.')[1]
+    return f"""
+        CREATE UNLOGGED TABLE IF NOT EXISTS {table} (
+            id BIGSERIAL PRIMARY KEY,
+            {(',' + chr(10) + '            ').join(columns)},
+            created_at TIMESTAMP DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS idx_{index}_extract ON {table} (extract_id);
+    """
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Parquet Mirror of the Gold Quality Tables
+
+Exports gold.nh_quality_mds and gold.nh_quality_claims to a local, columnar
+Parquet dataset so analysts and notebooks can run heavy scans without hitting
+the production marketplace database.
+
+Layout (hive-style partitions, one file per extract and measure type):
+    <out-dir>/measure_type=mds/extract_id=202401/part-0.parquet
+    <out-dir>/measure_type=claims/extract_id=202401/part-0.parquet
+    <out-dir>/_export_state.json
+
+Rows inside each file are sorted by (measure_code, ccn) and written with
+column statistics, so filters on measure_code or ccn skip whole row groups.
+
+INCREMENTAL:
+    _export_state.json records gold.nh_quality_extracts.updated_at for every
+    exported extract. Later runs only rewrite extracts whose updated_at moved
+    (or that are new), and remove partitions for extracts no longer in gold.
+
+Usage:
+    python export_parquet.py --out-dir /path/to/nh_quality_parquet
+    python export_parquet.py --out-dir /path/to/nh_quality_parquet --force
+    python export_parquet.py --out-dir /path/to/nh_quality_parquet --extract 202401
+
+Reading it back:
+    import pyarrow.dataset as ds
+    mds = ds.dataset('/path/to/nh_quality_parquet/measure_type=mds', partitioning='hive')
+    df = mds.to_table(filter=ds.field('measure_code') == '410').to_pandas()
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from materialize_crid import DEFAULT_DB_URL, get_connection
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+STATE_FILE = '_export_state.json'
+
+# Rows per Parquet row group; small enough that measure_code/ccn statistics prune well
+ROW_GROUP_SIZE = 64 * 1024
+
+# Exported columns per measure type (extract_id is the partition key, not a file column)
+MDS_SCHEMA = pa.schema([
+    ('ccn', pa.string()),
+    ('as_of_date', pa.date32()),
+    ('state', pa.string()),
+    ('measure_code', pa.string()),
+    ('measure_description', pa.string()),
+    ('resident_type', pa.string()),
+    ('q1_score', pa.float64()),
+    ('q2_score', pa.float64()),
+    ('q3_score', pa.float64()),
+    ('q4_score', pa.float64()),
+    ('four_quarter_avg', pa.float64()),
+    ('footnotes', pa.string()),
+    ('has_suppression', pa.bool_()),
+    ('used_in_star_rating', pa.bool_()),
+    ('measure_period', pa.string()),
+    ('processing_date', pa.date32()),
+])
+
+CLAIMS_SCHEMA = pa.schema([
+    ('ccn', pa.string()),
+    ('as_of_date', pa.date32()),
+    ('state', pa.string()),
+    ('measure_code', pa.string()),
+    ('measure_description', pa.string()),
+    ('resident_type', pa.string()),
+    ('adjusted_score', pa.float64()),
+    ('observed_score', pa.float64()),
+    ('expected_score', pa.float64()),
+    ('footnote', pa.string()),
+    ('has_suppression', pa.bool_()),
+    ('used_in_star_rating', pa.bool_()),
+    ('measure_period', pa.string()),
+    ('processing_date', pa.date32()),
+])
+
+DATASETS = {
+    'mds': ('gold.nh_quality_mds', MDS_SCHEMA),
+    'claims': ('gold.nh_quality_claims', CLAIMS_SCHEMA),
+}
+
+
+# ============================================================================
+# EXPORT STATE
+# ============================================================================
+
+def load_state(out_dir: Path) -> Dict[str, Dict]:
+    """Load the per-extract export state (empty on first run)."""
+    state_path = out_dir / STATE_FILE
+    if not state_path.exists():
+        return {}
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+
+def save_state(out_dir: Path, state: Dict[str, Dict]):
+    """Write the export state atomically."""
+    state_path = out_dir / STATE_FILE
+    tmp_path = state_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def get_gold_extracts(conn) -> Dict[str, str]:
+    """Return {extract_id: updated_at ISO string} from gold.nh_quality_extracts."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT extract_id, COALESCE(updated_at, imported_at)
+            FROM gold.nh_quality_extracts
+            ORDER BY extract_id
+        """)
+        return {row[0]: row[1].isoformat() if row[1] else '' for row in cur.fetchall()}
+
+
+def find_changed_extracts(gold: Dict[str, str], state: Dict[str, Dict], force: bool) -> List[str]:
+    """Extracts that are new or whose updated_at differs from the last export."""
+    if force:
+        return sorted(gold)
+    return sorted(
+        eid for eid, updated_at in gold.items()
+        if state.get(eid, {}).get('updated_at') != updated_at
+    )
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def fetch_extract_table(conn, measure_type: str, extract_id: str) -> pa.Table:
+    """
+    Pull one extract of one gold table as an Arrow table.
+    Uses COPY ... TO STDOUT (CSV) and the Arrow CSV reader, avoiding
+    per-row Python objects.
+    """
+    table_name, schema = DATASETS[measure_type]
+    select_cols = ', '.join(
+        'footnotes::text' if name == 'footnotes' else name
+        for name in schema.names
+    )
+    copy_sql = (
+        f"COPY (SELECT {select_cols} FROM {table_name} "
+        f"WHERE extract_id = '{extract_id}' ORDER BY measure_code, ccn) "
+        f"TO STDOUT WITH (FORMAT csv)"
+    )
+
+    buffer = BytesIO()
+    with conn.cursor() as cur:
+        cur.copy_expert(copy_sql, buffer)
+    buffer.seek(0)
+
+    return pacsv.read_csv(
+        buffer,
+        read_options=pacsv.ReadOptions(column_names=schema.names),
+        convert_options=pacsv.ConvertOptions(
+            column_types=schema,
+            true_values=['t'],
+            false_values=['f'],
+            strings_can_be_null=True,
+        ),
+    )
+
+
+def write_partition(out_dir: Path, measure_type: str, extract_id: str, table: pa.Table) -> Path:
+    """Write one partition file, replacing any previous version atomically."""
+    part_dir = out_dir / f"measure_type={measure_type}" / f"extract_id={extract_id}"
+    part_dir.mkdir(parents=True, exist_ok=True)
+    final_path = part_dir / 'part-0.parquet'
+    # Dot prefix: dataset discovery skips it if an export is interrupted
+    tmp_path = part_dir / '.part-0.parquet.tmp'
+
+    pq.write_table(
+        table,
+        tmp_path,
+        compression='zstd',
+        row_group_size=ROW_GROUP_SIZE,
+        write_statistics=True,
+    )
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def remove_partitions(out_dir: Path, extract_id: str):
+    """Remove all partitions of an extract that no longer exists in gold."""
+    for measure_type in DATASETS:
+        part_dir = out_dir / f"measure_type={measure_type}" / f"extract_id={extract_id}"
+        if part_dir.exists():
+            shutil.rmtree(part_dir)
+
+
+def export_extract(conn, out_dir: Path, extract_id: str) -> Dict[str, int]:
+    """Export both gold tables for a single extract. Returns row counts."""
+    counts = {}
+    for measure_type in DATASETS:
+        table = fetch_extract_table(conn, measure_type, extract_id)
+        write_partition(out_dir, measure_type, extract_id, table)
+        counts[f"{measure_type}_rows"] = table.num_rows
+    return counts
+
+
+def run_export(conn, out_dir: Path, force: bool = False, only_extract: str = None) -> int:
+    """
+    Export changed extracts to the Parquet mirror.
+    Returns the number of extracts written.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    state = load_state(out_dir)
+    gold = get_gold_extracts(conn)
+
+    # Drop partitions for extracts that were removed from gold
+    if only_extract is None:
+        for extract_id in sorted(set(state) - set(gold)):
+            logger.info(f"[{extract_id}] No longer in gold, removing partitions")
+            remove_partitions(out_dir, extract_id)
+            del state[extract_id]
+
+    if only_extract is not None:
+        if only_extract not in gold:
+            raise ValueError(f"Extract {only_extract} not found in gold.nh_quality_extracts")
+        to_export = [only_extract]
+    else:
+        to_export = find_changed_extracts(gold, state, force)
+
+    logger.info(f"Extracts to export: {len(to_export)} (unchanged: {len(gold) - len(to_export)})")
+
+    for extract_id in to_export:
+        start = time.time()
+        counts = export_extract(conn, out_dir, extract_id)
+        state[extract_id] = {
+            'updated_at': gold[extract_id],
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            **counts,
+        }
+        # Persist after each extract so an interrupted run resumes where it stopped
+        save_state(out_dir, state)
+        logger.info(
+            f"[{extract_id}] MDS: {counts['mds_rows']:,}, Claims: {counts['claims_rows']:,} "
+            f"({time.time() - start:.1f}s)"
+        )
+
+    return len(to_export)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export gold quality tables to a partitioned Parquet mirror'
+    )
+    parser.add_argument('--out-dir', required=True, help='Root directory of the Parquet dataset')
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    parser.add_argument('--force', action='store_true', help='Rewrite every extract, ignoring export state')
+    parser.add_argument('--extract', help='Export a single extract_id (YYYYMM)')
+
+    args = parser.parse_args()
+
+    logger.info("Connecting to marketplace database...")
+    conn = get_connection(args.db_url)
+
+    try:
+        start_time = time.time()
+        written = run_export(conn, Path(args.out_dir), force=args.force, only_extract=args.extract)
+        logger.info(f"Exported {written} extract(s) in {time.time() - start_time:.1f} seconds")
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
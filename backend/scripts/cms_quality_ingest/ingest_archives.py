@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Single-Pass Loader for Monthly CMS Nursing Home Archives
+
+Reads each monthly ZIP once and routes every member that matches a dataset
+in datasets.py (quality measures, provider info, penalties, health
+citations, ownership, ...) through the same parse + COPY pipeline:
+
+    - NH_QualityMsr_MDS_* / NH_QualityMsr_Claims_* members go through
+      ingest_fast.process_month (anomaly checks, gold transform, validation)
+    - every other registry dataset is COPY'd into its staging table
+      (staging.nh_<dataset>_raw, created from the registry on first use),
+      replacing that extract's rows
+
+Members are decompressed straight from the archive (nothing is unpacked to
+disk) and loaded in parallel, one task per member (the MDS and Claims files
+of a month form one task). A dataset already loaded for an extract is
+skipped unless --force.
+
+Usage:
+    # All archives in a directory
+    python ingest_archives.py --archives /path/to/cms_archives --workers 4
+
+    # Selected archives / datasets
+    python ingest_archives.py --archives nursing_homes_Jan2024.zip --dataset provider_info --dataset penalties
+
+    # Reload everything found
+    python ingest_archives.py --archives /path/to/cms_archives --force
+"""
+
+import argparse
+import concurrent.futures
+import fnmatch
+import logging
+import sys
+import time
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+
+from datasets import DATASETS
+from ingest_fast import (
+    DEFAULT_DB_URL,
+    copy_dataset_to_staging,
+    create_benchmarks_table,
+    create_crid_inputs_table,
+    create_dataset_table,
+    create_extract_validation_table,
+    create_sketches_table,
+    get_connection,
+    get_loaded_extracts,
+    load_dataset_frame,
+    make_staging_unlogged,
+    parse_filename_date,
+    load_months_in_order,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# ARCHIVE SCAN
+# ============================================================================
+
+def find_archives(paths: List[str]) -> List[Path]:
+    """ZIP files given directly or found (recursively) under given directories."""
+    archives = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            archives.extend(sorted(p.rglob('*.zip')))
+        else:
+            archives.append(p)
+    return archives
+
+
+def member_dataset(name: str, datasets: List[str]) -> Optional[str]:
+    """Registry dataset whose pattern matches a member's file name."""
+    basename = name.rsplit('/', 1)[-1]
+    for dataset in datasets:
+        if fnmatch.fnmatchcase(basename, DATASETS[dataset]['pattern']):
+            return dataset
+    return None
+
+
+def plan_archive(archive: Path, datasets: List[str]) -> List[Tuple[str, str, Dict[str, str]]]:
+    """
+    Read an archive's directory and return its load tasks:
+    (kind, extract_id, {dataset: member}) with kind 'quality' (MDS + Claims
+    of one month) or the name of another dataset.
+    """
+    quality = {}
+    tasks = []
+    with zipfile.ZipFile(archive) as zf:
+        for name in zf.namelist():
+            dataset = member_dataset(name, datasets)
+            if dataset is None:
+                continue
+            try:
+                extract_id, _ = parse_filename_date(name.rsplit('/', 1)[-1])
+            except ValueError:
+                logger.warning(f"{archive.name}: skipping {name} (no MonYYYY in name)")
+                continue
+            if DATASETS[dataset].get('quality'):
+                quality.setdefault(extract_id, {})[dataset] = name
+            else:
+                tasks.append((dataset, extract_id, {dataset: name}))
+    tasks.extend(('quality', extract_id, members) for extract_id, members in sorted(quality.items()))
+    return tasks
+
+
+# ============================================================================
+# LOAD TASKS
+# ============================================================================
+
+def read_member(archive: Path, member: str) -> Tuple[BytesIO, str]:
+    """Decompress one archive member into memory: (buffer, file name)."""
+    with zipfile.ZipFile(archive) as zf:
+        return BytesIO(zf.read(member)), member.rsplit('/', 1)[-1]
+
+
+def dataset_loaded(conn, dataset: str, extract_id: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT 1 FROM {DATASETS[dataset]['table']} WHERE extract_id = %s LIMIT 1", (extract_id,))
+        return cur.fetchone() is not None
+
+
+def load_dataset_member(db_url: str, archive: Path, dataset: str, extract_id: str,
+                        member: str, force: bool) -> Dict:
+    """Worker: replace one extract of a non-quality dataset with an archive member."""
+    result = {'task': f"{extract_id} {dataset}", 'rows': 0, 'skipped': False, 'error': None}
+    try:
+        conn = get_connection(db_url)
+        if not force and dataset_loaded(conn, dataset, extract_id):
+            result['skipped'] = True
+            return result
+
+        df = load_dataset_frame(dataset, *read_member(archive, member))
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {DATASETS[dataset]['table']} WHERE extract_id = %s", (extract_id,))
+        result['rows'] = copy_dataset_to_staging(conn, dataset, df)
+        conn.commit()
+        logger.info(f"[{extract_id}] {dataset}: {result['rows']:,} rows")
+    except Exception as e:
+        logger.error(f"[{extract_id}] {dataset}: {e}")
+        result['error'] = str(e)
+        if 'conn' in locals() and not conn.closed:
+            conn.rollback()
+    return result
+
+
+def read_quality_members(archive: Path, members: Dict[str, str]) -> Tuple[Optional[Tuple[BytesIO, str]], ...]:
+    """(mds_file, claims_file) of one month, decompressed into memory."""
+    mds = read_member(archive, members['mds']) if 'mds' in members else None
+    claims = read_member(archive, members['claims']) if 'claims' in members else None
+    return mds, claims
+
+
+def quality_member_bytes(archive: Path, members: Dict[str, str]) -> int:
+    """Uncompressed size of one month's MDS + Claims members."""
+    with zipfile.ZipFile(archive) as zf:
+        return sum(zf.getinfo(member).file_size for member in members.values())
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load every registry dataset from monthly CMS archives in one pass per archive'
+    )
+    parser.add_argument('--archives', action='append', required=True,
+                        help='ZIP file or directory of ZIP files (repeatable)')
+    parser.add_argument('--dataset', action='append', choices=sorted(DATASETS),
+                        help='Dataset to load (repeatable; default: all)')
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    parser.add_argument('--workers', type=int, default=2, help='Number of parallel workers (default: 2, max: 4)')
+    parser.add_argument('--force', action='store_true', help='Reload datasets already loaded for an extract')
+    parser.add_argument('--skip-unlogged', action='store_true', help='Skip UNLOGGED optimization')
+    parser.add_argument('--allow-anomalies', action='store_true',
+                        help='Load months whose profile is anomalous against the previous extract')
+
+    args = parser.parse_args()
+    args.workers = min(max(args.workers, 1), 4)
+    datasets = args.dataset or list(DATASETS)
+
+    archives = find_archives(args.archives)
+    if not archives:
+        logger.error("No archives found")
+        return 1
+
+    tasks = []
+    for archive in archives:
+        for kind, extract_id, members in plan_archive(archive, datasets):
+            tasks.append((archive, kind, extract_id, members))
+    logger.info(f"{len(archives)} archive(s), {len(tasks)} load task(s)")
+    if not tasks:
+        return 0
+
+    logger.info("Connecting to marketplace database...")
+    conn = psycopg2.connect(args.db_url)
+    try:
+        if not args.skip_unlogged:
+            make_staging_unlogged(conn)
+        create_crid_inputs_table(conn)
+        create_benchmarks_table(conn)
+        create_sketches_table(conn)
+        create_extract_validation_table(conn)
+        for dataset in datasets:
+            create_dataset_table(conn, dataset)
+
+        loaded = set() if args.force else get_loaded_extracts(conn)
+    finally:
+        conn.close()
+
+    quality = {extract_id: (archive, members) for archive, kind, extract_id, members in tasks
+               if kind == 'quality'}
+    skipped = sorted(set(quality) & loaded)
+    for extract_id in skipped:
+        logger.info(f"[{extract_id}] Already loaded, skipping")
+        del quality[extract_id]
+
+    start_time = time.time()
+    results = [{'task': f"{extract_id} quality", 'rows': 0, 'skipped': True, 'error': None}
+               for extract_id in skipped]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [
+            executor.submit(load_dataset_member, args.db_url, archive, kind, extract_id, members[kind], args.force)
+            for archive, kind, extract_id, members in tasks if kind != 'quality'
+        ]
+        # Quality months are parsed once each; their anomaly baselines are
+        # fixed in extract order while they load
+        months = load_months_in_order(
+            executor, args.workers, args.db_url, list(quality),
+            lambda eid: read_quality_members(*quality[eid]),
+            set(quality) if args.force else set(),
+            args.allow_anomalies,
+            lambda eid: quality_member_bytes(*quality[eid])
+        )
+        results.extend({
+            'task': f"{month['extract_id']} quality",
+            'rows': month['gold_mds'] + month['gold_claims'],
+            'skipped': month['skipped'],
+            'error': month['error'],
+        } for month in months)
+        for future in concurrent.futures.as_completed(futures):
+            results.append(future.result())
+
+    elapsed = time.time() - start_time
+    errors = [r for r in results if r['error']]
+    logger.info("=" * 60)
+    logger.info("ARCHIVE LOAD COMPLETE")
+    logger.info(f"  Tasks loaded: {sum(1 for r in results if not r['error'] and not r['skipped'])}")
+    logger.info(f"  Tasks skipped (already loaded): {sum(1 for r in results if r['skipped'])}")
+    logger.info(f"  Rows: {sum(r['rows'] for r in results if not r['error']):,}")
+    logger.info(f"  Elapsed time: {elapsed:.1f} seconds")
+    if errors:
+        logger.warning(f"  Errors: {len(errors)}")
+        for r in errors:
+            logger.warning(f"    {r['task']}: {r['error']}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,6 +12,14 @@ OPTIMIZATIONS:
 - Parallel processing (default: 2 workers by month)
 - DELETE + INSERT pattern (faster than UPSERT for bulk)
 
+ANOMALY CHECKS:
+- Each month is profiled while parsed (rows, facilities, per-measure coverage,
+  suppression rates, score quantiles, footnote codes) and compared with the
+  previous extract's stored profile before anything is written
+- With parallel workers, months are profiled first and each one's baseline is
+  fixed in extract order, so verdicts do not depend on which month finishes first
+- Anomalous months are not loaded; --allow-anomalies overrides
+
 WORKER SAFETY:
 - Each worker uses a separate thread-local database connection
 - Each worker processes a unique extract_id (no concurrent access)
@@ -40,6 +48,19 @@ OTHER USAGE:
     # Run post-ingestion validation
     python ingest_fast.py --validate
 
+    # Backfill the pre-pivoted CRID inputs for months loaded before it existed
+    python ingest_fast.py --rebuild-crid-inputs
+
+    # Backfill the state/national benchmark rollup and percentile sketches
+    python ingest_fast.py --rebuild-benchmarks
+    python ingest_fast.py --rebuild-sketches
+
+    # Load a month despite anomalies (e.g. a confirmed CMS methodology change)
+    python ingest_fast.py --data-dir /path/to/data --force --allow-anomalies
+
+    # Re-cluster the gold tables and add BRIN indexes (after backfills)
+    python ingest_fast.py --maintain-gold
+
 SUCCESS CRITERIA:
     - 60 extracts in gold.nh_quality_extracts
     - ~17.5M MDS rows, ~3.6M Claims rows in gold tables
@@ -52,6 +73,9 @@ import re
 import sys
 import argparse
 import csv
+import fnmatch
+import hashlib
+import json
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -65,6 +89,9 @@ import pandas as pd
 import psycopg2
 from psycopg2 import sql
 
+from datasets import DATASETS, staging_columns, staging_ddl
+from quantile_sketch import build_sketch, merge_sketches
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -89,23 +116,19 @@ MONTH_MAP = {
 
 SUPPRESSION_CODES = {'9', '10', '11', '12', '13', '14', '15'}
 
-# Staging table columns for COPY
-MDS_STAGING_COLUMNS = [
-    'extract_id', 'as_of_date', 'source_file', 'ccn', 'provider_name',
-    'provider_address', 'city', 'state', 'zip_code', 'measure_code',
-    'measure_description', 'resident_type', 'q1_score', 'q1_footnote',
-    'q2_score', 'q2_footnote', 'q3_score', 'q3_footnote', 'q4_score',
-    'q4_footnote', 'four_quarter_avg', 'four_quarter_footnote',
-    'used_in_star_rating', 'measure_period', 'location', 'processing_date'
-]
-
-CLAIMS_STAGING_COLUMNS = [
-    'extract_id', 'as_of_date', 'source_file', 'ccn', 'provider_name',
-    'provider_address', 'city', 'state', 'zip_code', 'measure_code',
-    'measure_description', 'resident_type', 'adjusted_score',
-    'observed_score', 'expected_score', 'footnote', 'used_in_star_rating',
-    'measure_period', 'location', 'processing_date'
-]
+CRID_MDS_CODES = ['410', '453', '407', '409']
+CRID_CLAIMS_CODES = ['551', '552']
+
+# Anomaly thresholds: a month's profile against the previous extract's stored profile
+ANOMALY_MAX_ROW_DROP = 0.10              # rows or facilities per file
+ANOMALY_MAX_COVERAGE_DROP = 0.15         # facilities reporting a measure
+ANOMALY_MAX_SUPPRESSION_SHIFT = 0.15     # absolute change in a measure's suppressed share
+ANOMALY_MAX_MEDIAN_SHIFT = 0.5           # median score move, as a share of the previous p10-p90 spread
+ANOMALY_NEW_FOOTNOTE_SHARE = 0.05        # rows carrying a footnote code the previous file did not use
+
+# Staging table columns for COPY (see datasets.py)
+MDS_STAGING_COLUMNS = staging_columns('mds')
+CLAIMS_STAGING_COLUMNS = staging_columns('claims')
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -135,29 +158,14 @@ def standardize_ccn(ccn_value) -> Optional[str]:
     return ccn_str[:6] if ccn_str else None
 
 
-def normalize_column_names(df: pd.DataFrame) -> pd.DataFrame:
-    """Normalize column names for 2020 vs 2021+ naming differences."""
-    column_map = {
-        'Federal Provider Number': 'CMS Certification Number (CCN)',
-        'CMS Certification Number': 'CMS Certification Number (CCN)',
-        'Provider City': 'City/Town',
-        'City': 'City/Town',
-        'Provider State': 'State',
-        'Provider Zip Code': 'ZIP Code',
-        'Zip Code': 'ZIP Code',
-    }
-    for old_name, new_name in column_map.items():
-        if old_name in df.columns and new_name not in df.columns:
-            df = df.rename(columns={old_name: new_name})
-    return df
-
-
-def read_csv_with_encoding(filepath, **kwargs) -> pd.DataFrame:
+def read_csv_with_encoding(filepath_or_buffer, **kwargs) -> pd.DataFrame:
     """Read CSV with automatic encoding detection."""
     try:
-        return pd.read_csv(filepath, encoding='utf-8', **kwargs)
+        return pd.read_csv(filepath_or_buffer, encoding='utf-8', **kwargs)
     except UnicodeDecodeError:
-        return pd.read_csv(filepath, encoding='latin-1', **kwargs)
+        if hasattr(filepath_or_buffer, 'seek'):
+            filepath_or_buffer.seek(0)
+        return pd.read_csv(filepath_or_buffer, encoding='latin-1', **kwargs)
 
 
 def escape_csv_value(val) -> str:
@@ -174,33 +182,160 @@ def escape_csv_value(val) -> str:
 # FILE DISCOVERY
 # ============================================================================
 
-def discover_quality_files(data_dir: str) -> Tuple[List[Tuple[Path, str, str]], List[Tuple[Path, str, str]]]:
-    """
-    Discover all MDS and Claims CSV files.
-    Returns (mds_files, claims_files) where each is list of (path, filename, extract_id) tuples.
-    """
-    data_path = Path(data_dir)
-    mds_files = []
-    claims_files = []
+# File name pattern per quality dataset type
+DATASET_PATTERNS = {name: spec['pattern'] for name, spec in DATASETS.items() if spec.get('quality')}
 
-    for csv_path in data_path.rglob('NH_QualityMsr_MDS_*.csv'):
-        try:
-            extract_id, _ = parse_filename_date(csv_path.name)
-            mds_files.append((csv_path, csv_path.name, extract_id))
-        except ValueError:
-            logger.warning(f"Skipping file with unparseable date: {csv_path.name}")
+MANIFEST_FILE = '.ingest_manifest.json'
+HASH_CHUNK_BYTES = 1024 * 1024
 
-    for csv_path in data_path.rglob('NH_QualityMsr_Claims_*.csv'):
-        try:
-            extract_id, _ = parse_filename_date(csv_path.name)
-            claims_files.append((csv_path, csv_path.name, extract_id))
-        except ValueError:
-            logger.warning(f"Skipping file with unparseable date: {csv_path.name}")
 
-    mds_files.sort(key=lambda x: x[2])
-    claims_files.sort(key=lambda x: x[2])
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_file_manifest(manifest_path: Path) -> Dict:
+    """Load the discovery manifest (empty on first run or if unreadable)."""
+    if not manifest_path.exists():
+        return {}
+    try:
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+
 
-    return mds_files, claims_files
+def save_file_manifest(manifest_path: Path, manifest: Dict):
+    """Write the discovery manifest atomically."""
+    tmp_path = manifest_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def _dataset_type(name: str) -> Optional[str]:
+    for dataset, pattern in DATASET_PATTERNS.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return dataset
+    return None
+
+
+def scan_quality_files(data_dir: str, manifest: Dict, rescan: bool = False) -> Dict:
+    """
+    Refresh the discovery manifest for data_dir.
+
+    Directories whose mtime is unchanged reuse their cached listing (only the
+    directory is stat'ed); changed directories are listed again, and only
+    files whose size or mtime moved are re-hashed and re-parsed. rescan=True
+    lists every directory (catching files rewritten in place).
+
+    Returns the new manifest: {'dirs': {relpath: {mtime_ns, subdirs, files}},
+    'files': {relpath: {dataset, extract_id, filename, size, mtime_ns, sha256}},
+    'ingested': {...}}; 'ingested' and any other keys are carried over unchanged.
+    """
+    data_path = Path(data_dir)
+    cached_dirs = manifest.get('dirs', {})
+    cached_files = manifest.get('files', {})
+    dirs, files = {}, {}
+    listed = hashed = 0
+
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        dir_path = data_path / rel_dir
+        mtime_ns = os.stat(dir_path).st_mtime_ns
+        cached = cached_dirs.get(rel_dir)
+
+        if (not rescan and cached and cached['mtime_ns'] == mtime_ns
+                and all(os.path.join(rel_dir, name) in cached_files for name in cached['files'])):
+            subdirs, names = cached['subdirs'], cached['files']
+            for name in names:
+                rel_file = os.path.join(rel_dir, name)
+                files[rel_file] = cached_files[rel_file]
+        else:
+            listed += 1
+            subdirs, names = [], []
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):  # downloads / unpacking in progress
+                            subdirs.append(entry.name)
+                        continue
+                    dataset = _dataset_type(entry.name)
+                    if dataset is None or not entry.is_file():
+                        continue
+                    try:
+                        extract_id, _ = parse_filename_date(entry.name)
+                    except ValueError:
+                        logger.warning(f"Skipping file with unparseable date: {entry.name}")
+                        continue
+
+                    rel_file = os.path.join(rel_dir, entry.name)
+                    stat = entry.stat()
+                    previous = cached_files.get(rel_file)
+                    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                        files[rel_file] = previous
+                    else:
+                        hashed += 1
+                        files[rel_file] = {
+                            'dataset': dataset,
+                            'extract_id': extract_id,
+                            'filename': entry.name,
+                            'size': stat.st_size,
+                            'mtime_ns': stat.st_mtime_ns,
+                            'sha256': file_sha256(Path(entry.path)),
+                        }
+                    names.append(entry.name)
+            subdirs.sort()
+            names.sort()
+
+        dirs[rel_dir] = {'mtime_ns': mtime_ns, 'subdirs': subdirs, 'files': names}
+        stack.extend(os.path.join(rel_dir, sub) for sub in subdirs)
+
+    logger.info(f"Manifest: {len(dirs)} directories ({listed} listed), {len(files)} files ({hashed} hashed)")
+    return {**manifest, 'dirs': dirs, 'files': files, 'ingested': manifest.get('ingested', {})}
+
+
+def manifest_months(data_dir: str, manifest: Dict) -> Dict[str, Dict]:
+    """
+    Group manifest files by month:
+    {extract_id: {'mds': (path, filename) or None, 'claims': ..., 'bytes': {dataset: size},
+    'hashes': {dataset: sha256}}}. If a month has several files of one type,
+    the last path in sort order wins.
+    """
+    data_path = Path(data_dir)
+    months = {}
+    for rel_file in sorted(manifest['files']):
+        entry = manifest['files'][rel_file]
+        month = months.setdefault(entry['extract_id'], {'mds': None, 'claims': None, 'bytes': {}, 'hashes': {}})
+        month[entry['dataset']] = (data_path / rel_file, entry['filename'])
+        month['bytes'][entry['dataset']] = entry['size']
+        month['hashes'][entry['dataset']] = entry['sha256']
+    return months
+
+
+def discover_quality_files(data_dir: str, manifest_path: Optional[Path] = None,
+                           rescan: bool = False) -> Tuple[List[Tuple[Path, str, str]], List[Tuple[Path, str, str]]]:
+    """
+    Discover all MDS and Claims CSV files (through the cached manifest).
+    Returns (mds_files, claims_files) where each is list of (path, filename, extract_id) tuples.
+    """
+    manifest_path = manifest_path or Path(data_dir) / MANIFEST_FILE
+    manifest = scan_quality_files(data_dir, load_file_manifest(manifest_path), rescan)
+    save_file_manifest(manifest_path, manifest)
+
+    data_path = Path(data_dir)
+    found = {dataset: [] for dataset in DATASET_PATTERNS}
+    for rel_file, entry in manifest['files'].items():
+        found[entry['dataset']].append((data_path / rel_file, entry['filename'], entry['extract_id']))
+    for files in found.values():
+        files.sort(key=lambda x: x[2])
+    return found['mds'], found['claims']
 
 
 # ============================================================================
@@ -234,23 +369,37 @@ def delete_extract_from_gold(conn, extract_id: str):
     with conn.cursor() as cur:
         cur.execute("DELETE FROM gold.nh_quality_mds WHERE extract_id = %s", (extract_id,))
         cur.execute("DELETE FROM gold.nh_quality_claims WHERE extract_id = %s", (extract_id,))
+        cur.execute("DELETE FROM gold.nh_crid_inputs WHERE extract_id = %s", (extract_id,))
+        cur.execute("DELETE FROM gold.nh_quality_benchmarks WHERE extract_id = %s", (extract_id,))
+        cur.execute("DELETE FROM gold.nh_quality_sketches WHERE extract_id = %s", (extract_id,))
+        cur.execute("DELETE FROM gold.nh_extract_validation WHERE extract_id = %s", (extract_id,))
         cur.execute("DELETE FROM gold.nh_quality_extracts WHERE extract_id = %s", (extract_id,))
     conn.commit()
 
 
-def copy_mds_to_staging(conn, df: pd.DataFrame) -> int:
+def create_dataset_table(conn, dataset: str):
+    """Create a registry dataset's staging table if missing (quality tables come from schema.sql)."""
+    if DATASETS[dataset].get('quality'):
+        return
+    with conn.cursor() as cur:
+        cur.execute(staging_ddl(dataset))
+    conn.commit()
+
+
+def copy_dataset_to_staging(conn, dataset: str, df: pd.DataFrame) -> int:
     """
-    Use COPY to load MDS data into staging table (10-50x faster than INSERT).
-    Uses pandas to_csv() instead of iterrows() for better performance.
+    Use COPY to load a parsed dataset frame into its staging table
+    (10-50x faster than INSERT). Uses pandas to_csv() instead of iterrows().
     Returns row count.
     """
     if df.empty:
         return 0
 
+    columns = staging_columns(dataset)
     # Select columns in order and convert to CSV format for COPY
     # Use CSV format with proper escaping for PostgreSQL COPY
     buffer = StringIO()
-    df_copy = df[MDS_STAGING_COLUMNS].copy()
+    df_copy = df[columns].copy()
     # Replace NaN/None with empty string for CSV, COPY will treat as NULL
     df_copy.to_csv(
         buffer, index=False, header=False, sep='\t',
@@ -260,7 +409,7 @@ def copy_mds_to_staging(conn, df: pd.DataFrame) -> int:
 
     with conn.cursor() as cur:
         cur.copy_expert(
-            f"COPY staging.nh_quality_mds_raw ({','.join(MDS_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t', NULL '')",
+            f"COPY {DATASETS[dataset]['table']} ({','.join(columns)}) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t', NULL '')",
             buffer
         )
     conn.commit()
@@ -268,31 +417,226 @@ def copy_mds_to_staging(conn, df: pd.DataFrame) -> int:
     return len(df)
 
 
+def copy_mds_to_staging(conn, df: pd.DataFrame) -> int:
+    """Use COPY to load MDS data into staging table. Returns row count."""
+    return copy_dataset_to_staging(conn, 'mds', df)
+
+
 def copy_claims_to_staging(conn, df: pd.DataFrame) -> int:
+    """Use COPY to load Claims data into staging table. Returns row count."""
+    return copy_dataset_to_staging(conn, 'claims', df)
+
+
+# Pre-pivoted CRID inputs: one row per facility-month with the six CRID
+# measures and their suppression bits. Maintained by transform_extract_to_gold
+# so materialize_crid.py reads ~900K narrow rows instead of pivoting gold.
+CRID_INPUTS_DDL = """
+    CREATE TABLE IF NOT EXISTS gold.nh_crid_inputs (
+        ccn VARCHAR(6) NOT NULL,
+        extract_id VARCHAR(6) NOT NULL,
+        as_of_date DATE NOT NULL,
+        state VARCHAR(2),
+
+        -- MDS four_quarter_avg and Claims adjusted_score
+        measure_410 NUMERIC(12,6),
+        measure_453 NUMERIC(12,6),
+        measure_407 NUMERIC(12,6),
+        measure_409 NUMERIC(12,6),
+        measure_551 NUMERIC(12,6),
+        measure_552 NUMERIC(12,6),
+
+        -- Suppression bits (has_suppression of the source row)
+        sup_410 BOOLEAN NOT NULL DEFAULT FALSE,
+        sup_453 BOOLEAN NOT NULL DEFAULT FALSE,
+        sup_407 BOOLEAN NOT NULL DEFAULT FALSE,
+        sup_409 BOOLEAN NOT NULL DEFAULT FALSE,
+        sup_551 BOOLEAN NOT NULL DEFAULT FALSE,
+        sup_552 BOOLEAN NOT NULL DEFAULT FALSE,
+
+        PRIMARY KEY (extract_id, ccn)
+    );
+    COMMENT ON TABLE gold.nh_crid_inputs IS
+        'Facility-month pivot of the six CRID measures, refreshed per extract during ingestion';
+"""
+
+
+def create_crid_inputs_table(conn):
+    """Create gold.nh_crid_inputs if missing (databases set up before it existed)."""
+    with conn.cursor() as cur:
+        cur.execute(CRID_INPUTS_DDL)
+    conn.commit()
+
+
+def refresh_crid_inputs(conn, extract_id: str) -> int:
     """
-    Use COPY to load Claims data into staging table.
-    Uses pandas to_csv() instead of iterrows() for better performance.
-    Returns row count.
+    Rebuild the narrow CRID input rows (one per facility with MDS CRID measures)
+    for a single extract_id from the gold tables. Does not commit; called inside
+    transform_extract_to_gold so gold and its pivot change together.
+
+    Returns:
+        Number of facility rows written.
     """
-    if df.empty:
-        return 0
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM gold.nh_crid_inputs WHERE extract_id = %s", (extract_id,))
+        cur.execute("""
+            INSERT INTO gold.nh_crid_inputs (
+                ccn, extract_id, as_of_date, state,
+                measure_410, measure_453, measure_407, measure_409, measure_551, measure_552,
+                sup_410, sup_453, sup_407, sup_409, sup_551, sup_552
+            )
+            SELECT
+                m.ccn, m.extract_id, m.as_of_date, m.state,
+                m.measure_410, m.measure_453, m.measure_407, m.measure_409,
+                c.measure_551, c.measure_552,
+                m.sup_410, m.sup_453, m.sup_407, m.sup_409,
+                COALESCE(c.sup_551, FALSE), COALESCE(c.sup_552, FALSE)
+            FROM (
+                SELECT
+                    ccn, extract_id, MIN(as_of_date) AS as_of_date, MIN(state) AS state,
+                    MAX(CASE WHEN measure_code = '410' THEN four_quarter_avg END) AS measure_410,
+                    MAX(CASE WHEN measure_code = '453' THEN four_quarter_avg END) AS measure_453,
+                    MAX(CASE WHEN measure_code = '407' THEN four_quarter_avg END) AS measure_407,
+                    MAX(CASE WHEN measure_code = '409' THEN four_quarter_avg END) AS measure_409,
+                    COALESCE(BOOL_OR(measure_code = '410' AND has_suppression), FALSE) AS sup_410,
+                    COALESCE(BOOL_OR(measure_code = '453' AND has_suppression), FALSE) AS sup_453,
+                    COALESCE(BOOL_OR(measure_code = '407' AND has_suppression), FALSE) AS sup_407,
+                    COALESCE(BOOL_OR(measure_code = '409' AND has_suppression), FALSE) AS sup_409
+                FROM gold.nh_quality_mds
+                WHERE extract_id = %s AND measure_code IN ('410', '453', '407', '409')
+                GROUP BY ccn, extract_id
+            ) m
+            LEFT JOIN (
+                SELECT
+                    ccn,
+                    MAX(CASE WHEN measure_code = '551' THEN adjusted_score END) AS measure_551,
+                    MAX(CASE WHEN measure_code = '552' THEN adjusted_score END) AS measure_552,
+                    COALESCE(BOOL_OR(measure_code = '551' AND has_suppression), FALSE) AS sup_551,
+                    COALESCE(BOOL_OR(measure_code = '552' AND has_suppression), FALSE) AS sup_552
+                FROM gold.nh_quality_claims
+                WHERE extract_id = %s AND measure_code IN ('551', '552')
+                GROUP BY ccn
+            ) c ON c.ccn = m.ccn
+        """, (extract_id, extract_id))
+        return cur.rowcount
 
-    buffer = StringIO()
-    df_copy = df[CLAIMS_STAGING_COLUMNS].copy()
-    df_copy.to_csv(
-        buffer, index=False, header=False, sep='\t',
-        na_rep='', quoting=csv.QUOTE_NONE, escapechar='\\'
-    )
-    buffer.seek(0)
 
+def rebuild_crid_inputs(conn) -> int:
+    """Backfill gold.nh_crid_inputs for every extract already in gold. Returns rows written."""
+    create_crid_inputs_table(conn)
     with conn.cursor() as cur:
-        cur.copy_expert(
-            f"COPY staging.nh_quality_claims_raw ({','.join(CLAIMS_STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t', NULL '')",
-            buffer
-        )
+        cur.execute("SELECT extract_id FROM gold.nh_quality_extracts ORDER BY extract_id")
+        extract_ids = [row[0] for row in cur.fetchall()]
+
+    total = 0
+    for extract_id in extract_ids:
+        rows = refresh_crid_inputs(conn, extract_id)
+        conn.commit()
+        logger.info(f"[{extract_id}] CRID inputs: {rows:,} facilities")
+        total += rows
+    return total
+
+
+# State code used for the national rows of gold.nh_quality_benchmarks
+NATIONAL = 'US'
+
+# State and national benchmarks per measure and extract, refreshed per extract
+# during ingestion (state = 'US' is the national row)
+BENCHMARKS_DDL = """
+    CREATE TABLE IF NOT EXISTS gold.nh_quality_benchmarks (
+        extract_id VARCHAR(6) NOT NULL,
+        as_of_date DATE NOT NULL,
+        measure_code VARCHAR(10) NOT NULL,
+        measure_type VARCHAR(10) NOT NULL,        -- 'mds' or 'claims'
+        state VARCHAR(2) NOT NULL,
+        facilities INTEGER NOT NULL,
+        scored_facilities INTEGER NOT NULL,       -- Facilities with a non-null score
+        suppressed_facilities INTEGER NOT NULL,
+        suppression_rate NUMERIC(5,4),
+
+        -- MDS four_quarter_avg and Claims adjusted_score
+        score_mean NUMERIC(12,6),
+        score_p25 NUMERIC(12,6),
+        score_median NUMERIC(12,6),
+        score_p75 NUMERIC(12,6),
+
+        PRIMARY KEY (extract_id, measure_code, state)
+    );
+    CREATE INDEX IF NOT EXISTS idx_gold_benchmarks_lookup
+        ON gold.nh_quality_benchmarks (measure_code, state, extract_id);
+    COMMENT ON TABLE gold.nh_quality_benchmarks IS
+        'State and national (state = US) score distribution and suppression rate per measure and extract, refreshed per extract during ingestion';
+"""
+
+
+def create_benchmarks_table(conn):
+    """Create gold.nh_quality_benchmarks if missing (databases set up before it existed)."""
+    with conn.cursor() as cur:
+        cur.execute(BENCHMARKS_DDL)
     conn.commit()
 
-    return len(df)
+
+def refresh_benchmarks(conn, extract_id: str) -> int:
+    """
+    Rebuild the state and national benchmark rows (one per measure × state,
+    plus state = 'US') for a single extract_id from the gold tables. Scores
+    are MDS four_quarter_avg and Claims adjusted_score. Does not commit;
+    called inside transform_extract_to_gold so gold and its rollup change
+    together.
+
+    Returns:
+        Number of benchmark rows written.
+    """
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM gold.nh_quality_benchmarks WHERE extract_id = %s", (extract_id,))
+        cur.execute("""
+            WITH scores AS (
+                SELECT 'mds' AS measure_type, measure_code, state, as_of_date,
+                       four_quarter_avg AS score, has_suppression
+                FROM gold.nh_quality_mds
+                WHERE extract_id = %(extract_id)s
+                UNION ALL
+                SELECT 'claims', measure_code, state, as_of_date,
+                       adjusted_score, has_suppression
+                FROM gold.nh_quality_claims
+                WHERE extract_id = %(extract_id)s
+            )
+            INSERT INTO gold.nh_quality_benchmarks (
+                extract_id, as_of_date, measure_code, measure_type, state,
+                facilities, scored_facilities, suppressed_facilities, suppression_rate,
+                score_mean, score_p25, score_median, score_p75
+            )
+            SELECT
+                %(extract_id)s, MIN(as_of_date), measure_code, measure_type,
+                CASE WHEN GROUPING(state) = 1 THEN %(national)s ELSE state END,
+                COUNT(*),
+                COUNT(score),
+                COUNT(*) FILTER (WHERE has_suppression),
+                ROUND(COUNT(*) FILTER (WHERE has_suppression)::numeric / COUNT(*), 4),
+                AVG(score),
+                PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY score),
+                PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY score),
+                PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY score)
+            FROM scores
+            WHERE state IS NOT NULL
+            GROUP BY GROUPING SETS ((measure_type, measure_code, state), (measure_type, measure_code))
+        """, {'extract_id': extract_id, 'national': NATIONAL})
+        return cur.rowcount
+
+
+def rebuild_benchmarks(conn) -> int:
+    """Backfill gold.nh_quality_benchmarks for every extract already in gold. Returns rows written."""
+    create_benchmarks_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT extract_id FROM gold.nh_quality_extracts ORDER BY extract_id")
+        extract_ids = [row[0] for row in cur.fetchall()]
+
+    total = 0
+    for extract_id in extract_ids:
+        rows = refresh_benchmarks(conn, extract_id)
+        conn.commit()
+        logger.info(f"[{extract_id}] Benchmarks: {rows:,} rows")
+        total += rows
+    return total
 
 
 def transform_extract_to_gold(conn, extract_id: str) -> Tuple[int, int]:
@@ -369,6 +713,10 @@ def transform_extract_to_gold(conn, extract_id: str) -> Tuple[int, int]:
         """, (extract_id,))
         claims_count = cur.rowcount
 
+        # Refresh the pre-pivoted CRID inputs and the benchmark rollup for this month
+        refresh_crid_inputs(conn, extract_id)
+        refresh_benchmarks(conn, extract_id)
+
         # Update extracts metadata
         cur.execute("""
             INSERT INTO gold.nh_quality_extracts (
@@ -410,106 +758,635 @@ def transform_extract_to_gold(conn, extract_id: str) -> Tuple[int, int]:
 # DATA LOADING
 # ============================================================================
 
-def load_mds_dataframe(filepath: Path, filename: str) -> pd.DataFrame:
-    """Load and clean an MDS quality measures CSV file."""
+def _percent(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values.str.replace('%', '', regex=False).str.strip(), errors='coerce')
+
+
+# Cleaning rule -> function of the raw (string) column; see datasets.py
+CLEANING_RULES = {
+    'text': lambda values: values,
+    'ccn': lambda values: values.apply(standardize_ccn),
+    'code': lambda values: values.where(values.isna(), values.astype(str).str.strip()),
+    'numeric': lambda values: pd.to_numeric(values, errors='coerce'),
+    'percent': _percent,
+    'date': lambda values: pd.to_datetime(values, errors='coerce').dt.strftime('%Y-%m-%d'),
+}
+
+
+def load_dataset_frame(dataset: str, source, filename: str) -> pd.DataFrame:
+    """
+    Load and clean one CSV of a registry dataset (source is a path or a
+    binary file object, e.g. an archive member). Returns the staging columns.
+    """
+    spec = DATASETS[dataset]
     extract_id, as_of_date = parse_filename_date(filename)
 
-    df = read_csv_with_encoding(filepath, dtype=str, low_memory=False)
+    df = read_csv_with_encoding(source, dtype=str, low_memory=False)
     df.columns = [c.strip() for c in df.columns]
-    df = normalize_column_names(df)
 
-    result = pd.DataFrame({
-        'extract_id': extract_id,
-        'as_of_date': as_of_date.strftime('%Y-%m-%d'),
-        'source_file': filename,
-        'ccn': df['CMS Certification Number (CCN)'].apply(standardize_ccn),
-        'provider_name': df['Provider Name'],
-        'provider_address': df['Provider Address'],
-        'city': df.get('City/Town', df.get('City', '')),
-        'state': df['State'],
-        'zip_code': df.get('ZIP Code', df.get('Zip Code', '')),
-        'measure_code': df['Measure Code'].astype(str).str.strip(),
-        'measure_description': df['Measure Description'],
-        'resident_type': df['Resident type'],
-        'q1_score': pd.to_numeric(df['Q1 Measure Score'], errors='coerce'),
-        'q1_footnote': df['Footnote for Q1 Measure Score'],
-        'q2_score': pd.to_numeric(df['Q2 Measure Score'], errors='coerce'),
-        'q2_footnote': df['Footnote for Q2 Measure Score'],
-        'q3_score': pd.to_numeric(df['Q3 Measure Score'], errors='coerce'),
-        'q3_footnote': df['Footnote for Q3 Measure Score'],
-        'q4_score': pd.to_numeric(df['Q4 Measure Score'], errors='coerce'),
-        'q4_footnote': df['Footnote for Q4 Measure Score'],
-        'four_quarter_avg': pd.to_numeric(df['Four Quarter Average Score'], errors='coerce'),
-        'four_quarter_footnote': df['Footnote for Four Quarter Average Score'],
-        'used_in_star_rating': df['Used in Quality Measure Five Star Rating'],
-        'measure_period': df['Measure Period'],
-        'location': df['Location'],
-        'processing_date': pd.to_datetime(df['Processing Date'], errors='coerce').dt.strftime('%Y-%m-%d')
-    })
-
-    result = result[result['ccn'].notna() & result['measure_code'].notna()]
-    return result
+    result = pd.DataFrame(index=df.index)
+    result['extract_id'] = extract_id
+    result['as_of_date'] = as_of_date.strftime('%Y-%m-%d')
+    result['source_file'] = filename
+    for column, rule, headers in spec['columns']:
+        header = next((h for h in headers if h in df.columns), None)
+        if header is None:
+            if column in spec['required']:
+                raise KeyError(f"{filename}: none of {list(headers)} present")
+            result[column] = None
+        else:
+            result[column] = CLEANING_RULES[rule](df[header])
+
+    return result[result[spec['required']].notna().all(axis=1)]
 
 
-def load_claims_dataframe(filepath: Path, filename: str) -> pd.DataFrame:
+def load_mds_dataframe(filepath, filename: str) -> pd.DataFrame:
+    """Load and clean an MDS quality measures CSV file."""
+    return load_dataset_frame('mds', filepath, filename)
+
+
+def load_claims_dataframe(filepath, filename: str) -> pd.DataFrame:
     """Load and clean a Claims quality measures CSV file."""
-    extract_id, as_of_date = parse_filename_date(filename)
+    return load_dataset_frame('claims', filepath, filename)
 
-    df = read_csv_with_encoding(filepath, dtype=str, low_memory=False)
-    df.columns = [c.strip() for c in df.columns]
-    df = normalize_column_names(df)
 
-    result = pd.DataFrame({
-        'extract_id': extract_id,
-        'as_of_date': as_of_date.strftime('%Y-%m-%d'),
-        'source_file': filename,
-        'ccn': df['CMS Certification Number (CCN)'].apply(standardize_ccn),
-        'provider_name': df['Provider Name'],
-        'provider_address': df['Provider Address'],
-        'city': df.get('City/Town', df.get('City', '')),
-        'state': df['State'],
-        'zip_code': df.get('ZIP Code', df.get('Zip Code', '')),
-        'measure_code': df['Measure Code'].astype(str).str.strip(),
-        'measure_description': df['Measure Description'],
-        'resident_type': df['Resident type'],
-        'adjusted_score': pd.to_numeric(df['Adjusted Score'], errors='coerce'),
-        'observed_score': pd.to_numeric(df['Observed Score'], errors='coerce'),
-        'expected_score': pd.to_numeric(df['Expected Score'], errors='coerce'),
-        'footnote': df['Footnote for Score'],
-        'used_in_star_rating': df['Used in Quality Measure Five Star Rating'],
-        'measure_period': df['Measure Period'],
-        'location': df['Location'],
-        'processing_date': pd.to_datetime(df['Processing Date'], errors='coerce').dt.strftime('%Y-%m-%d')
-    })
-
-    result = result[result['ccn'].notna() & result['measure_code'].notna()]
-    return result
+# ============================================================================
+# PER-EXTRACT VALIDATION
+# ============================================================================
+
+# Per-extract validation, written while each extract is loaded (counts and
+# duplicates come from the parsed files, not gold scans)
+EXTRACT_VALIDATION_DDL = """
+    CREATE TABLE IF NOT EXISTS gold.nh_extract_validation (
+        extract_id VARCHAR(6) PRIMARY KEY,
+        mds_rows INTEGER,
+        claims_rows INTEGER,
+        mds_facilities INTEGER,
+        claims_facilities INTEGER,
+        mds_duplicate_keys INTEGER,               -- Repeated (ccn, measure_code) in the file
+        claims_duplicate_keys INTEGER,
+        crid_measure_facilities JSONB,            -- {"410": 14500, ..., "552": 14200}
+        complete_crid_facilities INTEGER,         -- All six CRID measures present and unsuppressed
+        gold_mds_rows INTEGER,
+        gold_claims_rows INTEGER,
+        errors TEXT[],
+        source VARCHAR(10),                       -- ingest (parsed file) or gold (backfilled)
+        measure_profile JSONB,                    -- Per file: rows, facilities, per-measure coverage/suppression/score quantiles, footnote shares
+        validated_at TIMESTAMP DEFAULT NOW()
+    );
+    COMMENT ON TABLE gold.nh_extract_validation IS
+        'Validation results per extract, recomputed only for extracts loaded in a run';
+"""
+
+
+def create_extract_validation_table(conn):
+    """Create gold.nh_extract_validation if missing (databases set up before it existed)."""
+    with conn.cursor() as cur:
+        cur.execute(EXTRACT_VALIDATION_DDL)
+        cur.execute("ALTER TABLE gold.nh_extract_validation ADD COLUMN IF NOT EXISTS measure_profile JSONB")
+    conn.commit()
+
+
+class ExtractAnomalyError(ValueError):
+    """A parsed month differs too much from the previous extract to be loaded."""
+
+
+def profile_frame(df: pd.DataFrame, kind: str) -> Dict:
+    """
+    Validation profile of one parsed file, computed in memory before COPY:
+    row/facility counts, duplicate (ccn, measure_code) keys, facilities per
+    CRID measure, the set of facilities with every CRID measure of this kind
+    present and unsuppressed, and per-measure coverage, suppression and
+    score quantiles plus footnote code shares for anomaly detection.
+    """
+    if kind == 'mds':
+        codes = CRID_MDS_CODES
+        footnote_cols = ['q1_footnote', 'q2_footnote', 'q3_footnote', 'q4_footnote', 'four_quarter_footnote']
+        score_col = 'four_quarter_avg'
+    else:
+        codes = CRID_CLAIMS_CODES
+        footnote_cols = ['footnote']
+        score_col = 'adjusted_score'
+
+    suppressed = pd.Series(False, index=df.index)
+    for col in footnote_cols:
+        suppressed |= df[col].isin(SUPPRESSION_CODES)
+
+    crid = df[df['measure_code'].isin(codes)]
+    clean = crid[~suppressed.loc[crid.index]]
+    per_ccn = clean.groupby('ccn')['measure_code'].nunique()
+
+    by_measure = pd.DataFrame({
+        'ccn': df['ccn'],
+        'suppressed': suppressed,
+        'score': df[score_col],
+    }).groupby(df['measure_code'])
+    quantiles = by_measure['score'].quantile([0.1, 0.5, 0.9]).unstack()
+    suppression_rates = by_measure['suppressed'].mean()
+    measures = {}
+    for code, facilities in by_measure['ccn'].nunique().items():
+        p10, p50, p90 = (quantiles.at[code, q] for q in (0.1, 0.5, 0.9))
+        measures[code] = {
+            'facilities': int(facilities),
+            'suppression_rate': round(float(suppression_rates[code]), 4),
+            'score_p10': None if pd.isna(p10) else float(p10),
+            'score_p50': None if pd.isna(p50) else float(p50),
+            'score_p90': None if pd.isna(p90) else float(p90),
+        }
+
+    footnotes = pd.concat([df[col] for col in footnote_cols]).dropna().astype(str).str.strip()
+    footnote_rates = {
+        code: round(count / max(len(df), 1), 4)
+        for code, count in footnotes[footnotes != ''].value_counts().items()
+    }
+
+    return {
+        'rows': len(df),
+        'facilities': int(df['ccn'].nunique()),
+        'duplicate_keys': int(df.duplicated(['ccn', 'measure_code']).sum()),
+        'crid_measure_facilities': {
+            code: int(n) for code, n in crid.groupby('measure_code')['ccn'].nunique().items()
+        },
+        'complete_ccns': set(per_ccn[per_ccn == len(codes)].index),
+        'measures': measures,
+        'footnote_rates': footnote_rates,
+    }
+
+
+def combine_profiles(mds: Optional[Dict], claims: Optional[Dict]) -> Dict:
+    """Merge the MDS and Claims file profiles into one extract validation row."""
+    empty = {'rows': 0, 'facilities': 0, 'duplicate_keys': 0, 'crid_measure_facilities': {}, 'complete_ccns': set(),
+             'measures': {}, 'footnote_rates': {}}
+    mds = mds or empty
+    claims = claims or empty
+    return {
+        'measure_profile': {
+            kind: {key: profile[key] for key in ('rows', 'facilities', 'measures', 'footnote_rates')}
+            for kind, profile in (('mds', mds), ('claims', claims))
+        },
+        'mds_rows': mds['rows'],
+        'claims_rows': claims['rows'],
+        'mds_facilities': mds['facilities'],
+        'claims_facilities': claims['facilities'],
+        'mds_duplicate_keys': mds['duplicate_keys'],
+        'claims_duplicate_keys': claims['duplicate_keys'],
+        'crid_measure_facilities': {**mds['crid_measure_facilities'], **claims['crid_measure_facilities']},
+        'complete_crid_facilities': len(mds['complete_ccns'] & claims['complete_ccns']),
+    }
+
+
+def profile_extract_from_gold(conn, extract_id: str) -> Dict:
+    """
+    Same profile as combine_profiles(), computed from the gold tables for one
+    extract (used for extracts loaded before validation was stored).
+    Duplicates cannot exist in gold: the unique constraints reject them.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM gold.nh_quality_mds WHERE extract_id = %(e)s),
+                (SELECT COUNT(*) FROM gold.nh_quality_claims WHERE extract_id = %(e)s),
+                (SELECT COUNT(DISTINCT ccn) FROM gold.nh_quality_mds WHERE extract_id = %(e)s),
+                (SELECT COUNT(DISTINCT ccn) FROM gold.nh_quality_claims WHERE extract_id = %(e)s)
+        """, {'e': extract_id})
+        mds_rows, claims_rows, mds_facilities, claims_facilities = cur.fetchone()
+
+        cur.execute("""
+            SELECT measure_code, COUNT(DISTINCT ccn)
+            FROM gold.nh_quality_mds
+            WHERE extract_id = %(e)s AND measure_code = ANY(%(mds)s)
+            GROUP BY measure_code
+            UNION ALL
+            SELECT measure_code, COUNT(DISTINCT ccn)
+            FROM gold.nh_quality_claims
+            WHERE extract_id = %(e)s AND measure_code = ANY(%(claims)s)
+            GROUP BY measure_code
+        """, {'e': extract_id, 'mds': CRID_MDS_CODES, 'claims': CRID_CLAIMS_CODES})
+        measure_facilities = {row[0]: row[1] for row in cur.fetchall()}
+
+        cur.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT ccn FROM gold.nh_quality_mds
+                WHERE extract_id = %(e)s AND measure_code = ANY(%(mds)s) AND has_suppression = FALSE
+                GROUP BY ccn HAVING COUNT(DISTINCT measure_code) = %(n_mds)s
+            ) m
+            JOIN (
+                SELECT ccn FROM gold.nh_quality_claims
+                WHERE extract_id = %(e)s AND measure_code = ANY(%(claims)s) AND has_suppression = FALSE
+                GROUP BY ccn HAVING COUNT(DISTINCT measure_code) = %(n_claims)s
+            ) c ON m.ccn = c.ccn
+        """, {'e': extract_id, 'mds': CRID_MDS_CODES, 'claims': CRID_CLAIMS_CODES,
+              'n_mds': len(CRID_MDS_CODES), 'n_claims': len(CRID_CLAIMS_CODES)})
+        complete = cur.fetchone()[0]
+
+    return {
+        'mds_rows': mds_rows,
+        'claims_rows': claims_rows,
+        'mds_facilities': mds_facilities,
+        'claims_facilities': claims_facilities,
+        'mds_duplicate_keys': 0,
+        'claims_duplicate_keys': 0,
+        'crid_measure_facilities': measure_facilities,
+        'complete_crid_facilities': complete,
+    }
+
+
+def load_previous_profile(conn, extract_id: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """The stored measure profile of the latest extract before extract_id, if any."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT extract_id, measure_profile
+            FROM gold.nh_extract_validation
+            WHERE extract_id < %s AND measure_profile IS NOT NULL
+            ORDER BY extract_id DESC
+            LIMIT 1
+        """, (extract_id,))
+        row = cur.fetchone()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def _drop(previous: float, current: float) -> float:
+    """Relative decrease from previous to current (0 when previous is 0)."""
+    return (previous - current) / previous if previous else 0.0
+
+
+def detect_anomalies(profile: Dict, previous: Dict) -> List[str]:
+    """
+    Compare a month's measure profile (combine_profiles()['measure_profile'])
+    with the previous extract's: truncated files, lost facilities or measures,
+    suppression shifts, score distribution jumps and new footnote codes.
+    Returns the anomalies found (empty if the month looks consistent).
+    """
+    anomalies = []
+    for kind, current in profile.items():
+        before = previous.get(kind)
+        if not before or not before['rows']:
+            continue
+        label = kind.upper() if kind == 'mds' else kind.capitalize()
+
+        for key in ('rows', 'facilities'):
+            drop = _drop(before[key], current[key])
+            if drop > ANOMALY_MAX_ROW_DROP:
+                anomalies.append(f"{label} {key} fell {drop:.0%} ({before[key]:,} -> {current[key]:,})")
+
+        for code, was in before['measures'].items():
+            now = current['measures'].get(code)
+            if now is None:
+                anomalies.append(f"{label} measure {code} missing (previously {was['facilities']:,} facilities)")
+                continue
+            drop = _drop(was['facilities'], now['facilities'])
+            if drop > ANOMALY_MAX_COVERAGE_DROP:
+                anomalies.append(
+                    f"{label} measure {code} coverage fell {drop:.0%} ({was['facilities']:,} -> {now['facilities']:,})"
+                )
+            shift = now['suppression_rate'] - was['suppression_rate']
+            if abs(shift) > ANOMALY_MAX_SUPPRESSION_SHIFT:
+                anomalies.append(
+                    f"{label} measure {code} suppression {was['suppression_rate']:.0%} -> {now['suppression_rate']:.0%}"
+                )
+            if None not in (was['score_p10'], was['score_p50'], was['score_p90'], now['score_p50']):
+                spread = was['score_p90'] - was['score_p10']
+                if spread > 0 and abs(now['score_p50'] - was['score_p50']) > ANOMALY_MAX_MEDIAN_SHIFT * spread:
+                    anomalies.append(
+                        f"{label} measure {code} median score {was['score_p50']:.3f} -> {now['score_p50']:.3f}"
+                    )
+
+        for code, rate in current['footnote_rates'].items():
+            if code not in before['footnote_rates'] and rate > ANOMALY_NEW_FOOTNOTE_SHARE:
+                anomalies.append(f"{label} footnote code {code} new, on {rate:.0%} of rows")
+    return anomalies
+
+
+def introduced_crid_measures(conn, extract_id: str) -> Set[str]:
+    """
+    CRID measure codes some earlier extract already reported (per the stored
+    validation rows). Older extracts predate some measures, so only these
+    count as missing when absent.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT m.key
+            FROM gold.nh_extract_validation v
+            CROSS JOIN LATERAL jsonb_each_text(v.crid_measure_facilities) m
+            WHERE v.extract_id < %s AND m.value::int > 0
+        """, (extract_id,))
+        return {row[0] for row in cur.fetchall()}
+
+
+def validation_errors(profile: Dict, gold_mds: int, gold_claims: int,
+                      expected_crid_codes: Optional[Set[str]] = None) -> List[str]:
+    """
+    Problems with one extract (empty if it passes). A CRID measure counts as
+    missing only if it is in expected_crid_codes (all six when None).
+    """
+    errors = []
+    if profile['mds_duplicate_keys'] or profile['claims_duplicate_keys']:
+        errors.append(
+            f"Duplicates found: MDS={profile['mds_duplicate_keys']}, Claims={profile['claims_duplicate_keys']}"
+        )
+    if gold_mds != profile['mds_rows'] or gold_claims != profile['claims_rows']:
+        errors.append(
+            f"Gold row count mismatch: MDS {gold_mds:,}/{profile['mds_rows']:,}, "
+            f"Claims {gold_claims:,}/{profile['claims_rows']:,}"
+        )
+    for code in CRID_MDS_CODES + CRID_CLAIMS_CODES:
+        if expected_crid_codes is not None and code not in expected_crid_codes:
+            continue
+        if not profile['crid_measure_facilities'].get(code):
+            errors.append(f"CRID measure {code} missing")
+    return errors
+
+
+def save_extract_validation(conn, extract_id: str, profile: Dict, gold_mds: int, gold_claims: int,
+                            source: str = 'ingest') -> List[str]:
+    """Store the validation row for one extract. Returns its errors."""
+    errors = validation_errors(profile, gold_mds, gold_claims, introduced_crid_measures(conn, extract_id))
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO gold.nh_extract_validation (
+                extract_id, mds_rows, claims_rows, mds_facilities, claims_facilities,
+                mds_duplicate_keys, claims_duplicate_keys, crid_measure_facilities,
+                complete_crid_facilities, gold_mds_rows, gold_claims_rows, errors, source,
+                measure_profile, validated_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
+            ON CONFLICT (extract_id) DO UPDATE SET
+                mds_rows = EXCLUDED.mds_rows,
+                claims_rows = EXCLUDED.claims_rows,
+                mds_facilities = EXCLUDED.mds_facilities,
+                claims_facilities = EXCLUDED.claims_facilities,
+                mds_duplicate_keys = EXCLUDED.mds_duplicate_keys,
+                claims_duplicate_keys = EXCLUDED.claims_duplicate_keys,
+                crid_measure_facilities = EXCLUDED.crid_measure_facilities,
+                complete_crid_facilities = EXCLUDED.complete_crid_facilities,
+                gold_mds_rows = EXCLUDED.gold_mds_rows,
+                gold_claims_rows = EXCLUDED.gold_claims_rows,
+                errors = EXCLUDED.errors,
+                source = EXCLUDED.source,
+                measure_profile = EXCLUDED.measure_profile,
+                validated_at = NOW()
+        """, (
+            extract_id, profile['mds_rows'], profile['claims_rows'],
+            profile['mds_facilities'], profile['claims_facilities'],
+            profile['mds_duplicate_keys'], profile['claims_duplicate_keys'],
+            json.dumps(profile['crid_measure_facilities']), profile['complete_crid_facilities'],
+            gold_mds, gold_claims, errors, source,
+            json.dumps(profile['measure_profile']) if profile.get('measure_profile') else None
+        ))
+    conn.commit()
+    return errors
+
+
+def backfill_extract_validation(conn) -> int:
+    """Validate (from gold) every extract that has no stored validation row. Returns how many."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT e.extract_id
+            FROM gold.nh_quality_extracts e
+            LEFT JOIN gold.nh_extract_validation v ON v.extract_id = e.extract_id
+            WHERE v.extract_id IS NULL
+            ORDER BY e.extract_id
+        """)
+        missing = [row[0] for row in cur.fetchall()]
+
+    for extract_id in missing:
+        profile = profile_extract_from_gold(conn, extract_id)
+        save_extract_validation(conn, extract_id, profile, profile['mds_rows'], profile['claims_rows'],
+                                source='gold')
+        logger.info(f"[{extract_id}] Validated from gold tables")
+    return len(missing)
+
+
+# ============================================================================
+# QUANTILE SKETCHES
+# ============================================================================
+
+# Mergeable quantile sketches (DDSketch, see quantile_sketch.py) of the
+# benchmark scores per measure, extract and state (state = 'US' is national)
+SKETCHES_DDL = """
+    CREATE TABLE IF NOT EXISTS gold.nh_quality_sketches (
+        extract_id VARCHAR(6) NOT NULL,
+        measure_code VARCHAR(10) NOT NULL,
+        state VARCHAR(2) NOT NULL,
+        value_count INTEGER NOT NULL,             -- Non-null scores in the sketch
+        sketch JSONB NOT NULL,
+        PRIMARY KEY (measure_code, extract_id, state)
+    );
+    COMMENT ON TABLE gold.nh_quality_sketches IS
+        'Quantile sketches (1% relative error) per measure, extract and state; merge across states or months for percentile and rank lookups';
+"""
+
+# measure type -> score column sketched (as in gold.nh_quality_benchmarks)
+SKETCH_SCORES = {'mds': 'four_quarter_avg', 'claims': 'adjusted_score'}
+
+
+def create_sketches_table(conn):
+    """Create gold.nh_quality_sketches if missing (databases set up before it existed)."""
+    with conn.cursor() as cur:
+        cur.execute(SKETCHES_DDL)
+    conn.commit()
+
+
+def frame_sketches(df: pd.DataFrame, score_column: str) -> List[Tuple[str, str, Dict]]:
+    """
+    (measure_code, state, sketch) per measure × state of a parsed or gold
+    frame, plus state = 'US' per measure. State is LEFT(ccn, 2), as in gold.
+    """
+    scores = pd.DataFrame({
+        'measure_code': df['measure_code'],
+        'state': df['ccn'].str[:2],
+        'score': pd.to_numeric(df[score_column], errors='coerce'),
+    }).dropna()
+
+    sketches = []
+    for measure_code, measure in scores.groupby('measure_code', sort=True):
+        state_sketches = []
+        for state, group in measure.groupby('state', sort=True):
+            sketch = build_sketch(group['score'].to_numpy())
+            state_sketches.append(sketch)
+            sketches.append((measure_code, state, sketch))
+        sketches.append((measure_code, NATIONAL, merge_sketches(state_sketches)))
+    return sketches
+
+
+def save_extract_sketches(conn, extract_id: str, sketches: List[Tuple[str, str, Dict]], commit: bool = True) -> int:
+    """Replace one extract's rows in gold.nh_quality_sketches. Returns rows written."""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM gold.nh_quality_sketches WHERE extract_id = %s", (extract_id,))
+        cur.executemany("""
+            INSERT INTO gold.nh_quality_sketches (extract_id, measure_code, state, value_count, sketch)
+            VALUES (%s, %s, %s, %s, %s)
+        """, [(extract_id, measure_code, state, sketch['count'], json.dumps(sketch))
+              for measure_code, state, sketch in sketches])
+    if commit:
+        conn.commit()
+    return len(sketches)
+
+
+def rebuild_sketches(conn) -> int:
+    """Backfill gold.nh_quality_sketches from the gold tables, one extract at a time. Returns rows written."""
+    create_sketches_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT extract_id FROM gold.nh_quality_extracts ORDER BY extract_id")
+        extract_ids = [row[0] for row in cur.fetchall()]
+
+    total = 0
+    for extract_id in extract_ids:
+        sketches = []
+        for measure_type, score_column in SKETCH_SCORES.items():
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"SELECT ccn, measure_code, {score_column}::float8 FROM gold.nh_quality_{measure_type} "
+                    f"WHERE extract_id = %s",
+                    (extract_id,)
+                )
+                df = pd.DataFrame(cur.fetchall(), columns=['ccn', 'measure_code', score_column])
+            if not df.empty:
+                sketches.extend(frame_sketches(df, score_column))
+        rows = save_extract_sketches(conn, extract_id, sketches)
+        logger.info(f"[{extract_id}] Sketches: {rows:,} rows")
+        total += rows
+    return total
 
 
 # ============================================================================
 # WORKER FUNCTION FOR PARALLEL PROCESSING
 # ============================================================================
 
+def parse_month(
+    mds_file: Optional[Tuple[Path, str]],
+    claims_file: Optional[Tuple[Path, str]]
+) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame], Dict]:
+    """Parse and profile one month's files in memory: (mds_df, claims_df, combined profile)."""
+    mds_df = claims_df = mds_profile = claims_profile = None
+    if mds_file:
+        filepath, filename = mds_file
+        mds_df = load_mds_dataframe(filepath, filename)
+        mds_profile = profile_frame(mds_df, 'mds')
+        if mds_profile['duplicate_keys']:
+            raise ValueError(f"{filename}: {mds_profile['duplicate_keys']:,} duplicate (ccn, measure_code) rows")
+    if claims_file:
+        filepath, filename = claims_file
+        claims_df = load_claims_dataframe(filepath, filename)
+        claims_profile = profile_frame(claims_df, 'claims')
+        if claims_profile['duplicate_keys']:
+            raise ValueError(f"{filename}: {claims_profile['duplicate_keys']:,} duplicate (ccn, measure_code) rows")
+    return mds_df, claims_df, combine_profiles(mds_profile, claims_profile)
+
+
+def _month_result(extract_id: str) -> Dict:
+    """Empty process_month() result for one month."""
+    return {
+        'extract_id': extract_id,
+        'mds_rows': 0,
+        'claims_rows': 0,
+        'gold_mds': 0,
+        'gold_claims': 0,
+        'skipped': False,
+        'error': None,
+        'validation_errors': []
+    }
+
+
+def load_months_in_order(
+    executor: concurrent.futures.Executor,
+    workers: int,
+    db_url: str,
+    extract_ids: List[str],
+    month_files,
+    force: Set[str],
+    allow_anomalies: bool = False,
+    month_bytes=None
+) -> List[Dict]:
+    """
+    Load months on `executor`, parsing each month's files once.
+
+    Months are parsed ahead on the pool while the months parsed but not yet
+    decided add up to no more than `workers` times the largest month (by
+    month_bytes(extract_id), or one month each), which bounds the frames held
+    in memory. In extract order, each month's anomaly baseline is fixed as a
+    chronological load would see it: the stored profile of the latest earlier
+    extract, or the new profile of an earlier month in this load if it passes
+    its own check. The month's gold write is then queued with its parsed frames.
+    Writes finish in any order, but every verdict matches a sequential run.
+
+    month_files(extract_id) returns that month's (mds_file, claims_file);
+    months in `force` replace existing gold data. Returns the process_month()
+    results in extract order.
+    """
+    conn = get_connection(db_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT extract_id, measure_profile
+                FROM gold.nh_extract_validation
+                WHERE measure_profile IS NOT NULL
+            """)
+            profiles = dict(cur.fetchall())
+    finally:
+        conn.close()
+
+    def parse(extract_id: str):
+        return parse_month(*month_files(extract_id))
+
+    ordered = sorted(extract_ids)
+    sizes = {eid: month_bytes(eid) if month_bytes else 1 for eid in ordered}
+    budget = max(workers, 1) * max(sizes.values(), default=1)
+    parses = {}
+    queued = 0
+
+    writes = []
+    for extract_id in ordered:
+        while queued < len(ordered) and (
+                not parses or sum(sizes[eid] for eid in parses) + sizes[ordered[queued]] <= budget):
+            parses[ordered[queued]] = executor.submit(parse, ordered[queued])
+            queued += 1
+        try:
+            parsed = parses.pop(extract_id).result()
+        except Exception as e:
+            logger.error(f"[{extract_id}] Error: {e}")
+            result = _month_result(extract_id)
+            result['error'] = str(e)
+            writes.append(result)
+            continue
+
+        earlier = [eid for eid in profiles if eid < extract_id]
+        previous_id = max(earlier) if earlier else None
+        # As stored in gold.nh_extract_validation
+        current = json.loads(json.dumps(parsed[2]['measure_profile']))
+        if previous_id is None or allow_anomalies or not detect_anomalies(current, profiles[previous_id]):
+            profiles[extract_id] = current
+
+        writes.append(executor.submit(
+            process_month, db_url, extract_id, None, None, extract_id in force, allow_anomalies,
+            (previous_id, profiles.get(previous_id)), parsed
+        ))
+
+    return [w if isinstance(w, dict) else w.result() for w in writes]
+
+
 def process_month(
     db_url: str,
     extract_id: str,
     mds_file: Optional[Tuple[Path, str]],
     claims_file: Optional[Tuple[Path, str]],
-    force: bool = False
+    force: bool = False,
+    allow_anomalies: bool = False,
+    baseline: Optional[Tuple[Optional[str], Optional[Dict]]] = None,
+    parsed: Optional[Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame], Dict]] = None
 ) -> Dict:
     """
     Process a single month's data. Safe for parallel execution.
     Each worker uses its own connection and processes its own extract_id.
+    mds_file / claims_file are (path or binary buffer, filename).
+
+    Both files are parsed and profiled before anything is written; a month
+    whose profile is anomalous against the previous extract is not loaded
+    (and, with force, the existing gold data is kept) unless allow_anomalies.
+    The previous extract's profile is read from the database, or taken from
+    `baseline` when months load in parallel (load_months_in_order(), which
+    also passes the already `parsed` parse_month() result instead of files).
     """
-    result = {
-        'extract_id': extract_id,
-        'mds_rows': 0,
-        'claims_rows': 0,
-        'gold_mds': 0,
-        'gold_claims': 0,
-        'skipped': False,
-        'error': None
-    }
+    result = _month_result(extract_id)
 
     try:
         conn = get_connection(db_url)
@@ -524,6 +1401,26 @@ def process_month(
 
         logger.info(f"[{extract_id}] Processing...")
 
+        # Parse and profile both files in memory before touching the database
+        if parsed is None:
+            parsed = parse_month(mds_file, claims_file)
+        mds_df, claims_df, profile = parsed
+
+        # Compare with the previous extract's profile; block the month if it looks broken
+        if baseline is None:
+            previous_id, previous = load_previous_profile(conn, extract_id)
+        else:
+            previous_id, previous = baseline
+        if previous:
+            anomalies = detect_anomalies(profile['measure_profile'], previous)
+            for anomaly in anomalies:
+                logger.warning(f"[{extract_id}] Anomaly vs {previous_id}: {anomaly}")
+            if anomalies and not allow_anomalies:
+                raise ExtractAnomalyError(
+                    f"{len(anomalies)} anomal{'y' if len(anomalies) == 1 else 'ies'} vs {previous_id}; "
+                    f"not loaded (use --allow-anomalies to load anyway)"
+                )
+
         # Clear staging for this extract
         delete_extract_from_staging(conn, extract_id)
 
@@ -532,26 +1429,40 @@ def process_month(
             delete_extract_from_gold(conn, extract_id)
 
         # Load MDS
-        if mds_file:
-            filepath, filename = mds_file
-            df = load_mds_dataframe(filepath, filename)
-            result['mds_rows'] = copy_mds_to_staging(conn, df)
+        if mds_df is not None:
+            result['mds_rows'] = copy_mds_to_staging(conn, mds_df)
             logger.info(f"[{extract_id}] MDS: {result['mds_rows']:,} rows")
 
         # Load Claims
-        if claims_file:
-            filepath, filename = claims_file
-            df = load_claims_dataframe(filepath, filename)
-            result['claims_rows'] = copy_claims_to_staging(conn, df)
+        if claims_df is not None:
+            result['claims_rows'] = copy_claims_to_staging(conn, claims_df)
             logger.info(f"[{extract_id}] Claims: {result['claims_rows']:,} rows")
 
+        # Percentile sketches from the parsed files; committed with the gold transform
+        sketches = []
+        if mds_df is not None:
+            sketches.extend(frame_sketches(mds_df, SKETCH_SCORES['mds']))
+        if claims_df is not None:
+            sketches.extend(frame_sketches(claims_df, SKETCH_SCORES['claims']))
+        save_extract_sketches(conn, extract_id, sketches, commit=False)
+
         # Transform to gold
         result['gold_mds'], result['gold_claims'] = transform_extract_to_gold(conn, extract_id)
         logger.info(f"[{extract_id}] Gold: {result['gold_mds']:,} MDS, {result['gold_claims']:,} Claims")
 
+        # Store this extract's validation
+        result['validation_errors'] = save_extract_validation(
+            conn, extract_id, profile, result['gold_mds'], result['gold_claims']
+        )
+        for problem in result['validation_errors']:
+            logger.warning(f"[{extract_id}] Validation: {problem}")
+
         # Clean up staging for this extract (optional, saves space)
         delete_extract_from_staging(conn, extract_id)
 
+    except ExtractAnomalyError as e:
+        logger.error(f"[{extract_id}] {e}")
+        result['error'] = str(e)
     except Exception as e:
         import traceback
         logger.error(f"[{extract_id}] Error: {e}\n{traceback.format_exc()}")
@@ -565,7 +1476,7 @@ def process_month(
 # ============================================================================
 
 def run_schema_setup(conn):
-    """Run schema setup SQL."""
+    """Run schema setup SQL, then the DDL of the tables the scripts define themselves."""
     schema_path = Path(__file__).parent / 'schema.sql'
     if not schema_path.exists():
         logger.error(f"Schema file not found: {schema_path}")
@@ -579,6 +1490,13 @@ def run_schema_setup(conn):
         cur.execute(schema_sql)
     conn.commit()
 
+    create_extract_validation_table(conn)
+    create_crid_inputs_table(conn)
+    create_benchmarks_table(conn)
+    create_sketches_table(conn)
+    from composite_materialize import create_definitions_table
+    create_definitions_table(conn)
+
     logger.info("Schema setup complete")
     return True
 
@@ -642,6 +1560,159 @@ def recreate_staging_indexes(conn):
     logger.info("Staging indexes recreated")
 
 
+# ============================================================================
+# GOLD MAINTENANCE
+# ============================================================================
+
+# table -> (index the heap is clustered on, BRIN index name)
+# Clustering on (extract_id, ccn, ...) keeps each extract contiguous, so the
+# BRIN index on (extract_id, as_of_date) prunes extract ranges to their own
+# blocks, and a (ccn, extract_id) lookup touches one heap page per month
+# instead of rows scattered by DELETE + INSERT reloads.
+GOLD_LAYOUT = {
+    'gold.nh_quality_mds': ('gold_mds_unique', 'idx_gold_mds_extract_brin'),
+    'gold.nh_quality_claims': ('gold_claims_unique', 'idx_gold_claims_extract_brin'),
+    'gold.nh_crid_inputs': ('nh_crid_inputs_pkey', 'idx_gold_crid_inputs_extract_brin'),
+}
+
+# Months loaded in one run after which maintenance is worth scheduling
+MAINTAIN_AFTER_MONTHS = 6
+
+# Benchmark lookups (run against gold.nh_quality_mds) for the I/O report
+MAINTENANCE_QUERIES = {
+    'facility_history': """
+        SELECT extract_id, measure_code, four_quarter_avg
+        FROM gold.nh_quality_mds WHERE ccn = %(ccn)s
+    """,
+    'facility_month': """
+        SELECT measure_code, four_quarter_avg
+        FROM gold.nh_quality_mds WHERE ccn = %(ccn)s AND extract_id = %(extract_id)s
+    """,
+    'extract_range': """
+        SELECT measure_code, AVG(four_quarter_avg)
+        FROM gold.nh_quality_mds WHERE extract_id BETWEEN %(range_start)s AND %(range_end)s
+        GROUP BY measure_code
+    """,
+    'as_of_date_range': """
+        SELECT COUNT(*)
+        FROM gold.nh_quality_mds WHERE as_of_date >= %(range_date)s
+    """,
+}
+
+
+def gold_sizes(conn) -> Dict[str, Tuple[int, int]]:
+    """{table: (heap bytes, index bytes)} for the maintained gold tables."""
+    sizes = {}
+    with conn.cursor() as cur:
+        for table in GOLD_LAYOUT:
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+            if cur.fetchone()[0]:
+                cur.execute("SELECT pg_table_size(%s), pg_indexes_size(%s)", (table, table))
+                sizes[table] = cur.fetchone()
+    return sizes
+
+
+def maintenance_parameters(conn) -> Optional[Dict]:
+    """Lookup parameters for the benchmark queries: a sample facility and the last 12 extracts."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT extract_id, as_of_date FROM gold.nh_quality_extracts ORDER BY extract_id DESC LIMIT 12")
+        extracts = cur.fetchall()
+        if not extracts:
+            return None
+        cur.execute("SELECT ccn FROM gold.nh_quality_mds WHERE extract_id = %s ORDER BY ccn LIMIT 1 OFFSET 100",
+                    (extracts[0][0],))
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return {
+        'ccn': row[0],
+        'extract_id': extracts[0][0],
+        'range_start': extracts[-1][0],
+        'range_end': extracts[0][0],
+        'range_date': extracts[-1][1],
+    }
+
+
+def measure_query_io(conn, params: Dict) -> Dict[str, int]:
+    """Shared buffers touched (hit + read) per benchmark query, from EXPLAIN (ANALYZE, BUFFERS)."""
+    io = {}
+    with conn.cursor() as cur:
+        for name, query in MAINTENANCE_QUERIES.items():
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+            plan = cur.fetchone()[0][0]['Plan']
+            io[name] = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+    conn.rollback()
+    return io
+
+
+def vacuum_analyze(conn, tables: List[str]):
+    """VACUUM ANALYZE (sets the visibility map for index-only scans)."""
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                cur.execute(f"VACUUM ANALYZE {table}")
+    finally:
+        conn.autocommit = False
+
+
+def maintain_gold(conn) -> bool:
+    """
+    Rewrite the gold tables in clustered order and add BRIN indexes on
+    (extract_id, as_of_date), then print sizes and benchmark I/O before and
+    after. CLUSTER holds an exclusive lock on each table while it runs;
+    schedule this after backfills, not during app traffic.
+    """
+    print("\n" + "=" * 70)
+    print("GOLD MAINTENANCE")
+    print("=" * 70)
+
+    tables = list(gold_sizes(conn))
+    if not tables:
+        print("\nNo gold tables found.")
+        return False
+
+    vacuum_analyze(conn, tables)
+    params = maintenance_parameters(conn)
+    sizes_before = gold_sizes(conn)
+    io_before = measure_query_io(conn, params) if params else {}
+
+    for table in tables:
+        cluster_index, brin_index = GOLD_LAYOUT[table]
+        start = datetime.now()
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                CREATE INDEX IF NOT EXISTS {brin_index} ON {table}
+                USING brin (extract_id, as_of_date) WITH (pages_per_range = 32)
+            """)
+            cur.execute(f"ALTER TABLE {table} CLUSTER ON {cluster_index}")
+            cur.execute(f"CLUSTER {table}")
+        conn.commit()
+        print(f"\n  {table}: clustered on {cluster_index} in {(datetime.now() - start).total_seconds():.1f}s")
+
+    vacuum_analyze(conn, tables)
+    sizes_after = gold_sizes(conn)
+    io_after = measure_query_io(conn, params) if params else {}
+
+    def mb(n: int) -> str:
+        return f"{n / 1024 / 1024:.1f} MB"
+
+    print(f"\n  {'Table / index size':<44}{'before':>12}{'after':>12}")
+    for table in tables:
+        print(f"  {table + ' heap':<44}{mb(sizes_before[table][0]):>12}{mb(sizes_after[table][0]):>12}")
+        print(f"  {table + ' indexes':<44}{mb(sizes_before[table][1]):>12}{mb(sizes_after[table][1]):>12}")
+
+    if params:
+        print(f"\n  {'Benchmark query (8 kB buffers)':<44}{'before':>12}{'after':>12}{'saved':>9}")
+        for name in MAINTENANCE_QUERIES:
+            before, after = io_before[name], io_after[name]
+            saved = f"{1 - after / before:.0%}" if before else '-'
+            print(f"  {name:<44}{before:>12,}{after:>12,}{saved:>9}")
+    print("\n" + "=" * 70 + "\n")
+    return True
+
+
 # ============================================================================
 # POST-INGESTION VALIDATION
 # ============================================================================
@@ -650,6 +1721,11 @@ def run_validation(conn) -> bool:
     """
     Run post-ingestion validation and print summary.
     Returns True if validation passes, False otherwise.
+
+    Reads the per-extract rows of gold.nh_extract_validation (written while
+    each extract is ingested) instead of scanning the gold tables; only
+    extracts without a stored row are validated against gold, one extract
+    at a time.
     """
     print("\n" + "=" * 70)
     print("POST-INGESTION VALIDATION")
@@ -657,21 +1733,27 @@ def run_validation(conn) -> bool:
 
     errors = []
 
+    create_extract_validation_table(conn)
+    backfilled = backfill_extract_validation(conn)
+
     with conn.cursor() as cur:
         # 1. Count extracts
         cur.execute("SELECT COUNT(*) FROM gold.nh_quality_extracts")
         extract_count = cur.fetchone()[0]
         print(f"\n[1] EXTRACTS LOADED: {extract_count}")
+        if backfilled:
+            print(f"    Validated {backfilled} extract(s) without stored results")
         if extract_count == 0:
             errors.append("No extracts loaded!")
         elif extract_count < 60:
             print(f"    WARNING: Expected ~60 extracts, found {extract_count}")
 
-        # 2. Total row counts
-        cur.execute("SELECT COUNT(*) FROM gold.nh_quality_mds")
-        mds_total = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM gold.nh_quality_claims")
-        claims_total = cur.fetchone()[0]
+        # 2. Total row counts (from the per-extract counts, not a table scan)
+        cur.execute("""
+            SELECT COALESCE(SUM(mds_row_count), 0), COALESCE(SUM(claims_row_count), 0)
+            FROM gold.nh_quality_extracts
+        """)
+        mds_total, claims_total = cur.fetchone()
         print(f"\n[2] TOTAL ROWS:")
         print(f"    MDS:    {mds_total:>12,}")
         print(f"    Claims: {claims_total:>12,}")
@@ -698,105 +1780,50 @@ def run_validation(conn) -> bool:
             for row in rows[-5:]:
                 print(f"    {row[0]} ({row[1]}): MDS={row[2]:,}, Claims={row[3]:,}")
 
-        # 4. Check for duplicates
-        print(f"\n[4] DUPLICATE CHECK:")
         cur.execute("""
-            SELECT COUNT(*) FROM (
-                SELECT extract_id, ccn, measure_code, COUNT(*) as cnt
-                FROM gold.nh_quality_mds
-                GROUP BY extract_id, ccn, measure_code
-                HAVING COUNT(*) > 1
-            ) dups
+            SELECT v.extract_id, v.mds_duplicate_keys, v.claims_duplicate_keys,
+                   v.crid_measure_facilities, v.complete_crid_facilities, v.errors
+            FROM gold.nh_extract_validation v
+            JOIN gold.nh_quality_extracts e ON e.extract_id = v.extract_id
+            ORDER BY v.extract_id
         """)
-        mds_dups = cur.fetchone()[0]
-        cur.execute("""
-            SELECT COUNT(*) FROM (
-                SELECT extract_id, ccn, measure_code, COUNT(*) as cnt
-                FROM gold.nh_quality_claims
-                GROUP BY extract_id, ccn, measure_code
-                HAVING COUNT(*) > 1
-            ) dups
-        """)
-        claims_dups = cur.fetchone()[0]
-        if mds_dups == 0 and claims_dups == 0:
-            print("    No duplicates found. OK")
-        else:
-            print(f"    WARNING: MDS duplicates={mds_dups}, Claims duplicates={claims_dups}")
-            errors.append(f"Duplicates found: MDS={mds_dups}, Claims={claims_dups}")
+        validations = cur.fetchall()
+
+    # 4. Check for duplicates (counted while each file was parsed)
+    print(f"\n[4] DUPLICATE CHECK:")
+    mds_dups = sum(v[1] or 0 for v in validations)
+    claims_dups = sum(v[2] or 0 for v in validations)
+    if mds_dups == 0 and claims_dups == 0:
+        print("    No duplicates found. OK")
+    else:
+        print(f"    WARNING: MDS duplicates={mds_dups}, Claims duplicates={claims_dups}")
+
+    # 5. CRID measures availability (latest extract)
+    print(f"\n[5] CRID MEASURES (latest extract):")
+    latest = validations[-1] if validations else None
+    measure_facilities = latest[3] if latest else {}
+
+    crid_measures = {
+        '410': 'Falls with major injury',
+        '453': 'Pressure ulcers',
+        '407': 'UTI prevalence',
+        '409': 'Physical restraints',
+        '551': 'Hospitalizations',
+        '552': 'ED visits'
+    }
+    for code, desc in crid_measures.items():
+        count = measure_facilities.get(code, 0)
+        status = "OK" if count > 0 else "MISSING"
+        print(f"    {code} ({desc}): {count:,} facilities [{status}]")
 
-        # 5. CRID measures availability (latest extract)
-        print(f"\n[5] CRID MEASURES (latest extract):")
-        cur.execute("""
-            WITH latest AS (
-                SELECT MAX(extract_id) as extract_id FROM gold.nh_quality_extracts
-            )
-            SELECT
-                m.measure_code,
-                COUNT(DISTINCT m.ccn) as facilities
-            FROM gold.nh_quality_mds m
-            JOIN latest l ON m.extract_id = l.extract_id
-            WHERE m.measure_code IN ('410', '453', '407', '409')
-            GROUP BY m.measure_code
-            ORDER BY m.measure_code
-        """)
-        mds_measures = {row[0]: row[1] for row in cur.fetchall()}
-        cur.execute("""
-            WITH latest AS (
-                SELECT MAX(extract_id) as extract_id FROM gold.nh_quality_extracts
-            )
-            SELECT
-                c.measure_code,
-                COUNT(DISTINCT c.ccn) as facilities
-            FROM gold.nh_quality_claims c
-            JOIN latest l ON c.extract_id = l.extract_id
-            WHERE c.measure_code IN ('551', '552')
-            GROUP BY c.measure_code
-            ORDER BY c.measure_code
-        """)
-        claims_measures = {row[0]: row[1] for row in cur.fetchall()}
-
-        crid_measures = {
-            '410': 'Falls with major injury',
-            '453': 'Pressure ulcers',
-            '407': 'UTI prevalence',
-            '409': 'Physical restraints',
-            '551': 'Hospitalizations',
-            '552': 'ED visits'
-        }
-        for code, desc in crid_measures.items():
-            count = mds_measures.get(code) or claims_measures.get(code, 0)
-            status = "OK" if count > 0 else "MISSING"
-            print(f"    {code} ({desc}): {count:,} facilities [{status}]")
-            if count == 0:
-                errors.append(f"CRID measure {code} missing")
-
-        # 6. Facilities with complete CRID data
-        cur.execute("""
-            WITH latest AS (
-                SELECT MAX(extract_id) as extract_id FROM gold.nh_quality_extracts
-            ),
-            crid_mds AS (
-                SELECT DISTINCT ccn
-                FROM gold.nh_quality_mds m
-                JOIN latest l ON m.extract_id = l.extract_id
-                WHERE m.measure_code IN ('410', '453', '407', '409')
-                  AND m.has_suppression = FALSE
-                GROUP BY ccn
-                HAVING COUNT(DISTINCT measure_code) = 4
-            ),
-            crid_claims AS (
-                SELECT DISTINCT ccn
-                FROM gold.nh_quality_claims c
-                JOIN latest l ON c.extract_id = l.extract_id
-                WHERE c.measure_code IN ('551', '552')
-                  AND c.has_suppression = FALSE
-                GROUP BY ccn
-                HAVING COUNT(DISTINCT measure_code) = 2
-            )
-            SELECT COUNT(*) FROM crid_mds m JOIN crid_claims c ON m.ccn = c.ccn
-        """)
-        complete_crid = cur.fetchone()[0]
-        print(f"\n[6] FACILITIES WITH COMPLETE CRID DATA: {complete_crid:,}")
+    # 6. Facilities with complete CRID data
+    complete_crid = latest[4] if latest else 0
+    print(f"\n[6] FACILITIES WITH COMPLETE CRID DATA: {complete_crid:,}")
+
+    # Per-extract problems recorded at ingest time
+    for extract_id, _, _, _, _, extract_errors in validations:
+        for problem in extract_errors or []:
+            errors.append(f"{extract_id}: {problem}")
 
     # Summary
     print("\n" + "=" * 70)
@@ -840,6 +1867,20 @@ Examples:
     parser.add_argument('--setup-schema', action='store_true', help='Run schema setup only')
     parser.add_argument('--validate', action='store_true', help='Run post-ingestion validation')
     parser.add_argument('--skip-unlogged', action='store_true', help='Skip UNLOGGED optimization')
+    parser.add_argument('--allow-anomalies', action='store_true',
+                        help='Load months whose profile is anomalous against the previous extract')
+    parser.add_argument('--rebuild-crid-inputs', action='store_true',
+                        help='Backfill gold.nh_crid_inputs from the gold tables and exit')
+    parser.add_argument('--rebuild-benchmarks', action='store_true',
+                        help='Backfill gold.nh_quality_benchmarks from the gold tables and exit')
+    parser.add_argument('--rebuild-sketches', action='store_true',
+                        help='Backfill gold.nh_quality_sketches from the gold tables and exit')
+    parser.add_argument('--maintain-gold', action='store_true',
+                        help='Cluster gold tables, add BRIN indexes and report I/O (after ingestion with --data-dir)')
+    parser.add_argument('--cube-dir', help='Update the memory-mapped measure cube (measure_cube.py) after ingestion')
+    parser.add_argument('--manifest', help=f'File manifest path (default: <data-dir>/{MANIFEST_FILE})')
+    parser.add_argument('--rescan', action='store_true',
+                        help='List every directory instead of trusting unchanged directory mtimes')
 
     args = parser.parse_args()
 
@@ -857,6 +1898,28 @@ Examples:
                 return 0
             return 1
 
+        # Handle --rebuild-crid-inputs
+        if args.rebuild_crid_inputs:
+            rows = rebuild_crid_inputs(conn)
+            logger.info(f"Rebuilt gold.nh_crid_inputs: {rows:,} rows")
+            return 0
+
+        # Handle --rebuild-benchmarks
+        if args.rebuild_benchmarks:
+            rows = rebuild_benchmarks(conn)
+            logger.info(f"Rebuilt gold.nh_quality_benchmarks: {rows:,} rows")
+            return 0
+
+        # Handle --rebuild-sketches
+        if args.rebuild_sketches:
+            rows = rebuild_sketches(conn)
+            logger.info(f"Rebuilt gold.nh_quality_sketches: {rows:,} rows")
+            return 0
+
+        # Handle --maintain-gold (standalone; with --data-dir it runs after ingestion)
+        if args.maintain_gold and not args.data_dir:
+            return 0 if maintain_gold(conn) else 1
+
         # Handle --validate
         if args.validate:
             success = run_validation(conn)
@@ -870,22 +1933,18 @@ Examples:
             logger.error(f"Data directory not found: {args.data_dir}")
             return 1
 
-        # Discover files
+        # Discover files (directories and files unchanged since the last run come from the manifest)
         logger.info(f"Discovering files in: {args.data_dir}")
-        mds_files, claims_files = discover_quality_files(args.data_dir)
-        logger.info(f"Found {len(mds_files)} MDS files and {len(claims_files)} Claims files")
+        manifest_path = Path(args.manifest) if args.manifest else Path(args.data_dir) / MANIFEST_FILE
+        manifest = scan_quality_files(args.data_dir, load_file_manifest(manifest_path), args.rescan)
+        save_file_manifest(manifest_path, manifest)
 
         # Build month map: extract_id -> (mds_file, claims_file)
-        months = {}
-        for filepath, filename, extract_id in mds_files:
-            if extract_id not in months:
-                months[extract_id] = {'mds': None, 'claims': None}
-            months[extract_id]['mds'] = (filepath, filename)
-
-        for filepath, filename, extract_id in claims_files:
-            if extract_id not in months:
-                months[extract_id] = {'mds': None, 'claims': None}
-            months[extract_id]['claims'] = (filepath, filename)
+        months = manifest_months(args.data_dir, manifest)
+        logger.info(
+            f"Found {sum(1 for m in months.values() if m['mds'])} MDS files and "
+            f"{sum(1 for m in months.values() if m['claims'])} Claims files"
+        )
 
         # Sort by extract_id
         extract_ids = sorted(months.keys())
@@ -898,15 +1957,34 @@ Examples:
         if not args.skip_unlogged:
             make_staging_unlogged(conn)
 
-        # Check what's already loaded
+        create_crid_inputs_table(conn)
+        create_benchmarks_table(conn)
+        create_sketches_table(conn)
+        create_extract_validation_table(conn)
+
+        # Check what's already loaded; a loaded month whose files changed since
+        # it was ingested (different hashes) is reloaded
         loaded = get_loaded_extracts(conn)
-        to_process = [eid for eid in extract_ids if args.force or eid not in loaded]
+        ingested = manifest['ingested']
+        changed = set()
+        for eid in extract_ids:
+            if eid not in loaded:
+                continue
+            if eid not in ingested:
+                ingested[eid] = months[eid]['hashes']
+            elif ingested[eid] != months[eid]['hashes']:
+                changed.add(eid)
+        save_file_manifest(manifest_path, manifest)
+
+        to_process = [eid for eid in extract_ids if args.force or eid not in loaded or eid in changed]
 
         if not to_process:
             logger.info("All months already loaded. Use --force to reload.")
             return 0
 
         logger.info(f"Months to process: {len(to_process)} (skipping {len(extract_ids) - len(to_process)} already loaded)")
+        if changed:
+            logger.info(f"  Files changed since last load: {', '.join(sorted(changed))}")
 
         # Close main connection before parallel processing
         conn.close()
@@ -923,28 +2001,29 @@ Examples:
                     extract_id,
                     months[extract_id]['mds'],
                     months[extract_id]['claims'],
-                    args.force
+                    args.force or extract_id in changed,
+                    args.allow_anomalies
                 )
                 total_results.append(result)
         else:
-            # Parallel processing
+            # Parallel processing: months are parsed ahead (bounded by file
+            # size) and written in any order, with each anomaly baseline fixed
+            # in extract order
             logger.info(f"Using {args.workers} parallel workers")
             with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
-                futures = {
-                    executor.submit(
-                        process_month,
-                        args.db_url,
-                        extract_id,
-                        months[extract_id]['mds'],
-                        months[extract_id]['claims'],
-                        args.force
-                    ): extract_id
-                    for extract_id in to_process
-                }
-
-                for future in concurrent.futures.as_completed(futures):
-                    result = future.result()
-                    total_results.append(result)
+                total_results = load_months_in_order(
+                    executor, args.workers, args.db_url, to_process,
+                    lambda eid: (months[eid]['mds'], months[eid]['claims']),
+                    set(to_process) if args.force else changed,
+                    args.allow_anomalies,
+                    lambda eid: sum(months[eid]['bytes'].values())
+                )
+
+        # Remember which file versions each month was loaded from
+        for r in total_results:
+            if not r['error'] and not r['skipped']:
+                ingested[r['extract_id']] = months[r['extract_id']]['hashes']
+        save_file_manifest(manifest_path, manifest)
 
         # Summary
         elapsed = (datetime.now() - start_time).total_seconds()
@@ -981,6 +2060,25 @@ Examples:
             logger.warning("Validation found issues - review output above")
             return 1
 
+        loaded_months = len(total_results) - len(skipped)
+        if args.maintain_gold:
+            maintenance_conn = psycopg2.connect(args.db_url)
+            try:
+                maintain_gold(maintenance_conn)
+            finally:
+                maintenance_conn.close()
+        elif loaded_months >= MAINTAIN_AFTER_MONTHS:
+            logger.info(f"Loaded {loaded_months} months; run --maintain-gold to re-cluster the gold tables")
+
+        if args.cube_dir:
+            # Imported here so plain ingestion does not need pyarrow
+            from measure_cube import update_cube
+            cube_conn = psycopg2.connect(args.db_url)
+            try:
+                update_cube(cube_conn, args.cube_dir)
+            finally:
+                cube_conn.close()
+
         logger.info("Ingestion and validation complete!")
         return 0
 
@@ -7,8 +7,19 @@ Materializes metrics.crid_monthly from gold.nh_quality_mds and gold.nh_quality_c
 Usage:
     python materialize_crid.py                    # Full materialization + validation
     python materialize_crid.py --validate         # Validation only (no rebuild)
-    python materialize_crid.py --dry-run          # Show SQL without executing
+    python materialize_crid.py --dry-run          # Print the generated SQL without executing
     python materialize_crid.py --volatility-window 4   # Use 4-month rolling stddev
+    python materialize_crid.py --rolling-windows 3,6,12  # Rolling volatility/mean/trend columns
+    python materialize_crid.py --engine numpy     # In-process NumPy engine (crid_engine.py)
+    python materialize_crid.py --check-equivalence     # Compare NumPy engine with SQL output
+    python materialize_crid.py --incremental      # Only new/changed extracts (monthly refresh)
+    python materialize_crid.py --rollback         # Restore the previous full build
+    python materialize_crid.py --workers 4        # Full rebuild over 4 parallel extract ranges
+    python materialize_crid.py --layout lean      # Float columns, deduplicated indexes
+    python materialize_crid.py --snapshot-dir DIR # Also write the Arrow snapshot (crid_snapshot.py)
+
+Full rebuilds are built in metrics.crid_monthly_shadow, indexed and checked there,
+then swapped in with a rename; the previous table is kept as metrics.crid_monthly_prev.
 
 CRID Formula:
     MDS_Composite = w1×(410) + w2×(453) + w3×(407) + w4×(409)
@@ -30,11 +41,14 @@ Expected output after full 60-month ingestion:
 """
 
 import argparse
+import concurrent.futures
 import logging
 import os
 import sys
 import time
+import uuid
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 import psycopg2
 from psycopg2.extras import RealDictCursor
@@ -65,12 +79,104 @@ def create_schema(conn):
     logger.info("Created metrics schema (if not exists)")
 
 
-def drop_and_create_table(conn):
-    """Drop and recreate metrics.crid_monthly table."""
-    ddl = """
-    DROP TABLE IF EXISTS metrics.crid_monthly CASCADE;
+# Trailing windows (months) for the rolling CRID volatility / mean / trend columns
+DEFAULT_ROLLING_WINDOWS = (3, 6, 12)
+ROLLING_STATS = ('volatility', 'mean', 'trend')
 
-    CREATE TABLE metrics.crid_monthly (
+def month_index_sql(column: str = 'extract_id') -> str:
+    """Calendar month number of an extract_id column, so trends are per month even across reporting gaps."""
+    return f"(LEFT({column}, 4)::int * 12 + RIGHT({column}, 2)::int)"
+
+
+def validate_window(window: int):
+    """Rolling windows need at least two months to mean anything."""
+    if window < 2:
+        raise ValueError(f"window must be at least 2 months, got {window}")
+
+
+def rolling_columns(rolling_windows) -> List[str]:
+    """Column names of the rolling statistics, e.g. crid_volatility_3m, crid_mean_3m, crid_trend_3m."""
+    return [f"crid_{stat}_{window}m" for window in rolling_windows for stat in ROLLING_STATS]
+
+
+def rolling_select_sql(rolling_windows, window_name: str = 'facility_months') -> str:
+    """
+    SELECT-list entries for every rolling statistic. All windows are frames over
+    the same named window (PARTITION BY ccn ORDER BY extract_id), so Postgres
+    computes them in a single sorted pass.
+    """
+    columns = []
+    for window in rolling_windows:
+        frame = f"{window_name} ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW"
+        for stat, expr in (
+            ('volatility', 'STDDEV_POP(crid_value)'),
+            ('mean', 'AVG(crid_value)'),
+            ('trend', f'REGR_SLOPE(crid_value, {month_index_sql()})'),
+        ):
+            columns.append(
+                f"CASE WHEN crid_value IS NOT NULL THEN {expr} OVER ({frame}) END AS crid_{stat}_{window}m"
+            )
+    return ''.join(f",\n            {col}" for col in columns)
+
+
+# Percentile ranks (0-100, over non-NULL values): (column, ranked value, partition)
+PERCENTILE_RANKS = [
+    ('crid_state_pct', 'crid_value', 'state, extract_id'),
+    ('mds_z_state_pct', 'mds_z_score', 'state, extract_id'),
+    ('claims_z_state_pct', 'claims_z_score', 'state, extract_id'),
+    ('crid_national_pct', 'crid_value', 'extract_id'),
+    ('mds_z_national_pct', 'mds_z_score', 'extract_id'),
+    ('claims_z_national_pct', 'claims_z_score', 'extract_id'),
+]
+
+# In-state deciles (1-10, 10 = highest), derived from the percentile: (column, percentile column)
+DECILES = [
+    ('crid_state_decile', 'crid_state_pct'),
+    ('mds_z_state_decile', 'mds_z_state_pct'),
+    ('claims_z_state_decile', 'claims_z_state_pct'),
+]
+
+
+def rank_columns() -> List[str]:
+    """Column names of the percentile and decile ranks, in table order."""
+    return [col for col, _, _ in PERCENTILE_RANKS] + [col for col, _ in DECILES]
+
+
+def rank_select_sql() -> str:
+    """
+    SELECT-list entries for the percentile ranks. NULL values are partitioned
+    off so they neither get a rank nor shift the ranks of the others.
+    """
+    return ''.join(
+        f",\n            CASE WHEN {value} IS NOT NULL THEN 100 * PERCENT_RANK() OVER ("
+        f"PARTITION BY {partition}, {value} IS NULL ORDER BY {value}) END AS {col}"
+        for col, value, partition in PERCENTILE_RANKS
+    )
+
+
+def decile_select_sql() -> str:
+    """SELECT-list entries deriving each decile from its (unrounded) percentile."""
+    return ''.join(
+        f"\n        CASE WHEN {pct} IS NOT NULL THEN LEAST(10, 1 + FLOOR({pct} / 10))::int END,"
+        for _, pct in DECILES
+    )
+
+
+def crid_table_ddl(
+    table: str = 'metrics.crid_monthly',
+    suffix: str = '',
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> str:
+    """
+    CREATE TABLE statement for a CRID monthly table with the given name.
+    `suffix` is appended to the unique constraint name so a shadow table can
+    coexist with the live one in the metrics schema.
+    """
+    rolling_ddl = ''.join(f"\n        {col} NUMERIC(12,6)," for col in rolling_columns(rolling_windows))
+    rank_ddl = ''.join(f"\n        {col} NUMERIC(7,4)," for col, _, _ in PERCENTILE_RANKS)
+    rank_ddl += ''.join(f"\n        {col} SMALLINT," for col, _ in DECILES)
+    return f"""
+    CREATE TABLE {table} (
         id SERIAL PRIMARY KEY,
         ccn VARCHAR(6) NOT NULL,
         extract_id VARCHAR(6) NOT NULL,
@@ -89,6 +195,11 @@ def drop_and_create_table(conn):
         crid_value NUMERIC(12,6),
         crid_volatility NUMERIC(12,6),
 
+        -- Rolling stddev / mean / trend (CRID per month) over trailing windows{rolling_ddl}
+
+        -- Percentile ranks (0-100) within (state, extract_id) and nationally within extract_id,
+        -- and in-state deciles (1-10); NULL where the ranked value is NULL{rank_ddl}
+
         -- Data completeness
         completeness_pct NUMERIC(5,2),           -- 0-100, % of 6 CRID measures present and not suppressed
         measures_present INTEGER,                 -- Count of measures present (0-6)
@@ -115,55 +226,343 @@ def drop_and_create_table(conn):
         -- Metadata
         created_at TIMESTAMP DEFAULT NOW(),
 
-        CONSTRAINT crid_monthly_unique UNIQUE (ccn, extract_id)
+        CONSTRAINT crid_monthly_unique{suffix} UNIQUE (ccn, extract_id)
     );
     """
+
+
+def crid_table_lean_ddl(
+    table: str = 'metrics.crid_monthly',
+    suffix: str = '',
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> str:
+    """
+    Storage-lean variant of crid_table_ddl(): same columns, but float8/float4/
+    smallint instead of NUMERIC, ordered widest-first so rows carry no
+    alignment padding. Values keep ~15 significant digits, well beyond the
+    6 decimals the standard layout stores.
+    """
+    rolling_ddl = ''.join(f"\n        {col} DOUBLE PRECISION," for col in rolling_columns(rolling_windows))
+    pct_ddl = ''.join(f"\n        {col} REAL," for col, _, _ in PERCENTILE_RANKS)
+    decile_ddl = ''.join(f"\n        {col} SMALLINT," for col, _ in DECILES)
+    return f"""
+    CREATE TABLE {table} (
+        -- 8-byte columns
+        mds_composite DOUBLE PRECISION,
+        claims_utilization DOUBLE PRECISION,
+        mds_z_score DOUBLE PRECISION,
+        claims_z_score DOUBLE PRECISION,
+        crid_value DOUBLE PRECISION,
+        crid_volatility DOUBLE PRECISION,{rolling_ddl}
+        measure_410_score DOUBLE PRECISION,
+        measure_453_score DOUBLE PRECISION,
+        measure_407_score DOUBLE PRECISION,
+        measure_409_score DOUBLE PRECISION,
+        measure_551_score DOUBLE PRECISION,
+        measure_552_score DOUBLE PRECISION,
+        state_mds_mean DOUBLE PRECISION,
+        state_mds_stddev DOUBLE PRECISION,
+        state_claims_mean DOUBLE PRECISION,
+        state_claims_stddev DOUBLE PRECISION,
+        created_at TIMESTAMP DEFAULT NOW(),
+
+        -- 4-byte columns
+        id SERIAL PRIMARY KEY,
+        as_of_date DATE NOT NULL,
+        state_facility_count INTEGER,
+        completeness_pct REAL,{pct_ddl}
+
+        -- 2-byte columns
+        measures_present SMALLINT,
+        measures_suppressed SMALLINT,{decile_ddl}
+
+        -- Variable length
+        ccn VARCHAR(6) NOT NULL,
+        extract_id VARCHAR(6) NOT NULL,
+        state VARCHAR(2) NOT NULL,
+        flags TEXT[],
+
+        CONSTRAINT crid_monthly_unique{suffix} UNIQUE (ccn, extract_id)
+    );
+    """
+
+
+# Live table and the suffixes used for the rebuild shadow and the rollback copy
+LIVE_TABLE = 'crid_monthly'
+SHADOW_SUFFIX = '_shadow'
+PREVIOUS_SUFFIX = '_prev'
+
+# (index name, definition) - names get the table suffix so shadow and live can coexist
+CRID_INDEXES = [
+    ('idx_crid_ccn', "(ccn)"),
+    ('idx_crid_extract', "(extract_id)"),
+    ('idx_crid_ccn_extract', "(ccn, extract_id)"),
+    ('idx_crid_state', "(state)"),
+    ('idx_crid_state_extract', "(state, extract_id)"),
+    ('idx_crid_flags', "USING GIN(flags)"),
+    ('idx_crid_high_value', "(crid_value DESC) WHERE crid_value > 2"),
+    ('idx_crid_low_value', "(crid_value ASC) WHERE crid_value < -2"),
+    ('idx_crid_volatility', "(crid_volatility DESC NULLS LAST)"),
+    ('idx_crid_as_of_date', "(as_of_date)"),
+    ('idx_crid_completeness', "(completeness_pct)"),
+    ('idx_crid_state_pct', "(extract_id, state, crid_state_pct DESC NULLS LAST)"),
+    ('idx_crid_national_pct', "(extract_id, crid_national_pct DESC NULLS LAST)"),
+]
+
+# Lean layout: one index per app query pattern. The (ccn, extract_id) unique
+# constraint already serves facility history, so idx_crid_ccn and
+# idx_crid_ccn_extract go; as_of_date is 1:1 with extract_id.
+CRID_LEAN_INDEXES = [
+    # State-month ranking: WHERE state = ? AND extract_id = ? ORDER BY crid_value DESC NULLS LAST
+    ('idx_crid_state_extract_value', "(state, extract_id, crid_value DESC NULLS LAST)"),
+    # National month lists: WHERE extract_id = ? ORDER BY crid_value
+    ('idx_crid_extract_value', "(extract_id, crid_value DESC NULLS LAST)"),
+    # Most volatile facilities in a month
+    ('idx_crid_extract_volatility', "(extract_id, crid_volatility DESC NULLS LAST)"),
+    # Flag filters: WHERE flags @> ARRAY['HIGH_VOLATILITY']
+    ('idx_crid_flags', "USING GIN(flags)"),
+    # High/low CRID across all months: WHERE crid_value > 2 ORDER BY crid_value DESC
+    ('idx_crid_high_value', "(crid_value DESC) WHERE crid_value > 2"),
+    ('idx_crid_low_value', "(crid_value ASC) WHERE crid_value < -2"),
+    # Percentile bands: WHERE extract_id = ? AND state = ? AND crid_state_pct >= 90
+    ('idx_crid_state_pct', "(extract_id, state, crid_state_pct DESC NULLS LAST)"),
+    # National percentile bands: WHERE extract_id = ? AND crid_national_pct >= 90
+    ('idx_crid_national_pct', "(extract_id, crid_national_pct DESC NULLS LAST)"),
+]
+
+# layout name -> (DDL builder, index set)
+LAYOUTS = {
+    'standard': (crid_table_ddl, CRID_INDEXES),
+    'lean': (crid_table_lean_ddl, CRID_LEAN_INDEXES),
+}
+
+# Every index name either layout may carry (renamed together with the table)
+ALL_INDEX_NAMES = list(dict.fromkeys(name for _, indexes in LAYOUTS.values() for name, _ in indexes))
+
+
+def create_shadow_table(conn, rolling_windows=DEFAULT_ROLLING_WINDOWS, layout: str = 'standard') -> str:
+    """Drop any leftover shadow table and create an empty one. Returns its name."""
+    table = f"metrics.{LIVE_TABLE}{SHADOW_SUFFIX}"
+    table_ddl, _ = LAYOUTS[layout]
+    ddl = f"DROP TABLE IF EXISTS {table};\n" + table_ddl(table, SHADOW_SUFFIX, rolling_windows)
     with conn.cursor() as cur:
         cur.execute(ddl)
     conn.commit()
-    logger.info("Created metrics.crid_monthly table")
-
-
-def create_indexes(conn):
-    """Create indexes on metrics.crid_monthly."""
-    indexes = [
-        "CREATE INDEX idx_crid_ccn ON metrics.crid_monthly(ccn);",
-        "CREATE INDEX idx_crid_extract ON metrics.crid_monthly(extract_id);",
-        "CREATE INDEX idx_crid_ccn_extract ON metrics.crid_monthly(ccn, extract_id);",
-        "CREATE INDEX idx_crid_state ON metrics.crid_monthly(state);",
-        "CREATE INDEX idx_crid_state_extract ON metrics.crid_monthly(state, extract_id);",
-        "CREATE INDEX idx_crid_flags ON metrics.crid_monthly USING GIN(flags);",
-        "CREATE INDEX idx_crid_high_value ON metrics.crid_monthly(crid_value DESC) WHERE crid_value > 2;",
-        "CREATE INDEX idx_crid_low_value ON metrics.crid_monthly(crid_value ASC) WHERE crid_value < -2;",
-        "CREATE INDEX idx_crid_volatility ON metrics.crid_monthly(crid_volatility DESC NULLS LAST);",
-        "CREATE INDEX idx_crid_as_of_date ON metrics.crid_monthly(as_of_date);",
-        "CREATE INDEX idx_crid_completeness ON metrics.crid_monthly(completeness_pct);",
-    ]
+    logger.info(f"Created {table} table")
+    return table
+
+
+def create_indexes(
+    conn,
+    table: str = 'metrics.crid_monthly',
+    suffix: str = '',
+    indexes: List[Tuple[str, str]] = CRID_INDEXES,
+    db_url: str = None,
+    workers: int = 1
+):
+    """
+    Create indexes on metrics.crid_monthly (or its shadow, with suffixed names).
+    With workers > 1 the CREATE INDEX statements run concurrently on separate
+    connections (they only take SHARE locks, so they do not block each other).
+    """
+    if workers <= 1 or db_url is None:
+        with conn.cursor() as cur:
+            for name, definition in indexes:
+                cur.execute(f"CREATE INDEX {name}{suffix} ON {table} {definition};")
+        conn.commit()
+        logger.info(f"Created {len(indexes)} indexes")
+        return
+
+    def build_index(name: str, definition: str) -> Tuple[str, float]:
+        start = time.time()
+        index_conn = get_connection(db_url)
+        try:
+            with index_conn.cursor() as cur:
+                cur.execute(f"CREATE INDEX {name}{suffix} ON {table} {definition};")
+            index_conn.commit()
+        finally:
+            index_conn.close()
+        return name, time.time() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(build_index, name, definition) for name, definition in indexes]
+        for future in concurrent.futures.as_completed(futures):
+            name, elapsed = future.result()
+            logger.info(f"  {name}{suffix}: {elapsed:.1f}s")
+    logger.info(f"Created {len(indexes)} indexes on {workers} connections")
+
+
+def _rename_crid_objects(cur, from_suffix: str, to_suffix: str):
+    """Rename a CRID table together with its constraint, primary key, sequence and indexes."""
+    old, new = f"{LIVE_TABLE}{from_suffix}", f"{LIVE_TABLE}{to_suffix}"
+    cur.execute(f"ALTER TABLE metrics.{old} RENAME TO {new}")
+    cur.execute(f"ALTER TABLE metrics.{new} RENAME CONSTRAINT crid_monthly_unique{from_suffix} TO crid_monthly_unique{to_suffix}")
+    cur.execute(f"ALTER INDEX IF EXISTS metrics.{old}_pkey RENAME TO {new}_pkey")
+    cur.execute(f"ALTER SEQUENCE IF EXISTS metrics.{old}_id_seq RENAME TO {new}_id_seq")
+    for name in ALL_INDEX_NAMES:
+        cur.execute(f"ALTER INDEX IF EXISTS metrics.{name}{from_suffix} RENAME TO {name}{to_suffix}")
+
+
+def _table_exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cur.fetchone()[0]
+
+
+def table_rolling_windows(conn, table: str = 'metrics.crid_monthly') -> List[int]:
+    """Rolling windows an existing CRID table was built with (from its crid_volatility_<N>m columns)."""
+    schema, name = table.split('.')
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT substring(column_name FROM '^crid_volatility_([0-9]+)m$')::int AS months
+            FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+              AND column_name ~ '^crid_volatility_[0-9]+m$'
+            ORDER BY months
+        """, (schema, name))
+        return [row[0] for row in cur.fetchall()]
+
+
+def table_missing_columns(conn, columns: List[str], table: str = 'metrics.crid_monthly') -> List[str]:
+    """Which of `columns` an existing CRID table lacks (tables built before they were added)."""
+    schema, name = table.split('.')
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+        """, (schema, name))
+        present = {row[0] for row in cur.fetchall()}
+    return [col for col in columns if col not in present]
+
+
+def _dependent_views(cur, table_name: str) -> List[str]:
+    """Views that read metrics.<table_name>."""
+    cur.execute("""
+        SELECT DISTINCT view_schema || '.' || view_name
+        FROM information_schema.view_table_usage
+        WHERE table_schema = 'metrics' AND table_name = %s
+        ORDER BY 1
+    """, (table_name,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def swap_in_shadow(conn, volatility_window: int, lock_timeout: str = '10s'):
+    """
+    Atomically replace metrics.crid_monthly with the shadow table.
+
+    In one short transaction: drop the old rollback copy, rename the live table
+    to crid_monthly_prev and the shadow to crid_monthly, and record the extract
+    state. Readers block only for the duration of the renames. Refuses to drop
+    crid_monthly_prev while views still depend on it.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+
+        stale = _dependent_views(cur, f"{LIVE_TABLE}{PREVIOUS_SUFFIX}")
+        if stale:
+            raise RuntimeError(
+                f"Views depend on metrics.{LIVE_TABLE}{PREVIOUS_SUFFIX}: {', '.join(stale)}; "
+                f"recreate them on metrics.{LIVE_TABLE} (or drop them) before swapping"
+            )
+        dependents = _dependent_views(cur, LIVE_TABLE)
+        if dependents:
+            logger.warning(
+                f"Views follow the renamed table to {LIVE_TABLE}{PREVIOUS_SUFFIX} and must be "
+                f"recreated: {', '.join(dependents)}"
+            )
+
+        cur.execute(f"DROP TABLE IF EXISTS metrics.{LIVE_TABLE}{PREVIOUS_SUFFIX}")
+        if _table_exists(cur, f"metrics.{LIVE_TABLE}"):
+            _rename_crid_objects(cur, '', PREVIOUS_SUFFIX)
+        _rename_crid_objects(cur, SHADOW_SUFFIX, '')
+
+    create_extract_state_table(conn, commit=False)
+    record_extract_state(conn, volatility_window, commit=False)
+    conn.commit()
+    logger.info(f"Swapped shadow table into metrics.{LIVE_TABLE} (previous kept as metrics.{LIVE_TABLE}{PREVIOUS_SUFFIX})")
+
+
+def rollback_swap(conn, lock_timeout: str = '10s'):
+    """Swap metrics.crid_monthly_prev back in; the rolled-back table becomes _prev."""
     with conn.cursor() as cur:
-        for idx_sql in indexes:
-            cur.execute(idx_sql)
+        cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+        if not _table_exists(cur, f"metrics.{LIVE_TABLE}{PREVIOUS_SUFFIX}"):
+            raise RuntimeError(f"No metrics.{LIVE_TABLE}{PREVIOUS_SUFFIX} to roll back to")
+        _rename_crid_objects(cur, '', '_rollback')
+        _rename_crid_objects(cur, PREVIOUS_SUFFIX, '')
+        _rename_crid_objects(cur, '_rollback', PREVIOUS_SUFFIX)
+        # Force the next --incremental run to rebuild rather than trust stale state
+        cur.execute("DROP TABLE IF EXISTS metrics.crid_extract_state")
     conn.commit()
-    logger.info(f"Created {len(indexes)} indexes")
+    logger.info(f"Rolled back: metrics.{LIVE_TABLE}{PREVIOUS_SUFFIX} is live again")
 
 
-def materialize_crid(conn, volatility_window: int = 3) -> int:
+def check_crid_table(conn, table: str) -> List[str]:
     """
-    Materialize CRID values into metrics.crid_monthly.
-
-    Args:
-        volatility_window: Number of months for rolling stddev (3 or 4)
+    Sanity checks run on the shadow table before it is swapped in.
+    Returns a list of problems (empty if the table looks healthy).
+    """
+    problems = []
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT
+                COUNT(*),
+                COUNT(crid_value),
+                COUNT(DISTINCT extract_id),
+                AVG(crid_value)
+            FROM {table}
+        """)
+        total, with_crid, extracts, mean_crid = cur.fetchone()
+        cur.execute("SELECT COUNT(DISTINCT extract_id) FROM gold.nh_crid_inputs")
+        gold_extracts = cur.fetchone()[0]
+
+    if total == 0:
+        problems.append("table is empty")
+    if with_crid == 0:
+        problems.append("no rows with a valid CRID value")
+    if extracts != gold_extracts:
+        problems.append(f"{extracts} extracts materialized, {gold_extracts} with rows in gold.nh_crid_inputs")
+    if mean_crid is not None and abs(float(mean_crid)) > 0.5:
+        problems.append(f"mean CRID is {float(mean_crid):.3f}, expected ~0")
+    return problems
+
+
+def build_crid_sql(
+    volatility_window: int = 3,
+    table: str = 'metrics.crid_monthly',
+    filter_inputs: bool = False,
+    filter_targets: bool = False,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> str:
+    """
+    Generate the INSERT ... SELECT that materializes CRID into `table`.
 
-    Returns:
-        Number of rows inserted.
+    filter_inputs / filter_targets add the %(input_extracts)s and
+    %(target_extracts)s extract restrictions used by incremental and
+    partitioned runs.
     """
-    # Validate volatility window
-    if volatility_window not in (3, 4):
-        raise ValueError(f"volatility_window must be 3 or 4, got {volatility_window}")
+    for window in (volatility_window, *rolling_windows):
+        validate_window(window)
 
     # Window clause: ROWS BETWEEN (N-1) PRECEDING AND CURRENT ROW for N-month window
     window_preceding = volatility_window - 1
 
-    materialize_sql = f"""
+    # Optional extract restrictions (incremental mode)
+    input_filter = ''
+    target_filter = ''
+    if filter_inputs:
+        input_filter = '\n        WHERE i.extract_id = ANY(%(input_extracts)s)'
+    if filter_targets:
+        target_filter = '\n    WHERE extract_id = ANY(%(target_extracts)s)'
+
+    rolling_select = rolling_select_sql(rolling_windows)
+    rolling_insert = ''.join(f"\n        {col}," for col in rolling_columns(rolling_windows))
+    rank_select = rank_select_sql()
+    rank_insert = ''.join(f"\n        {col}," for col in rank_columns())
+    pct_insert = ''.join(f"\n        {col}," for col, _, _ in PERCENTILE_RANKS)
+    decile_select = decile_select_sql()
+
+    return f"""
     -- Get weights from measure definitions
     WITH measure_weights AS (
         SELECT
@@ -186,76 +585,39 @@ def materialize_crid(conn, volatility_window: int = 3) -> int:
         FROM measure_weights
     ),
 
-    -- Pivot MDS measures (410, 453, 407, 409) with suppression tracking
-    mds_base AS (
-        SELECT
-            m.ccn,
-            m.extract_id,
-            m.as_of_date,
-            m.state,
-            MAX(CASE WHEN m.measure_code = '410' THEN m.four_quarter_avg END) AS measure_410,
-            MAX(CASE WHEN m.measure_code = '453' THEN m.four_quarter_avg END) AS measure_453,
-            MAX(CASE WHEN m.measure_code = '407' THEN m.four_quarter_avg END) AS measure_407,
-            MAX(CASE WHEN m.measure_code = '409' THEN m.four_quarter_avg END) AS measure_409,
-            -- Track which measures are suppressed
-            MAX(CASE WHEN m.measure_code = '410' AND m.has_suppression THEN 1 ELSE 0 END) AS sup_410,
-            MAX(CASE WHEN m.measure_code = '453' AND m.has_suppression THEN 1 ELSE 0 END) AS sup_453,
-            MAX(CASE WHEN m.measure_code = '407' AND m.has_suppression THEN 1 ELSE 0 END) AS sup_407,
-            MAX(CASE WHEN m.measure_code = '409' AND m.has_suppression THEN 1 ELSE 0 END) AS sup_409
-        FROM gold.nh_quality_mds m
-        WHERE m.measure_code IN ('410', '453', '407', '409')
-        GROUP BY m.ccn, m.extract_id, m.as_of_date, m.state
-    ),
-
-    -- Pivot Claims measures (551, 552) with suppression tracking
-    claims_base AS (
-        SELECT
-            c.ccn,
-            c.extract_id,
-            MAX(CASE WHEN c.measure_code = '551' THEN c.adjusted_score END) AS measure_551,
-            MAX(CASE WHEN c.measure_code = '552' THEN c.adjusted_score END) AS measure_552,
-            MAX(CASE WHEN c.measure_code = '551' AND c.has_suppression THEN 1 ELSE 0 END) AS sup_551,
-            MAX(CASE WHEN c.measure_code = '552' AND c.has_suppression THEN 1 ELSE 0 END) AS sup_552
-        FROM gold.nh_quality_claims c
-        WHERE c.measure_code IN ('551', '552')
-        GROUP BY c.ccn, c.extract_id
-    ),
-
-    -- Join and calculate completeness
+    -- Pre-pivoted facility-month inputs (maintained by ingest_fast.py)
     all_facilities AS (
         SELECT
-            m.ccn,
-            m.extract_id,
-            m.as_of_date,
-            m.state,
-            m.measure_410,
-            m.measure_453,
-            m.measure_407,
-            m.measure_409,
-            COALESCE(c.measure_551, NULL) AS measure_551,
-            COALESCE(c.measure_552, NULL) AS measure_552,
+            i.ccn,
+            i.extract_id,
+            i.as_of_date,
+            i.state,
+            i.measure_410,
+            i.measure_453,
+            i.measure_407,
+            i.measure_409,
+            i.measure_551,
+            i.measure_552,
             -- Count present (non-null, non-suppressed)
-            (CASE WHEN m.measure_410 IS NOT NULL AND m.sup_410 = 0 THEN 1 ELSE 0 END +
-             CASE WHEN m.measure_453 IS NOT NULL AND m.sup_453 = 0 THEN 1 ELSE 0 END +
-             CASE WHEN m.measure_407 IS NOT NULL AND m.sup_407 = 0 THEN 1 ELSE 0 END +
-             CASE WHEN m.measure_409 IS NOT NULL AND m.sup_409 = 0 THEN 1 ELSE 0 END +
-             CASE WHEN c.measure_551 IS NOT NULL AND COALESCE(c.sup_551, 0) = 0 THEN 1 ELSE 0 END +
-             CASE WHEN c.measure_552 IS NOT NULL AND COALESCE(c.sup_552, 0) = 0 THEN 1 ELSE 0 END
+            (CASE WHEN i.measure_410 IS NOT NULL AND NOT i.sup_410 THEN 1 ELSE 0 END +
+             CASE WHEN i.measure_453 IS NOT NULL AND NOT i.sup_453 THEN 1 ELSE 0 END +
+             CASE WHEN i.measure_407 IS NOT NULL AND NOT i.sup_407 THEN 1 ELSE 0 END +
+             CASE WHEN i.measure_409 IS NOT NULL AND NOT i.sup_409 THEN 1 ELSE 0 END +
+             CASE WHEN i.measure_551 IS NOT NULL AND NOT i.sup_551 THEN 1 ELSE 0 END +
+             CASE WHEN i.measure_552 IS NOT NULL AND NOT i.sup_552 THEN 1 ELSE 0 END
             ) AS measures_present,
             -- Count suppressed
-            (m.sup_410 + m.sup_453 + m.sup_407 + m.sup_409 +
-             COALESCE(c.sup_551, 0) + COALESCE(c.sup_552, 0)
+            (i.sup_410::int + i.sup_453::int + i.sup_407::int + i.sup_409::int +
+             i.sup_551::int + i.sup_552::int
             ) AS measures_suppressed,
             -- Is complete?
-            (CASE WHEN m.measure_410 IS NOT NULL AND m.sup_410 = 0
-                   AND m.measure_453 IS NOT NULL AND m.sup_453 = 0
-                   AND m.measure_407 IS NOT NULL AND m.sup_407 = 0
-                   AND m.measure_409 IS NOT NULL AND m.sup_409 = 0
-                   AND c.measure_551 IS NOT NULL AND COALESCE(c.sup_551, 0) = 0
-                   AND c.measure_552 IS NOT NULL AND COALESCE(c.sup_552, 0) = 0
-             THEN TRUE ELSE FALSE END) AS is_complete
-        FROM mds_base m
-        LEFT JOIN claims_base c ON m.ccn = c.ccn AND m.extract_id = c.extract_id
+            (i.measure_410 IS NOT NULL AND NOT i.sup_410
+             AND i.measure_453 IS NOT NULL AND NOT i.sup_453
+             AND i.measure_407 IS NOT NULL AND NOT i.sup_407
+             AND i.measure_409 IS NOT NULL AND NOT i.sup_409
+             AND i.measure_551 IS NOT NULL AND NOT i.sup_551
+             AND i.measure_552 IS NOT NULL AND NOT i.sup_552) AS is_complete
+        FROM gold.nh_crid_inputs i{input_filter}
     ),
 
     -- Calculate composites for complete facilities only (using weights from table)
@@ -330,7 +692,7 @@ def materialize_crid(conn, volatility_window: int = 3) -> int:
         LEFT JOIN state_stats s ON f.state = s.state AND f.extract_id = s.extract_id
     ),
 
-    -- Calculate CRID and volatility
+    -- Calculate CRID
     with_crid AS (
         SELECT
             *,
@@ -339,26 +701,38 @@ def materialize_crid(conn, volatility_window: int = 3) -> int:
                 WHEN mds_z_score IS NOT NULL AND claims_z_score IS NOT NULL
                 THEN (mds_z_score - claims_z_score)
                 ELSE NULL
-            END AS crid_value,
-            -- Volatility: rolling stddev (only for valid CRID values)
-            -- Order by extract_id as integer for correct temporal ordering
+            END AS crid_value
+        FROM with_z_scores
+    ),
+
+    -- Volatility and rolling statistics (only for valid CRID values); every
+    -- window is a frame over the same ordering, so this is one pass per facility.
+    -- Order by extract_id as integer for correct temporal ordering
+    with_rolling AS (
+        SELECT
+            *,
             CASE
-                WHEN mds_z_score IS NOT NULL AND claims_z_score IS NOT NULL
-                THEN STDDEV_POP(mds_z_score - claims_z_score) OVER (
-                    PARTITION BY ccn
-                    ORDER BY extract_id::int
-                    ROWS BETWEEN {window_preceding} PRECEDING AND CURRENT ROW
+                WHEN crid_value IS NOT NULL
+                THEN STDDEV_POP(crid_value) OVER (
+                    facility_months ROWS BETWEEN {window_preceding} PRECEDING AND CURRENT ROW
                 )
-                ELSE NULL
-            END AS crid_volatility
-        FROM with_z_scores
+            END AS crid_volatility{rolling_select}
+        FROM with_crid
+        WINDOW facility_months AS (PARTITION BY ccn ORDER BY extract_id::int)
+    ),
+
+    -- Percentile ranks within (state, extract_id) and nationally within extract_id
+    with_ranks AS (
+        SELECT
+            *{rank_select}
+        FROM with_rolling
     )
 
     -- Final insert with flags
-    INSERT INTO metrics.crid_monthly (
+    INSERT INTO {table} (
         ccn, extract_id, as_of_date, state,
         mds_composite, claims_utilization,
-        mds_z_score, claims_z_score, crid_value, crid_volatility,
+        mds_z_score, claims_z_score, crid_value, crid_volatility,{rolling_insert}{rank_insert}
         completeness_pct, measures_present, measures_suppressed,
         flags,
         measure_410_score, measure_453_score, measure_407_score, measure_409_score,
@@ -369,7 +743,7 @@ def materialize_crid(conn, volatility_window: int = 3) -> int:
     SELECT
         ccn, extract_id, as_of_date, state,
         mds_composite, claims_utilization,
-        mds_z_score, claims_z_score, crid_value, crid_volatility,
+        mds_z_score, claims_z_score, crid_value, crid_volatility,{rolling_insert}{pct_insert}{decile_select}
         completeness_pct, measures_present, measures_suppressed,
         -- Generate flags array
         ARRAY_REMOVE(ARRAY[
@@ -391,153 +765,913 @@ def materialize_crid(conn, volatility_window: int = 3) -> int:
         measure_551, measure_552,
         state_facility_count, state_mds_mean, state_mds_stddev,
         state_claims_mean, state_claims_stddev
-    FROM with_crid;
+    FROM with_ranks{target_filter};
+    """
+
+
+def materialize_crid(
+    conn,
+    volatility_window: int = 3,
+    table: str = 'metrics.crid_monthly',
+    input_extracts: Optional[List[str]] = None,
+    target_extracts: Optional[List[str]] = None,
+    commit: bool = True,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> int:
+    """
+    Materialize CRID values into metrics.crid_monthly.
+
+    Args:
+        volatility_window: Number of months for crid_volatility and the HIGH_VOLATILITY flag
+        table: Target table (must already exist with the crid_monthly layout)
+        input_extracts: Only read these extract_ids from gold (None = all)
+        target_extracts: Only insert rows for these extract_ids (None = all computed rows).
+            Input extracts outside the target set only provide volatility context.
+        commit: Commit after the insert (False lets callers wrap it in a larger transaction)
+        rolling_windows: Windows for the crid_{volatility,mean,trend}_<N>m columns
+            (must match the target table's columns)
+
+    Returns:
+        Number of rows inserted.
     """
+    materialize_sql = build_crid_sql(
+        volatility_window,
+        table,
+        filter_inputs=input_extracts is not None,
+        filter_targets=target_extracts is not None,
+        rolling_windows=rolling_windows
+    )
 
     with conn.cursor() as cur:
-        cur.execute(materialize_sql)
+        cur.execute(materialize_sql, {
+            'input_extracts': input_extracts,
+            'target_extracts': target_extracts,
+        })
         rows_inserted = cur.rowcount
-    conn.commit()
+    if commit:
+        conn.commit()
     return rows_inserted
 
 
-def run_validation(conn) -> bool:
-    """Run validation queries and print summary."""
-    print("\n" + "=" * 70)
-    print("CRID MATERIALIZATION VALIDATION")
-    print("=" * 70)
+def partition_extracts(
+    all_extracts: List[str],
+    partitions: int,
+    context_window: int
+) -> List[Tuple[List[str], List[str]]]:
+    """
+    Split extracts (in temporal order) into contiguous ranges.
 
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        # 1. Overall summary
+    Returns:
+        [(targets, inputs)] per partition, where inputs are the targets padded
+        with the (context_window - 1) preceding extracts for rolling context.
+    """
+    span = context_window - 1
+    partitions = max(1, min(partitions, len(all_extracts)))
+    size, extra = divmod(len(all_extracts), partitions)
+
+    result = []
+    start = 0
+    for i in range(partitions):
+        end = start + size + (1 if i < extra else 0)
+        targets = all_extracts[start:end]
+        inputs = all_extracts[max(start - span, 0):end]
+        result.append((targets, inputs))
+        start = end
+    return result
+
+
+def gap_facilities(conn, targets: List[str], padding: List[str]) -> List[str]:
+    """
+    Facilities in `targets` that miss an extract of `padding`, the extracts
+    read only for rolling context. Their trailing windows reach further back
+    than the padding, so a range computed on its own cuts them short.
+    """
+    if not padding:
+        return []
+    with conn.cursor() as cur:
         cur.execute("""
-            SELECT
-                COUNT(*) AS total_rows,
-                COUNT(DISTINCT ccn) AS unique_facilities,
-                COUNT(DISTINCT extract_id) AS extracts,
-                MIN(as_of_date) AS earliest,
-                MAX(as_of_date) AS latest,
-                COUNT(*) FILTER (WHERE crid_value IS NOT NULL) AS rows_with_crid,
-                COUNT(*) FILTER (WHERE crid_value IS NULL) AS rows_without_crid
-            FROM metrics.crid_monthly
+            SELECT t.ccn
+            FROM (
+                SELECT DISTINCT ccn FROM gold.nh_crid_inputs WHERE extract_id = ANY(%(targets)s)
+            ) t
+            LEFT JOIN (
+                SELECT ccn, COUNT(*) AS months
+                FROM gold.nh_crid_inputs
+                WHERE extract_id = ANY(%(padding)s)
+                GROUP BY ccn
+            ) p USING (ccn)
+            WHERE COALESCE(p.months, 0) < %(padding_months)s
+        """, {'targets': targets, 'padding': padding, 'padding_months': len(padding)})
+        return [row[0] for row in cur.fetchall()]
+
+
+def materialize_partitioned(
+    db_url: str,
+    table: str,
+    volatility_window: int = 3,
+    workers: int = 2,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> int:
+    """
+    Materialize CRID over extract ranges on several connections at once.
+
+    Z-scores only depend on their own (state, extract_id) and the rolling
+    statistics on a bounded trailing window, so each range is computed
+    independently from its padded inputs and inserted straight into the target table. Each
+    range also looks up the facilities with a reporting gap in its padding
+    (gap_facilities()); only their rows are corrected afterwards with
+    refresh_gap_volatility().
+
+    Returns:
+        Number of rows inserted.
+    """
+    conn = get_connection(db_url)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT extract_id FROM gold.nh_quality_extracts ORDER BY extract_id::int")
+            all_extracts = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+    plan = partition_extracts(all_extracts, workers, max(volatility_window, *rolling_windows))
+    logger.info(f"Materializing {len(all_extracts)} extracts in {len(plan)} partitions on {workers} connections")
+
+    def run_partition(targets: List[str], inputs: List[str]) -> Tuple[str, int, List[str], float]:
+        label = f"{targets[0]}-{targets[-1]}"
+        start = time.time()
+        part_conn = get_connection(db_url)
+        try:
+            rows = materialize_crid(
+                part_conn,
+                volatility_window=volatility_window,
+                table=table,
+                input_extracts=inputs,
+                target_extracts=targets,
+                rolling_windows=rolling_windows
+            )
+            gaps = gap_facilities(part_conn, targets, inputs[:len(inputs) - len(targets)])
+        finally:
+            part_conn.close()
+        return label, rows, gaps, time.time() - start
+
+    total_rows = 0
+    gap_ccns = set()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_partition, targets, inputs) for targets, inputs in plan]
+        for future in concurrent.futures.as_completed(futures):
+            label, rows, gaps, elapsed = future.result()
+            total_rows += rows
+            gap_ccns.update(gaps)
+            logger.info(f"  Partition {label}: {rows:,} rows in {elapsed:.1f}s")
+
+    if gap_ccns:
+        # The first range reads the full history, so only later ranges need fixing
+        conn = get_connection(db_url)
+        try:
+            later_targets = [eid for targets, _ in plan[1:] for eid in targets]
+            gap_rows = refresh_gap_volatility(conn, volatility_window, later_targets, table=table,
+                                              rolling_windows=rolling_windows, ccns=sorted(gap_ccns))
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"Refreshed volatility for {gap_rows:,} row(s) of {len(gap_ccns):,} facilities "
+                    f"with a reporting gap at a partition boundary")
+
+    return total_rows
+
+
+def create_extract_state_table(conn, commit: bool = True):
+    """Create metrics.crid_extract_state, which tracks what each extract was built from."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS metrics.crid_extract_state (
+                extract_id VARCHAR(6) PRIMARY KEY,
+                source_updated_at TIMESTAMP,          -- gold.nh_quality_extracts.updated_at at build time
+                volatility_window INTEGER NOT NULL,
+                materialized_at TIMESTAMP DEFAULT NOW()
+            );
         """)
-        summary = cur.fetchone()
-        print(f"\n[1] SUMMARY:")
-        print(f"    Total rows:         {summary['total_rows']:,}")
-        print(f"    With valid CRID:    {summary['rows_with_crid']:,}")
-        print(f"    Without CRID (NULL): {summary['rows_without_crid']:,}")
-        print(f"    Unique facilities:  {summary['unique_facilities']:,}")
-        print(f"    Extracts:           {summary['extracts']}")
-        print(f"    Date range:         {summary['earliest']} to {summary['latest']}")
-
-        # 2. CRID distribution (only for non-NULL)
+    if commit:
+        conn.commit()
+
+
+def record_extract_state(conn, volatility_window: int, extract_ids: Optional[List[str]] = None, commit: bool = True):
+    """
+    Record the gold updated_at of materialized extracts.
+    With extract_ids=None (full rebuild) the state table is replaced entirely.
+    """
+    with conn.cursor() as cur:
+        if extract_ids is None:
+            cur.execute("DELETE FROM metrics.crid_extract_state")
+        else:
+            cur.execute("DELETE FROM metrics.crid_extract_state WHERE extract_id = ANY(%s)", (extract_ids,))
         cur.execute("""
-            SELECT
-                ROUND(AVG(crid_value)::numeric, 4) AS mean_crid,
-                ROUND(STDDEV(crid_value)::numeric, 4) AS stddev_crid,
-                ROUND(MIN(crid_value)::numeric, 4) AS min_crid,
-                ROUND(MAX(crid_value)::numeric, 4) AS max_crid,
-                ROUND(PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY crid_value)::numeric, 4) AS p25,
-                ROUND(PERCENTILE_CONT(0.50) WITHIN GROUP (ORDER BY crid_value)::numeric, 4) AS median,
-                ROUND(PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY crid_value)::numeric, 4) AS p75
-            FROM metrics.crid_monthly
-            WHERE crid_value IS NOT NULL
+            INSERT INTO metrics.crid_extract_state (extract_id, source_updated_at, volatility_window)
+            SELECT extract_id, COALESCE(updated_at, imported_at), %s
+            FROM gold.nh_quality_extracts
+            WHERE %s::text[] IS NULL OR extract_id = ANY(%s)
+        """, (volatility_window, extract_ids, extract_ids))
+    if commit:
+        conn.commit()
+
+
+def find_changed_extracts(conn, volatility_window: int) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Compare gold.nh_quality_extracts with metrics.crid_extract_state.
+
+    Returns:
+        (all_extracts, changed, removed): every gold extract_id in temporal order,
+        extracts that are new or whose updated_at moved, and extracts that
+        were materialized but no longer exist in gold.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT volatility_window FROM metrics.crid_extract_state
         """)
-        dist = cur.fetchone()
-        print(f"\n[2] CRID DISTRIBUTION (non-NULL only):")
-        print(f"    Mean:   {dist['mean_crid']} (should be ~0)")
-        print(f"    StdDev: {dist['stddev_crid']} (typically ~1.4)")
-        print(f"    Min:    {dist['min_crid']}")
-        print(f"    Max:    {dist['max_crid']}")
-        print(f"    P25:    {dist['p25']}")
-        print(f"    Median: {dist['median']}")
-        print(f"    P75:    {dist['p75']}")
-
-        # Sanity check: mean should be close to 0
-        if dist['mean_crid'] is not None and abs(float(dist['mean_crid'])) > 0.5:
-            print(f"    WARNING: Mean CRID is far from 0, check z-score calculation")
-
-        # 3. Flag distribution
+        windows = {row[0] for row in cur.fetchall()}
+        if windows and windows != {volatility_window}:
+            raise ValueError(
+                f"metrics.crid_monthly was built with volatility window {sorted(windows)}, "
+                f"not {volatility_window}; run a full rebuild to change it"
+            )
+
         cur.execute("""
             SELECT
-                unnest(flags) AS flag,
-                COUNT(*) AS occurrences,
-                ROUND(100.0 * COUNT(*) / (SELECT COUNT(*) FROM metrics.crid_monthly), 2) AS pct
-            FROM metrics.crid_monthly
-            WHERE flags IS NOT NULL AND array_length(flags, 1) > 0
-            GROUP BY unnest(flags)
-            ORDER BY occurrences DESC
+                g.extract_id,
+                s.extract_id IS NULL
+                    OR s.source_updated_at IS DISTINCT FROM COALESCE(g.updated_at, g.imported_at) AS changed
+            FROM gold.nh_quality_extracts g
+            LEFT JOIN metrics.crid_extract_state s ON s.extract_id = g.extract_id
+            ORDER BY g.extract_id::int
+        """)
+        rows = cur.fetchall()
+
+        cur.execute("""
+            SELECT s.extract_id
+            FROM metrics.crid_extract_state s
+            LEFT JOIN gold.nh_quality_extracts g ON g.extract_id = s.extract_id
+            WHERE g.extract_id IS NULL
+            ORDER BY s.extract_id::int
         """)
-        flags = cur.fetchall()
-        print(f"\n[3] FLAG DISTRIBUTION:")
-        if flags:
-            for f in flags:
-                print(f"    {f['flag']}: {f['occurrences']:,} ({f['pct']}%)")
+        removed = [row[0] for row in cur.fetchall()]
+
+    all_extracts = [row[0] for row in rows]
+    changed = [row[0] for row in rows if row[1]]
+    return all_extracts, changed, removed
+
+
+def plan_incremental(
+    all_extracts: List[str],
+    changed: List[str],
+    removed: List[str],
+    context_window: int
+) -> Tuple[List[str], List[str]]:
+    """
+    Work out which extracts to rewrite and which to read.
+
+    Targets are the changed extracts plus the (window - 1) extracts after each
+    changed or removed one, whose rolling statistics include it. Inputs are the
+    targets plus the (window - 1) extracts before each target, which only feed
+    the rolling windows. `context_window` is the longest window in use.
+
+    Padding is by extract position. A facility that skipped months has windows
+    reaching further back than the padded inputs, so its target rows come out
+    cut short; refresh_gap_volatility() recomputes those (and the later rows
+    whose windows reach into the targets) from the full stored history.
+    """
+    span = context_window - 1
+    position = {eid: i for i, eid in enumerate(all_extracts)}
+
+    target_idx = set()
+    for eid in changed:
+        i = position[eid]
+        target_idx.update(range(i, min(i + span + 1, len(all_extracts))))
+    for eid in removed:
+        # First gold extract after the removed one, then its trailing window
+        later = [i for i, e in enumerate(all_extracts) if int(e) > int(eid)]
+        if later:
+            i = later[0]
+            target_idx.update(range(i, min(i + span, len(all_extracts))))
+
+    input_idx = set()
+    for i in target_idx:
+        input_idx.update(range(max(i - span, 0), i + 1))
+
+    targets = [all_extracts[i] for i in sorted(target_idx)]
+    inputs = [all_extracts[i] for i in sorted(input_idx)]
+    return targets, inputs
+
+
+def refresh_gap_volatility(
+    conn,
+    volatility_window: int,
+    targets: Optional[List[str]],
+    table: str = 'metrics.crid_monthly',
+    rolling_windows=DEFAULT_ROLLING_WINDOWS,
+    ccns: Optional[List[str]] = None
+) -> int:
+    """
+    Recompute crid_volatility, the rolling statistics and the HIGH_VOLATILITY
+    flag over each facility's full stored history, for the rewritten extracts
+    and every later one. This fixes target rows of facilities with reporting
+    gaps (their windows reach past the padded inputs) and later rows whose
+    windows reach into the targets. Uses the stored crid_value, and only
+    touches rows where a value actually moved. `ccns` limits the check to those
+    facilities (default: every facility with a row in the targets); with
+    targets=None every row of the table is checked. Does not commit.
+
+    Returns:
+        Number of rows updated.
+    """
+    if targets is not None and not targets:
+        return 0
+    ccn_filter = ''
+    target_filter = ''
+    if targets is not None:
+        target_filter = """
+              AND c.extract_id::int >= %(min_target)s"""
+    if ccns is not None:
+        ccn_filter = """
+                WHERE ccn = ANY(%(ccns)s)"""
+    elif targets is not None:
+        ccn_filter = f"""
+                WHERE ccn IN (
+                    SELECT DISTINCT ccn FROM {table} WHERE extract_id = ANY(%(targets)s)
+                )"""
+    window_preceding = volatility_window - 1
+    columns = rolling_columns(rolling_windows)
+    rolling_set = ''.join(f"\n                {col} = h.{col}," for col in columns)
+    rolling_moved = ''.join(
+        f"\n                   OR (c.{col} IS NULL) <> (h.{col} IS NULL) OR ABS(c.{col} - h.{col}) > 0.000001"
+        for col in columns
+    )
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH hist AS (
+                SELECT
+                    id,
+                    STDDEV_POP(crid_value) OVER (
+                        facility_months ROWS BETWEEN {window_preceding} PRECEDING AND CURRENT ROW
+                    ) AS crid_volatility{rolling_select_sql(rolling_windows)}
+                FROM {table}{ccn_filter}
+                WINDOW facility_months AS (PARTITION BY ccn ORDER BY extract_id::int)
+            )
+            UPDATE {table} c
+            SET
+                crid_volatility = h.crid_volatility,{rolling_set}
+                -- Rebuild flags in the canonical order with HIGH_VOLATILITY re-evaluated
+                flags = ARRAY_REMOVE(
+                    ARRAY(
+                        SELECT f FROM unnest(c.flags) f
+                        WHERE f NOT IN ('HIGH_VOLATILITY', 'MDS_OUTLIER', 'CLAIMS_OUTLIER')
+                    ) || ARRAY[
+                        CASE WHEN h.crid_volatility > 1.5 THEN 'HIGH_VOLATILITY' END,
+                        CASE WHEN 'MDS_OUTLIER' = ANY(c.flags) THEN 'MDS_OUTLIER' END,
+                        CASE WHEN 'CLAIMS_OUTLIER' = ANY(c.flags) THEN 'CLAIMS_OUTLIER' END
+                    ],
+                    NULL
+                )
+            FROM hist h
+            WHERE c.id = h.id
+              AND c.crid_value IS NOT NULL{target_filter}
+              AND ((c.crid_volatility IS NULL) <> (h.crid_volatility IS NULL)
+                   OR ABS(c.crid_volatility - h.crid_volatility) > 0.000001{rolling_moved})
+        """, {
+            'targets': targets,
+            'ccns': ccns,
+            'min_target': min(int(t) for t in targets) if targets else None,
+        })
+        return cur.rowcount
+
+
+def materialize_incremental(conn, volatility_window: int = 3, rolling_windows=None) -> int:
+    """
+    Recompute only new/changed extracts (plus their trailing rolling windows)
+    and replace just those rows of metrics.crid_monthly in one transaction.
+    Rolling windows default to the ones the live table was built with.
+
+    Returns:
+        Number of rows written.
+    """
+    live_windows = table_rolling_windows(conn)
+    if rolling_windows is not None and sorted(rolling_windows) != live_windows:
+        raise ValueError(
+            f"metrics.crid_monthly was built with rolling windows {live_windows}, "
+            f"not {sorted(rolling_windows)}; run a full rebuild to change them"
+        )
+    rolling_windows = live_windows
+    missing = table_missing_columns(conn, rank_columns())
+    if missing:
+        raise ValueError(
+            f"metrics.crid_monthly has no {', '.join(missing)} column(s); run a full rebuild first"
+        )
+
+    all_extracts, changed, removed = find_changed_extracts(conn, volatility_window)
+    if not changed and not removed:
+        logger.info("CRID is up to date with gold.nh_quality_extracts; nothing to do")
+        return 0
+
+    context_window = max(volatility_window, *rolling_windows)
+    targets, inputs = plan_incremental(all_extracts, changed, removed, context_window)
+    logger.info(f"Changed extracts: {changed or '-'}; removed: {removed or '-'}")
+    logger.info(f"Recomputing {len(targets)} extract(s) from {len(inputs)} input extract(s): {targets}")
+
+    with conn.cursor() as cur:
+        cur.execute(
+            "DELETE FROM metrics.crid_monthly WHERE extract_id = ANY(%s)",
+            (targets + removed,)
+        )
+        cur.execute("DELETE FROM metrics.crid_extract_state WHERE extract_id = ANY(%s)", (removed,))
+
+    rows = materialize_crid(
+        conn,
+        volatility_window=volatility_window,
+        input_extracts=inputs,
+        target_extracts=targets,
+        commit=False,
+        rolling_windows=rolling_windows
+    )
+    gap_rows = refresh_gap_volatility(conn, volatility_window, targets, rolling_windows=rolling_windows)
+    if gap_rows:
+        logger.info(f"Refreshed volatility for {gap_rows:,} row(s) of facilities with reporting gaps")
+    record_extract_state(conn, volatility_window, targets, commit=False)
+    summary_rows = refresh_facility_summary(conn, targets + removed, commit=False)
+    logger.info(f"Refreshed {summary_rows:,} facility summary row(s)")
+    conn.commit()
+    return rows
+
+
+def crid_table_exists(conn) -> bool:
+    """True if metrics.crid_monthly and its extract state table both exist."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT to_regclass('metrics.crid_monthly') IS NOT NULL
+               AND to_regclass('metrics.crid_extract_state') IS NOT NULL
+        """)
+        return cur.fetchone()[0]
+
+
+def missing_crid_inputs(conn) -> List[str]:
+    """Gold extracts that have no rows in gold.nh_crid_inputs (or all, if it does not exist yet)."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('gold.nh_crid_inputs') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            cur.execute("SELECT extract_id FROM gold.nh_quality_extracts ORDER BY extract_id")
         else:
-            print(f"    No flags assigned")
+            cur.execute("""
+                SELECT e.extract_id
+                FROM gold.nh_quality_extracts e
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM gold.nh_crid_inputs i WHERE i.extract_id = e.extract_id
+                )
+                ORDER BY e.extract_id
+            """)
+        return [row[0] for row in cur.fetchall()]
+
+
+def check_engine_equivalence(
+    conn,
+    volatility_window: int = 3,
+    parquet_dir: str = None,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS
+) -> bool:
+    """
+    Run both engines and compare their output row for row.
+    The SQL CTE writes into a session temp table, so metrics.crid_monthly is untouched.
+    """
+    import crid_engine
+
+    logger.info("Computing CRID with the NumPy engine...")
+    engine_start = time.time()
+    engine_df = crid_engine.run_engine(conn, volatility_window, parquet_dir, rolling_windows)
+    engine_elapsed = time.time() - engine_start
+
+    logger.info("Computing CRID with the SQL CTE into a temp table...")
+    sql_start = time.time()
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS pg_temp.crid_sql_check;")
+        cur.execute(crid_table_ddl('pg_temp.crid_sql_check', rolling_windows=rolling_windows))
+    conn.commit()
+    materialize_crid(conn, volatility_window=volatility_window, table='pg_temp.crid_sql_check',
+                     rolling_windows=rolling_windows)
+    sql_elapsed = time.time() - sql_start
+
+    logger.info(f"NumPy engine: {engine_elapsed:.1f}s, SQL CTE: {sql_elapsed:.1f}s")
+    sql_df = crid_engine.fetch_table_frame(conn, 'pg_temp.crid_sql_check', rolling_windows)
+    return crid_engine.compare_frames(engine_df, sql_df, rolling_windows=rolling_windows)
+
+
+def check_incremental_equivalence(conn, volatility_window: int = 3) -> bool:
+    """
+    Compare metrics.crid_monthly (as left by --incremental runs) with a full
+    SQL rebuild written into a session temp table, row for row. Uses the live
+    table's rolling windows; metrics.crid_monthly is untouched.
+    """
+    import crid_engine
+
+    rolling_windows = table_rolling_windows(conn)
+    logger.info("Computing a full CRID rebuild into a temp table...")
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS pg_temp.crid_full_check;")
+        cur.execute(crid_table_ddl('pg_temp.crid_full_check', rolling_windows=rolling_windows))
+    conn.commit()
+    materialize_crid(conn, volatility_window=volatility_window, table='pg_temp.crid_full_check',
+                     rolling_windows=rolling_windows)
+
+    live_df = crid_engine.fetch_table_frame(conn, 'metrics.crid_monthly', rolling_windows)
+    full_df = crid_engine.fetch_table_frame(conn, 'pg_temp.crid_full_check', rolling_windows)
+    return crid_engine.compare_frames(live_df, full_df, rolling_windows=rolling_windows,
+                                      labels=('live', 'full rebuild'))
+
+
+# Flags assigned by materialize_crid(), in assignment order
+CRID_FLAGS = (
+    'INCOMPLETE_MEASURES', 'SMALL_STATE', 'HIGH_POSITIVE_CRID', 'HIGH_NEGATIVE_CRID',
+    'EXTREME_POSITIVE_CRID', 'EXTREME_NEGATIVE_CRID', 'HIGH_VOLATILITY', 'MDS_OUTLIER', 'CLAIMS_OUTLIER',
+)
 
-        # 4. Completeness distribution
+# Statistics rows kept per table; extract_id = 'ALL' holds the whole-table row
+STATS_ALL = 'ALL'
+STATS_RUNS_KEPT = 10
+
+
+def create_run_stats_table(conn, commit: bool = True):
+    """Create metrics.crid_run_stats, the per-run statistics read by --validate."""
+    with conn.cursor() as cur:
         cur.execute("""
+            CREATE TABLE IF NOT EXISTS metrics.crid_run_stats (
+                run_id VARCHAR(50) NOT NULL,
+                extract_id VARCHAR(6) NOT NULL,       -- 'ALL' for the whole table
+                earliest DATE,
+                latest DATE,
+                total_rows INTEGER,
+                facilities INTEGER,
+                rows_with_crid INTEGER,
+                mean_crid DOUBLE PRECISION,
+                stddev_crid DOUBLE PRECISION,
+                min_crid DOUBLE PRECISION,
+                max_crid DOUBLE PRECISION,
+                p25_crid DOUBLE PRECISION,
+                median_crid DOUBLE PRECISION,
+                p75_crid DOUBLE PRECISION,
+                complete_100 INTEGER,                 -- completeness_pct = 100
+                complete_83 INTEGER,                  -- 83-99 (5 measures)
+                complete_67 INTEGER,                  -- 67-82 (4 measures)
+                complete_below_67 INTEGER,
+                null_incomplete_small_state INTEGER,  -- NULL CRID reasons
+                null_incomplete INTEGER,
+                null_small_state INTEGER,
+                null_other INTEGER,
+                flag_counts JSONB,                    -- {"HIGH_VOLATILITY": 1234, ...}
+                top_crid JSONB,                       -- 10 highest CRID rows (per extract only)
+                computed_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (run_id, extract_id)
+            );
+        """)
+    if commit:
+        conn.commit()
+
+
+def compute_run_stats(conn, table: str = 'metrics.crid_monthly') -> str:
+    """
+    Compute the validation statistics of a CRID table in one scan and store
+    them in metrics.crid_run_stats: one row per extract plus the 'ALL' row
+    (GROUPING SETS), with the top 10 per extract ranked in the same pass.
+    Older runs beyond STATS_RUNS_KEPT are pruned. Returns the run_id.
+    """
+    run_id = f"crid_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    flag_counts = ', '.join(
+        f"'{flag}', COUNT(*) FILTER (WHERE '{flag}' = ANY(flags))" for flag in CRID_FLAGS
+    )
+
+    create_run_stats_table(conn, commit=False)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH ranked AS (
+                SELECT
+                    extract_id, as_of_date, ccn, state, flags, completeness_pct,
+                    crid_value::float8 AS crid,
+                    mds_z_score::float8 AS mds_z,
+                    claims_z_score::float8 AS claims_z,
+                    ROW_NUMBER() OVER (PARTITION BY extract_id ORDER BY crid_value DESC NULLS LAST) AS crid_rank
+                FROM {table}
+            )
+            INSERT INTO metrics.crid_run_stats (
+                run_id, extract_id, earliest, latest, total_rows, facilities, rows_with_crid,
+                mean_crid, stddev_crid, min_crid, max_crid, p25_crid, median_crid, p75_crid,
+                complete_100, complete_83, complete_67, complete_below_67,
+                null_incomplete_small_state, null_incomplete, null_small_state, null_other,
+                flag_counts, top_crid
+            )
             SELECT
-                CASE
-                    WHEN completeness_pct = 100 THEN '100% (complete)'
-                    WHEN completeness_pct >= 83 THEN '83-99% (5 measures)'
-                    WHEN completeness_pct >= 67 THEN '67-82% (4 measures)'
-                    ELSE '<67% (3 or fewer)'
-                END AS completeness_bucket,
-                COUNT(*) AS count,
-                ROUND(100.0 * COUNT(*) / SUM(COUNT(*)) OVER (), 2) AS pct
-            FROM metrics.crid_monthly
-            GROUP BY 1
-            ORDER BY 1 DESC
+                %(run_id)s,
+                CASE WHEN GROUPING(extract_id) = 1 THEN %(all)s ELSE extract_id END,
+                MIN(as_of_date),
+                MAX(as_of_date),
+                COUNT(*),
+                COUNT(DISTINCT ccn),
+                COUNT(crid),
+                AVG(crid),
+                STDDEV(crid),
+                MIN(crid),
+                MAX(crid),
+                PERCENTILE_CONT(0.25) WITHIN GROUP (ORDER BY crid),
+                PERCENTILE_CONT(0.50) WITHIN GROUP (ORDER BY crid),
+                PERCENTILE_CONT(0.75) WITHIN GROUP (ORDER BY crid),
+                COUNT(*) FILTER (WHERE completeness_pct = 100),
+                COUNT(*) FILTER (WHERE completeness_pct >= 83 AND completeness_pct < 100),
+                COUNT(*) FILTER (WHERE completeness_pct >= 67 AND completeness_pct < 83),
+                COUNT(*) FILTER (WHERE completeness_pct < 67 OR completeness_pct IS NULL),
+                COUNT(*) FILTER (WHERE crid IS NULL
+                                   AND 'INCOMPLETE_MEASURES' = ANY(flags) AND 'SMALL_STATE' = ANY(flags)),
+                COUNT(*) FILTER (WHERE crid IS NULL
+                                   AND 'INCOMPLETE_MEASURES' = ANY(flags) AND NOT 'SMALL_STATE' = ANY(flags)),
+                COUNT(*) FILTER (WHERE crid IS NULL
+                                   AND 'SMALL_STATE' = ANY(flags) AND NOT 'INCOMPLETE_MEASURES' = ANY(flags)),
+                COUNT(*) FILTER (WHERE crid IS NULL
+                                   AND NOT COALESCE(flags && ARRAY['INCOMPLETE_MEASURES', 'SMALL_STATE'], FALSE)),
+                jsonb_build_object({flag_counts}),
+                CASE WHEN GROUPING(extract_id) = 0 THEN
+                    jsonb_agg(
+                        jsonb_build_object(
+                            'ccn', ccn, 'state', state, 'crid', crid, 'mds_z', mds_z,
+                            'claims_z', claims_z, 'completeness_pct', completeness_pct
+                        ) ORDER BY crid_rank
+                    ) FILTER (WHERE crid_rank <= 10 AND crid IS NOT NULL)
+                END
+            FROM ranked
+            GROUP BY GROUPING SETS ((extract_id), ())
+        """, {'run_id': run_id, 'all': STATS_ALL})
+
+        cur.execute("""
+            DELETE FROM metrics.crid_run_stats
+            WHERE run_id NOT IN (
+                SELECT run_id FROM metrics.crid_run_stats
+                GROUP BY run_id
+                ORDER BY MAX(computed_at) DESC
+                LIMIT %s
+            )
+        """, (STATS_RUNS_KEPT,))
+    conn.commit()
+    return run_id
+
+
+def load_run_stats(conn) -> Tuple[Optional[Dict], List[Dict]]:
+    """The latest run's 'ALL' row and its per-extract rows (extract order); (None, []) if none."""
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("SELECT to_regclass('metrics.crid_run_stats') IS NOT NULL AS present")
+        if not cur.fetchone()['present']:
+            return None, []
+        cur.execute("""
+            SELECT *
+            FROM metrics.crid_run_stats
+            WHERE run_id = (
+                SELECT run_id FROM metrics.crid_run_stats ORDER BY computed_at DESC LIMIT 1
+            )
+            ORDER BY extract_id
         """)
-        completeness = cur.fetchall()
-        print(f"\n[4] COMPLETENESS DISTRIBUTION:")
-        for c in completeness:
-            print(f"    {c['completeness_bucket']}: {c['count']:,} ({c['pct']}%)")
+        rows = cur.fetchall()
+    overall = next((r for r in rows if r['extract_id'] == STATS_ALL), None)
+    return overall, [r for r in rows if r['extract_id'] != STATS_ALL]
+
+
+# Flags that signal a CRID finding (the other two only explain a NULL CRID)
+SIGNAL_FLAGS = tuple(f for f in CRID_FLAGS if f not in ('INCOMPLETE_MEASURES', 'SMALL_STATE'))
+
+# Calendar months behind crid_facility_summary.crid_trend
+SUMMARY_TREND_MONTHS = 12
 
-        # 5. NULL CRID reasons
+
+def create_facility_summary_table(conn, commit: bool = True):
+    """Create metrics.crid_facility_summary: one row per facility for facility-page lookups."""
+    with conn.cursor() as cur:
         cur.execute("""
-            SELECT
-                CASE
-                    WHEN 'INCOMPLETE_MEASURES' = ANY(flags) AND 'SMALL_STATE' = ANY(flags)
-                        THEN 'Both: incomplete + small state'
-                    WHEN 'INCOMPLETE_MEASURES' = ANY(flags) THEN 'Incomplete measures'
-                    WHEN 'SMALL_STATE' = ANY(flags) THEN 'Small state (<10 facilities)'
-                    ELSE 'Other/Unknown'
-                END AS null_reason,
-                COUNT(*) AS count
-            FROM metrics.crid_monthly
-            WHERE crid_value IS NULL
-            GROUP BY 1
-            ORDER BY count DESC
+            CREATE TABLE IF NOT EXISTS metrics.crid_facility_summary (
+                ccn VARCHAR(6) PRIMARY KEY,
+                state VARCHAR(2),
+                latest_extract_id VARCHAR(6) NOT NULL,
+                latest_as_of_date DATE,
+                crid_value DOUBLE PRECISION,         -- Latest month
+                crid_volatility DOUBLE PRECISION,
+                flags TEXT[],
+                state_percentile DOUBLE PRECISION,   -- 0-100 among the state's facilities with CRID that month
+                state_facilities INTEGER,
+                crid_trend DOUBLE PRECISION,         -- CRID per month over the last 12 calendar months
+                history_extract_ids VARCHAR(6)[],    -- Every reported month, oldest first
+                crid_history DOUBLE PRECISION[],     -- CRID per history_extract_ids entry (NULL where not computable)
+                first_flagged DATE,                  -- First/last month with a signal flag
+                last_flagged DATE,
+                flag_dates JSONB,                    -- {"HIGH_VOLATILITY": {"first": "...", "last": "..."}, ...}
+                refreshed_at TIMESTAMP DEFAULT NOW()
+            );
+            CREATE INDEX IF NOT EXISTS idx_crid_facility_summary_state
+                ON metrics.crid_facility_summary (state, crid_value DESC NULLS LAST);
         """)
-        null_reasons = cur.fetchall()
-        print(f"\n[5] NULL CRID REASONS:")
-        for r in null_reasons:
-            print(f"    {r['null_reason']}: {r['count']:,}")
+    if commit:
+        conn.commit()
+
+
+def refresh_facility_summary(conn, extracts: Optional[List[str]] = None, commit: bool = True) -> int:
+    """
+    Rebuild metrics.crid_facility_summary rows from metrics.crid_monthly.
+
+    With extracts=None every facility is rebuilt. Otherwise only facilities
+    with rows in those extracts, or whose stored history includes one of them
+    (removed extracts), are rebuilt; their state percentile is ranked against
+    the full (state, latest extract) peer group. Returns the rows written.
+    """
+    create_facility_summary_table(conn, commit=False)
+    signal = '{' + ','.join(SIGNAL_FLAGS) + '}'
+
+    if extracts is None:
+        history_source = "metrics.crid_monthly c"
+        delete_sql = "DELETE FROM metrics.crid_facility_summary"
+    else:
+        history_source = """metrics.crid_monthly c
+            JOIN (
+                SELECT ccn FROM metrics.crid_monthly WHERE extract_id = ANY(%(extracts)s)
+                UNION
+                SELECT ccn FROM metrics.crid_facility_summary
+                WHERE history_extract_ids && %(extracts)s::varchar[]
+            ) affected ON affected.ccn = c.ccn"""
+        delete_sql = """
+            DELETE FROM metrics.crid_facility_summary
+            WHERE ccn IN (SELECT ccn FROM metrics.crid_monthly WHERE extract_id = ANY(%(extracts)s))
+               OR history_extract_ids && %(extracts)s::varchar[]
+        """
 
-        # 6. Coverage by extract (first 5 and last 5)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TEMP TABLE facility_summary_new ON COMMIT DROP AS
+            WITH history AS (
+                SELECT
+                    c.ccn, c.extract_id, c.as_of_date, c.state, c.flags,
+                    c.crid_value::float8 AS crid,
+                    c.crid_volatility::float8 AS volatility,
+                    {month_index_sql('c.extract_id')} AS month_index
+                FROM {history_source}
+            ),
+            latest AS (
+                SELECT DISTINCT ON (ccn) *
+                FROM history
+                ORDER BY ccn, extract_id DESC
+            ),
+            peers AS (
+                SELECT
+                    c.ccn,
+                    c.extract_id,
+                    100.0 * PERCENT_RANK() OVER state_month AS state_percentile,
+                    COUNT(*) OVER (PARTITION BY c.state, c.extract_id) AS state_facilities
+                FROM metrics.crid_monthly c
+                WHERE c.crid_value IS NOT NULL
+                  AND (c.state, c.extract_id) IN (SELECT DISTINCT state, extract_id FROM latest)
+                WINDOW state_month AS (PARTITION BY c.state, c.extract_id ORDER BY c.crid_value)
+            ),
+            trajectory AS (
+                SELECT
+                    h.ccn,
+                    array_agg(h.extract_id ORDER BY h.extract_id) AS history_extract_ids,
+                    array_agg(h.crid ORDER BY h.extract_id) AS crid_history,
+                    REGR_SLOPE(h.crid, h.month_index)
+                        FILTER (WHERE h.month_index > l.month_index - %(trend_months)s) AS crid_trend,
+                    MIN(h.as_of_date) FILTER (WHERE h.flags && %(signal)s::text[]) AS first_flagged,
+                    MAX(h.as_of_date) FILTER (WHERE h.flags && %(signal)s::text[]) AS last_flagged
+                FROM history h
+                JOIN latest l ON l.ccn = h.ccn
+                GROUP BY h.ccn
+            ),
+            flag_dates AS (
+                SELECT ccn, jsonb_object_agg(flag, jsonb_build_object('first', first_date, 'last', last_date)) AS flag_dates
+                FROM (
+                    SELECT h.ccn, f.flag, MIN(h.as_of_date) AS first_date, MAX(h.as_of_date) AS last_date
+                    FROM history h
+                    CROSS JOIN LATERAL unnest(h.flags) AS f(flag)
+                    GROUP BY h.ccn, f.flag
+                ) per_flag
+                GROUP BY ccn
+            )
+            SELECT
+                l.ccn, l.state, l.extract_id AS latest_extract_id, l.as_of_date AS latest_as_of_date,
+                l.crid AS crid_value, l.volatility AS crid_volatility, l.flags,
+                p.state_percentile, p.state_facilities,
+                t.crid_trend, t.history_extract_ids, t.crid_history, t.first_flagged, t.last_flagged,
+                COALESCE(fd.flag_dates, '{{}}'::jsonb) AS flag_dates
+            FROM latest l
+            JOIN trajectory t ON t.ccn = l.ccn
+            LEFT JOIN peers p ON p.ccn = l.ccn AND p.extract_id = l.extract_id
+            LEFT JOIN flag_dates fd ON fd.ccn = l.ccn
+        """, {'extracts': extracts, 'signal': signal, 'trend_months': SUMMARY_TREND_MONTHS})
+
+        cur.execute(delete_sql, {'extracts': extracts})
         cur.execute("""
+            INSERT INTO metrics.crid_facility_summary (
+                ccn, state, latest_extract_id, latest_as_of_date, crid_value, crid_volatility, flags,
+                state_percentile, state_facilities, crid_trend, history_extract_ids, crid_history,
+                first_flagged, last_flagged, flag_dates
+            )
             SELECT
-                extract_id,
-                as_of_date,
-                COUNT(*) AS total_facilities,
-                COUNT(*) FILTER (WHERE crid_value IS NOT NULL) AS with_crid,
-                ROUND(AVG(crid_value)::numeric, 4) AS avg_crid
-            FROM metrics.crid_monthly
-            GROUP BY extract_id, as_of_date
-            ORDER BY extract_id::int
+                ccn, state, latest_extract_id, latest_as_of_date, crid_value, crid_volatility, flags,
+                state_percentile, state_facilities, crid_trend, history_extract_ids, crid_history,
+                first_flagged, last_flagged, flag_dates
+            FROM facility_summary_new
         """)
-        extracts = cur.fetchall()
-        print(f"\n[6] COVERAGE BY EXTRACT (first 5 and last 5):")
-        for e in extracts[:5]:
-            print(f"    {e['extract_id']}: {e['with_crid']:,}/{e['total_facilities']:,} with CRID, avg={e['avg_crid']}")
-        if len(extracts) > 10:
-            print(f"    ...")
-        for e in extracts[-5:]:
-            print(f"    {e['extract_id']}: {e['with_crid']:,}/{e['total_facilities']:,} with CRID, avg={e['avg_crid']}")
-
-        # 7. Verify weights from measure_definitions
+        rows = cur.rowcount
+        cur.execute("DROP TABLE facility_summary_new")
+    if commit:
+        conn.commit()
+    return rows
+
+
+def _fmt(value, digits: int = 4) -> str:
+    # + 0.0 turns a rounded -0.0 into 0.0
+    return 'None' if value is None else f"{round(value, digits) + 0.0:.{digits}f}"
+
+
+def run_validation(conn) -> bool:
+    """
+    Print the validation summary from metrics.crid_run_stats.
+    Statistics are computed once per materialization (compute_run_stats);
+    they are only computed here if no run has stored any yet.
+    """
+    overall, extracts = load_run_stats(conn)
+    if overall is None:
+        logger.info("No stored CRID statistics; computing them from metrics.crid_monthly...")
+        compute_run_stats(conn)
+        overall, extracts = load_run_stats(conn)
+
+    print("\n" + "=" * 70)
+    print("CRID MATERIALIZATION VALIDATION")
+    print("=" * 70)
+    print(f"    Statistics: run {overall['run_id']} ({overall['computed_at']:%Y-%m-%d %H:%M:%S})")
+
+    total = overall['total_rows']
+
+    # 1. Overall summary
+    print(f"\n[1] SUMMARY:")
+    print(f"    Total rows:         {total:,}")
+    print(f"    With valid CRID:    {overall['rows_with_crid']:,}")
+    print(f"    Without CRID (NULL): {total - overall['rows_with_crid']:,}")
+    print(f"    Unique facilities:  {overall['facilities']:,}")
+    print(f"    Extracts:           {len(extracts)}")
+    print(f"    Date range:         {overall['earliest']} to {overall['latest']}")
+
+    # 2. CRID distribution (only for non-NULL)
+    print(f"\n[2] CRID DISTRIBUTION (non-NULL only):")
+    print(f"    Mean:   {_fmt(overall['mean_crid'])} (should be ~0)")
+    print(f"    StdDev: {_fmt(overall['stddev_crid'])} (typically ~1.4)")
+    print(f"    Min:    {_fmt(overall['min_crid'])}")
+    print(f"    Max:    {_fmt(overall['max_crid'])}")
+    print(f"    P25:    {_fmt(overall['p25_crid'])}")
+    print(f"    Median: {_fmt(overall['median_crid'])}")
+    print(f"    P75:    {_fmt(overall['p75_crid'])}")
+
+    # Sanity check: mean should be close to 0
+    if overall['mean_crid'] is not None and abs(overall['mean_crid']) > 0.5:
+        print(f"    WARNING: Mean CRID is far from 0, check z-score calculation")
+
+    # 3. Flag distribution
+    flags = sorted(((f, n) for f, n in (overall['flag_counts'] or {}).items() if n), key=lambda x: -x[1])
+    print(f"\n[3] FLAG DISTRIBUTION:")
+    if flags:
+        for flag, occurrences in flags:
+            print(f"    {flag}: {occurrences:,} ({100.0 * occurrences / total:.2f}%)")
+    else:
+        print(f"    No flags assigned")
+
+    # 4. Completeness distribution
+    print(f"\n[4] COMPLETENESS DISTRIBUTION:")
+    for label, column in (
+        ('100% (complete)', 'complete_100'),
+        ('83-99% (5 measures)', 'complete_83'),
+        ('67-82% (4 measures)', 'complete_67'),
+        ('<67% (3 or fewer)', 'complete_below_67'),
+    ):
+        if overall[column]:
+            print(f"    {label}: {overall[column]:,} ({100.0 * overall[column] / total:.2f}%)")
+
+    # 5. NULL CRID reasons
+    print(f"\n[5] NULL CRID REASONS:")
+    reasons = [
+        ('Both: incomplete + small state', overall['null_incomplete_small_state']),
+        ('Incomplete measures', overall['null_incomplete']),
+        ('Small state (<10 facilities)', overall['null_small_state']),
+        ('Other/Unknown', overall['null_other']),
+    ]
+    for reason, count in sorted(reasons, key=lambda x: -x[1]):
+        if count:
+            print(f"    {reason}: {count:,}")
+
+    # 6. Coverage by extract (first 5 and last 5)
+    print(f"\n[6] COVERAGE BY EXTRACT (first 5 and last 5):")
+    for e in extracts[:5]:
+        print(f"    {e['extract_id']}: {e['rows_with_crid']:,}/{e['total_rows']:,} with CRID, avg={_fmt(e['mean_crid'])}")
+    if len(extracts) > 10:
+        print(f"    ...")
+    for e in extracts[-5:] if len(extracts) > 5 else []:
+        print(f"    {e['extract_id']}: {e['rows_with_crid']:,}/{e['total_rows']:,} with CRID, avg={_fmt(e['mean_crid'])}")
+
+    # 7. Verify weights from measure_definitions
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
         cur.execute("""
             SELECT measure_code, crid_weight, crid_component
             FROM gold.nh_measure_definitions
@@ -545,32 +1679,15 @@ def run_validation(conn) -> bool:
             ORDER BY crid_component, measure_code
         """)
         weights = cur.fetchall()
-        print(f"\n[7] WEIGHTS FROM gold.nh_measure_definitions:")
-        for w in weights:
-            print(f"    {w['measure_code']} ({w['crid_component']}): {w['crid_weight']}")
+    print(f"\n[7] WEIGHTS FROM gold.nh_measure_definitions:")
+    for w in weights:
+        print(f"    {w['measure_code']} ({w['crid_component']}): {w['crid_weight']}")
 
-        # 8. Top 10 highest CRID (latest extract)
-        cur.execute("""
-            WITH latest AS (
-                SELECT MAX(extract_id) AS extract_id FROM metrics.crid_monthly
-            )
-            SELECT
-                c.ccn,
-                c.state,
-                ROUND(c.crid_value::numeric, 3) AS crid,
-                ROUND(c.mds_z_score::numeric, 3) AS mds_z,
-                ROUND(c.claims_z_score::numeric, 3) AS claims_z,
-                c.completeness_pct
-            FROM metrics.crid_monthly c
-            JOIN latest l ON c.extract_id = l.extract_id
-            WHERE c.crid_value IS NOT NULL
-            ORDER BY c.crid_value DESC
-            LIMIT 10
-        """)
-        top_crid = cur.fetchall()
-        print(f"\n[8] TOP 10 HIGHEST CRID (latest extract):")
-        for t in top_crid:
-            print(f"    {t['ccn']} ({t['state']}): CRID={t['crid']}, MDS_z={t['mds_z']}, Claims_z={t['claims_z']}")
+    # 8. Top 10 highest CRID (latest extract)
+    print(f"\n[8] TOP 10 HIGHEST CRID (latest extract):")
+    for t in (extracts[-1]['top_crid'] or []) if extracts else []:
+        print(f"    {t['ccn']} ({t['state']}): CRID={_fmt(t['crid'], 3)}, "
+              f"MDS_z={_fmt(t['mds_z'], 3)}, Claims_z={_fmt(t['claims_z'], 3)}")
 
     print("\n" + "=" * 70)
     print("VALIDATION COMPLETE")
@@ -579,6 +1696,115 @@ def run_validation(conn) -> bool:
     return True
 
 
+def run_full_rebuild(
+    conn,
+    volatility_window: int = 3,
+    engine: str = 'sql',
+    parquet_dir: str = None,
+    db_url: str = None,
+    workers: int = 1,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS,
+    layout: str = 'standard'
+) -> bool:
+    """
+    Full rebuild without downtime: materialize into the shadow table, index and
+    check it there, then swap it in atomically. The live table is untouched if
+    anything fails. Returns True if the new table went live.
+    """
+    start_time = time.time()
+
+    logger.info("Creating schema...")
+    create_schema(conn)
+
+    logger.info("Creating shadow table...")
+    shadow = create_shadow_table(conn, rolling_windows, layout)
+
+    logger.info(
+        f"Materializing CRID values (volatility window: {volatility_window} months, "
+        f"rolling windows: {list(rolling_windows)}, engine: {engine}, layout: {layout})..."
+    )
+    if engine == 'numpy':
+        import crid_engine
+        df = crid_engine.run_engine(conn, volatility_window, parquet_dir, rolling_windows)
+        rows = crid_engine.bulk_load(conn, df, table=shadow, rolling_windows=rolling_windows)
+    elif workers > 1 and db_url:
+        rows = materialize_partitioned(db_url, shadow, volatility_window=volatility_window, workers=workers,
+                                       rolling_windows=rolling_windows)
+    else:
+        logger.info("This may take 2-5 minutes...")
+        rows = materialize_crid(conn, volatility_window=volatility_window, table=shadow,
+                                rolling_windows=rolling_windows)
+    logger.info(f"Inserted {rows:,} rows")
+
+    logger.info("Creating indexes...")
+    create_indexes(conn, table=shadow, suffix=SHADOW_SUFFIX, indexes=LAYOUTS[layout][1],
+                   db_url=db_url, workers=workers)
+    with conn.cursor() as cur:
+        cur.execute(f"ANALYZE {shadow}")
+    conn.commit()
+
+    problems = check_crid_table(conn, shadow)
+    if problems:
+        for problem in problems:
+            logger.error(f"Shadow table check failed: {problem}")
+        logger.error(f"Live table left unchanged; inspect {shadow}")
+        return False
+
+    swap_in_shadow(conn, volatility_window)
+
+    logger.info("Refreshing facility summary...")
+    summary_rows = refresh_facility_summary(conn)
+    logger.info(f"Wrote {summary_rows:,} facility summary rows")
+
+    elapsed = time.time() - start_time
+    logger.info(f"Materialization complete in {elapsed:.1f} seconds")
+    return True
+
+
+def dry_run_sql(
+    volatility_window: int,
+    rolling_windows,
+    layout: str = 'standard',
+    workers: int = 1,
+    incremental: bool = False
+) -> str:
+    """
+    The SQL a run with these options executes: the shadow table, CRID insert
+    and indexes of a full rebuild, or the filtered insert of an incremental
+    refresh. Extract lists are planned from gold at run time, so they are
+    left as their %(input_extracts)s / %(target_extracts)s parameters.
+    """
+    if incremental:
+        return (
+            "-- Incremental refresh of metrics.crid_monthly; run for the changed extracts\n"
+            + build_crid_sql(volatility_window, filter_inputs=True, filter_targets=True,
+                             rolling_windows=rolling_windows)
+        )
+
+    shadow = f"metrics.{LIVE_TABLE}{SHADOW_SUFFIX}"
+    table_ddl, indexes = LAYOUTS[layout]
+    partitioned = workers > 1
+    parts = [
+        f"-- Full rebuild into {shadow} ({layout} layout), swapped in after its checks pass",
+        table_ddl(shadow, SHADOW_SUFFIX, rolling_windows),
+    ]
+    if partitioned:
+        parts.append(f"-- Run once per extract range on {workers} connections")
+    parts.append(build_crid_sql(volatility_window, shadow, partitioned, partitioned, rolling_windows))
+    parts.extend(f"CREATE INDEX {name}{SHADOW_SUFFIX} ON {shadow} {definition};" for name, definition in indexes)
+    return '\n'.join(parts)
+
+
+def write_snapshot(conn, snapshot_dir: Optional[str]):
+    """Write the Arrow snapshot (crid_snapshot.py) if a snapshot directory was given."""
+    if not snapshot_dir:
+        return
+    import crid_snapshot
+    from pathlib import Path
+    logger.info(f"Writing CRID snapshot to {snapshot_dir}...")
+    crid_snapshot.export_snapshot(conn, Path(snapshot_dir))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Materialize NH-IR-007 CRID into metrics.crid_monthly'
@@ -596,53 +1822,147 @@ def main():
     parser.add_argument(
         '--dry-run',
         action='store_true',
-        help='Print SQL without executing'
+        help='Print the generated SQL (for the given layout, workers and windows) without executing'
     )
     parser.add_argument(
         '--volatility-window',
         type=int,
         default=3,
-        choices=[3, 4],
-        help='Number of months for volatility rolling stddev (default: 3)'
+        help='Number of months for crid_volatility and the HIGH_VOLATILITY flag (default: 3)'
+    )
+    parser.add_argument(
+        '--rolling-windows',
+        help='Comma-separated windows (months) for the crid_{volatility,mean,trend}_<N>m columns '
+             f"(default: {','.join(str(w) for w in DEFAULT_ROLLING_WINDOWS)}; "
+             '--incremental defaults to the live table\'s windows)'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['sql', 'numpy'],
+        default='sql',
+        help='Computation engine: single SQL CTE or in-process NumPy (default: sql)'
+    )
+    parser.add_argument(
+        '--parquet-dir',
+        help='NumPy engine: read measures from the local Parquet mirror instead of gold tables'
+    )
+    parser.add_argument(
+        '--check-equivalence',
+        action='store_true',
+        help='Compare NumPy engine output with the SQL CTE (writes nothing to metrics)'
+    )
+    parser.add_argument(
+        '--check-incremental',
+        action='store_true',
+        help='Compare metrics.crid_monthly with a full SQL rebuild (writes nothing to metrics)'
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Recompute only new/changed extracts and their trailing volatility window'
+    )
+    parser.add_argument(
+        '--rollback',
+        action='store_true',
+        help='Swap the previous full build (metrics.crid_monthly_prev) back in'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Full rebuild: materialize extract ranges (sql engine) and build indexes '
+             'on N parallel connections (default: 1)'
+    )
+    parser.add_argument(
+        '--layout',
+        choices=sorted(LAYOUTS),
+        default='standard',
+        help='Full rebuild: table layout - NUMERIC columns with the full index set, or '
+             'float columns with the deduplicated index set (default: standard)'
+    )
+
+    parser.add_argument(
+        '--snapshot-dir',
+        help='After materializing, write the versioned Arrow snapshot for the web tier here'
     )
 
     args = parser.parse_args()
 
+    if args.incremental and args.engine != 'sql':
+        parser.error('--incremental is only supported with --engine sql')
+    args.workers = max(args.workers, 1)
+    try:
+        rolling_windows = None
+        if args.rolling_windows:
+            rolling_windows = sorted({int(w) for w in args.rolling_windows.split(',') if w.strip()})
+        for window in (args.volatility_window, *(rolling_windows or [])):
+            validate_window(window)
+    except ValueError as e:
+        parser.error(f"invalid window: {e}")
+    full_windows = rolling_windows if rolling_windows is not None else list(DEFAULT_ROLLING_WINDOWS)
+
     if args.dry_run:
-        # Read and print the SQL file
-        sql_path = os.path.join(os.path.dirname(__file__), 'crid_materialize.sql')
-        with open(sql_path, 'r') as f:
-            print(f.read())
+        if args.engine != 'sql':
+            parser.error('--dry-run prints the sql engine\'s statements')
+        if args.incremental and rolling_windows is None:
+            logger.info("Incremental runs use the live table's rolling windows; "
+                        f"showing {full_windows} (set --rolling-windows to match)")
+        print(dry_run_sql(args.volatility_window, full_windows, args.layout, args.workers, args.incremental))
         return
 
     logger.info("Connecting to marketplace database...")
     conn = get_connection(args.db_url)
 
     try:
+        if not (args.validate or args.rollback) and (
+                args.engine == 'sql' or args.check_equivalence or args.check_incremental):
+            missing = missing_crid_inputs(conn)
+            if missing:
+                logger.error(
+                    f"gold.nh_crid_inputs is missing {len(missing)} extract(s) "
+                    f"({missing[0]}..{missing[-1]}); run: python ingest_fast.py --rebuild-crid-inputs"
+                )
+                sys.exit(1)
+
         if args.validate:
             run_validation(conn)
-        else:
+        elif args.check_equivalence:
+            ok = check_engine_equivalence(conn, args.volatility_window, args.parquet_dir, full_windows)
+            if not ok:
+                sys.exit(1)
+        elif args.check_incremental:
+            if not crid_table_exists(conn):
+                logger.error("metrics.crid_monthly does not exist; nothing to compare")
+                sys.exit(1)
+            if not check_incremental_equivalence(conn, args.volatility_window):
+                sys.exit(1)
+        elif args.incremental and crid_table_exists(conn):
             start_time = time.time()
-
-            logger.info("Creating schema...")
-            create_schema(conn)
-
-            logger.info("Creating table...")
-            drop_and_create_table(conn)
-
-            logger.info(f"Materializing CRID values (volatility window: {args.volatility_window} months)...")
-            logger.info("This may take 2-5 minutes...")
-            rows = materialize_crid(conn, volatility_window=args.volatility_window)
-            logger.info(f"Inserted {rows:,} rows")
-
-            logger.info("Creating indexes...")
-            create_indexes(conn)
-
-            elapsed = time.time() - start_time
-            logger.info(f"Materialization complete in {elapsed:.1f} seconds")
-
-            # Run validation
+            logger.info(f"Incremental CRID refresh (volatility window: {args.volatility_window} months)...")
+            rows = materialize_incremental(conn, volatility_window=args.volatility_window,
+                                           rolling_windows=rolling_windows)
+            logger.info(f"Wrote {rows:,} rows in {time.time() - start_time:.1f} seconds")
+            if rows:
+                compute_run_stats(conn)
+                run_validation(conn)
+            write_snapshot(conn, args.snapshot_dir)
+        elif args.rollback:
+            rollback_swap(conn)
+            refresh_facility_summary(conn)
+            compute_run_stats(conn)
+            write_snapshot(conn, args.snapshot_dir)
+        else:
+            if args.incremental:
+                logger.info("No existing CRID build found; running a full rebuild")
+            if not run_full_rebuild(conn, args.volatility_window, args.engine, args.parquet_dir,
+                                    db_url=args.db_url, workers=args.workers,
+                                    rolling_windows=full_windows, layout=args.layout):
+                sys.exit(1)
+
+            # Statistics of the new build, then validation from them
+            compute_run_stats(conn)
             run_validation(conn)
+            write_snapshot(conn, args.snapshot_dir)
 
     finally:
         conn.close()
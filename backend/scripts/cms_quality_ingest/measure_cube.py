@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Dense Memory-Mapped Measure Cube of the Gold Quality Tables
+
+The quality data is a dense cube: ~15K facilities × 60 extracts × ~22
+measures × a few score fields. This writes it as raw array files that
+np.memmap opens instantly, so full-history vectorized work (rolling
+features, cohort screens, notebooks) reads it at memory speed instead of
+pulling rows out of Postgres.
+
+Layout (<cube-dir>):
+    _cube.json       index maps (ccns, extracts, measures), array shapes, the
+                     live generation and per-extract build state
+    gen-NNNNNN/      one generation of the arrays:
+      <field>.f32    float32, shape (extracts, ccn capacity, measure capacity)
+      status.u8      uint8, same shape: MISSING (no row), SCORED, SUPPRESSED
+
+Fields:
+    score            MDS four_quarter_avg / Claims adjusted_score
+    q1..q4_score     MDS quarterly scores (NaN for Claims measures)
+    observed_score   Claims observed / expected (NaN for MDS measures)
+    expected_score
+
+A cell is SUPPRESSED when the gold row has has_suppression or a null score;
+field values are written as found either way, so mask with status == SCORED.
+
+Extracts are the outer axis in extract_id order: a new latest month is
+appended to every file of the live generation as one contiguous slab, past
+the end readers map. The CCN and measure axes keep headroom (CCN_BLOCK /
+MEASURE_BLOCK), so new facilities and measures usually land in unused slots.
+Anything else (a month changed or backfilled, an extract removed from gold,
+the headroom used up) writes a new generation directory, copying the
+unchanged slabs. Either way the update is published only by replacing
+_cube.json, and slabs a published _cube.json points at are never rewritten,
+so readers always see a consistent cube. The previous generation is kept for
+readers still holding the old _cube.json; older ones are deleted.
+
+INCREMENTAL:
+    As export_parquet.py, _cube.json records gold.nh_quality_extracts.updated_at
+    per extract; an update only rewrites extracts that are new or changed.
+    `ingest_fast.py --cube-dir` runs the update after each ingestion.
+
+Usage:
+    python measure_cube.py --cube-dir /path/to/nh_quality_cube
+    python measure_cube.py --cube-dir /path/to/nh_quality_cube --force
+
+Reading it back:
+    from measure_cube import open_cube, cube_series
+    cube = open_cube('/path/to/nh_quality_cube')
+    falls = cube['score'][:, :, cube['measure_index']['410']]     # (extracts, ccns) view
+    series, valid = cube_series(cube, '015009', '410')
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Set, Tuple
+
+import numpy as np
+
+from export_parquet import fetch_extract_table, get_gold_extracts
+from materialize_crid import DEFAULT_DB_URL, get_connection
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+META_FILE = '_cube.json'
+
+# Headroom on the inner axes, so new facilities / measures rarely force a rewrite
+CCN_BLOCK = 1024
+MEASURE_BLOCK = 8
+
+# Cube field -> gold column per measure type (None: not reported for that type)
+FIELDS = {
+    'score': {'mds': 'four_quarter_avg', 'claims': 'adjusted_score'},
+    'q1_score': {'mds': 'q1_score', 'claims': None},
+    'q2_score': {'mds': 'q2_score', 'claims': None},
+    'q3_score': {'mds': 'q3_score', 'claims': None},
+    'q4_score': {'mds': 'q4_score', 'claims': None},
+    'observed_score': {'mds': None, 'claims': 'observed_score'},
+    'expected_score': {'mds': None, 'claims': 'expected_score'},
+}
+
+MISSING, SCORED, SUPPRESSED = 0, 1, 2
+
+
+# ============================================================================
+# FILES
+# ============================================================================
+
+def _array_files() -> Dict[str, Tuple[str, np.dtype]]:
+    """{array name: (file name, dtype)} for every array in the cube."""
+    files = {field: (f"{field}.f32", np.dtype(np.float32)) for field in FIELDS}
+    files['status'] = ('status.u8', np.dtype(np.uint8))
+    return files
+
+
+def _empty_meta() -> Dict:
+    return {'ccns': [], 'extracts': [], 'measures': {}, 'ccn_capacity': 0, 'measure_capacity': 0,
+            'generation': 0, 'state': {}}
+
+
+def _generation_dir(cube_dir: Path, generation: int) -> Path:
+    return cube_dir / f"gen-{generation:06d}"
+
+
+def _round_up(n: int, block: int) -> int:
+    return max(block, -(-n // block) * block)
+
+
+def load_meta(cube_dir: Path) -> Dict:
+    """Load _cube.json (an empty cube when missing)."""
+    meta_path = cube_dir / META_FILE
+    if not meta_path.exists():
+        return _empty_meta()
+    with open(meta_path, 'r') as f:
+        return json.load(f)
+
+
+def save_meta(cube_dir: Path, meta: Dict):
+    """Write _cube.json atomically; this is what publishes an update to readers."""
+    meta_path = cube_dir / META_FILE
+    tmp_path = meta_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _open_array(path: Path, dtype: np.dtype, shape: Tuple[int, int, int], mode: str) -> np.memmap:
+    """Memory-map one cube array; mode 'r+' grows the file to the shape when short."""
+    if mode == 'r+':
+        size = int(np.prod(shape)) * dtype.itemsize
+        with open(path, 'ab') as f:
+            if f.tell() < size:
+                f.truncate(size)
+    return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+
+def _fill_value(name: str):
+    return MISSING if name == 'status' else np.nan
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def open_cube(cube_dir, mode: str = 'r') -> Dict:
+    """
+    Open a cube read-only: {'ccns', 'extracts', 'measures' ({code: type}),
+    'ccn_index', 'extract_index', 'measure_index', <field>..., 'status', 'valid'}.
+    Arrays are memmap views trimmed to the used (extract, ccn, measure) slots.
+    """
+    cube_dir = Path(cube_dir)
+    meta = load_meta(cube_dir)
+    if not meta['extracts']:
+        raise ValueError(f"No cube in {cube_dir} (run measure_cube.py first)")
+
+    shape = (len(meta['extracts']), meta['ccn_capacity'], meta['measure_capacity'])
+    used = (slice(None), slice(0, len(meta['ccns'])), slice(0, len(meta['measures'])))
+    cube = {
+        'ccns': meta['ccns'],
+        'extracts': meta['extracts'],
+        'measures': meta['measures'],
+        'ccn_index': {ccn: i for i, ccn in enumerate(meta['ccns'])},
+        'extract_index': {eid: i for i, eid in enumerate(meta['extracts'])},
+        'measure_index': {code: i for i, code in enumerate(meta['measures'])},
+    }
+    array_dir = _generation_dir(cube_dir, meta['generation'])
+    for name, (file_name, dtype) in _array_files().items():
+        cube[name] = _open_array(array_dir / file_name, dtype, shape, mode)[used]
+    cube['valid'] = cube['status'] == SCORED
+    return cube
+
+
+def cube_series(cube: Dict, ccn: str, measure_code: str, field: str = 'score') -> Tuple[np.ndarray, np.ndarray]:
+    """(values, valid) of one facility-measure across all extracts, oldest first."""
+    i, m = cube['ccn_index'][ccn], cube['measure_index'][measure_code]
+    return np.asarray(cube[field][:, i, m]), np.asarray(cube['valid'][:, i, m])
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def _remap(cube_dir: Path, old: Dict, new: Dict, keep: Set[str]):
+    """
+    Write every array of generation new['generation'] for the new axes,
+    copying the slabs of the `keep` extracts from the old generation (CCN and
+    measure slots never move, only append). The old files are only read.
+    """
+    old_shape = (len(old['extracts']), old['ccn_capacity'], old['measure_capacity'])
+    new_shape = (len(new['extracts']), new['ccn_capacity'], new['measure_capacity'])
+    old_slot = {eid: i for i, eid in enumerate(old['extracts'])}
+    n_ccn, n_measure = len(old['ccns']), len(old['measures'])
+    old_dir = _generation_dir(cube_dir, old['generation'])
+    new_dir = _generation_dir(cube_dir, new['generation'])
+
+    # Leftovers of an interrupted update were never published
+    if new_dir.exists():
+        shutil.rmtree(new_dir)
+    new_dir.mkdir()
+    for name, (file_name, dtype) in _array_files().items():
+        target = _open_array(new_dir / file_name, dtype, new_shape, 'r+')
+        target[:] = _fill_value(name)
+        if keep:
+            source = _open_array(old_dir / file_name, dtype, old_shape, 'r')
+            for j, eid in enumerate(new['extracts']):
+                if eid in keep:
+                    target[j, :n_ccn, :n_measure] = source[old_slot[eid], :n_ccn, :n_measure]
+            del source
+        target.flush()
+        del target
+
+
+def _drop_old_generations(cube_dir: Path, generation: int):
+    """Delete generation directories older than the one before `generation`."""
+    for path in cube_dir.glob('gen-*'):
+        suffix = path.name[len('gen-'):]
+        if suffix.isdigit() and int(suffix) < generation - 1:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _plan_axes(meta: Dict, gold: Dict[str, str], frames: Dict[str, Dict]) -> Dict:
+    """New metadata: extracts = gold's, CCNs / measures appended in first-seen order."""
+    new = {**meta, 'extracts': sorted(gold), 'ccns': list(meta['ccns']), 'measures': dict(meta['measures'])}
+    known_ccns = set(new['ccns'])
+    for extract_id in sorted(frames):
+        for measure_type, table in frames[extract_id].items():
+            for ccn in sorted(set(table['ccn']) - known_ccns):
+                new['ccns'].append(ccn)
+                known_ccns.add(ccn)
+            for code in sorted(set(table['measure_code'])):
+                new['measures'].setdefault(code, measure_type)
+    if len(new['ccns']) > meta['ccn_capacity']:
+        new['ccn_capacity'] = _round_up(len(new['ccns']) + CCN_BLOCK // 2, CCN_BLOCK)
+    if len(new['measures']) > meta['measure_capacity']:
+        new['measure_capacity'] = _round_up(len(new['measures']) + MEASURE_BLOCK // 2, MEASURE_BLOCK)
+    return new
+
+
+def _fetch_frames(conn, extract_id: str) -> Dict[str, Dict[str, np.ndarray]]:
+    """One extract of both gold tables as {measure_type: {column: array}}."""
+    frames = {}
+    for measure_type in ('mds', 'claims'):
+        table = fetch_extract_table(conn, measure_type, extract_id)
+        columns = {'ccn', 'measure_code', 'has_suppression'} | {
+            cols[measure_type] for cols in FIELDS.values() if cols[measure_type]
+        }
+        frames[measure_type] = {
+            name: table.column(name).to_numpy(zero_copy_only=False) for name in columns
+        }
+    return frames
+
+
+def _write_extract(arrays: Dict[str, np.memmap], slot: int, meta: Dict, frames: Dict[str, Dict]) -> int:
+    """Fill one extract slab from its gold rows. Returns cells written."""
+    ccn_index = {ccn: i for i, ccn in enumerate(meta['ccns'])}
+    measure_index = {code: i for i, code in enumerate(meta['measures'])}
+    for name, array in arrays.items():
+        array[slot] = _fill_value(name)
+
+    cells = 0
+    for measure_type, columns in frames.items():
+        if not len(columns['ccn']):
+            continue
+        i = np.fromiter((ccn_index[c] for c in columns['ccn']), dtype=np.int64, count=len(columns['ccn']))
+        m = np.fromiter((measure_index[c] for c in columns['measure_code']), dtype=np.int64,
+                        count=len(columns['measure_code']))
+        for field, cols in FIELDS.items():
+            if cols[measure_type]:
+                arrays[field][slot, i, m] = columns[cols[measure_type]].astype(np.float32)
+        score = columns[FIELDS['score'][measure_type]].astype(np.float64)
+        suppressed = columns['has_suppression'].astype(bool) | np.isnan(score)
+        arrays['status'][slot, i, m] = np.where(suppressed, SUPPRESSED, SCORED)
+        cells += len(i)
+    return cells
+
+
+def update_cube(conn, cube_dir, force: bool = False) -> int:
+    """
+    Bring the cube in line with gold: write new or changed extracts, drop
+    removed ones. Returns the number of extracts written.
+    """
+    cube_dir = Path(cube_dir)
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    meta = load_meta(cube_dir)
+    gold = get_gold_extracts(conn)
+
+    if force:
+        # Keep the generation counter so the live files are never overwritten
+        meta = {**_empty_meta(), 'generation': meta['generation']}
+    to_write = sorted(
+        eid for eid, updated_at in gold.items()
+        if meta['state'].get(eid, {}).get('updated_at') != updated_at
+    )
+    removed = sorted(set(meta['extracts']) - set(gold))
+    logger.info(f"Extracts to write: {len(to_write)} (unchanged: {len(gold) - len(to_write)}, "
+                f"removed: {len(removed)})")
+    if not to_write and not removed:
+        return 0
+
+    frames = {}
+    for extract_id in to_write:
+        frames[extract_id] = _fetch_frames(conn, extract_id)
+    new = _plan_axes(meta, gold, frames)
+
+    # Appending newer months writes only past the published slabs, so it can
+    # go into the live generation when the inner axes still fit
+    appends_only = (
+        meta['extracts'] == new['extracts'][:len(meta['extracts'])]
+        and not set(to_write) & set(meta['extracts'])
+        and (meta['ccn_capacity'], meta['measure_capacity']) == (new['ccn_capacity'], new['measure_capacity'])
+    )
+    if not appends_only:
+        new['generation'] = meta['generation'] + 1
+        logger.info(f"Writing cube generation {new['generation']} for {len(new['extracts'])} extracts × "
+                    f"{new['ccn_capacity']:,} CCN slots × {new['measure_capacity']} measure slots")
+        _remap(cube_dir, meta, new, keep=set(meta['extracts']) & set(new['extracts']) - set(to_write))
+
+    shape = (len(new['extracts']), new['ccn_capacity'], new['measure_capacity'])
+    array_dir = _generation_dir(cube_dir, new['generation'])
+    array_dir.mkdir(exist_ok=True)
+    arrays = {
+        name: _open_array(array_dir / file_name, dtype, shape, 'r+')
+        for name, (file_name, dtype) in _array_files().items()
+    }
+    slots = {eid: i for i, eid in enumerate(new['extracts'])}
+    new['state'] = {eid: s for eid, s in meta['state'].items() if eid in gold}
+    for extract_id in to_write:
+        start = time.time()
+        cells = _write_extract(arrays, slots[extract_id], new, frames[extract_id])
+        new['state'][extract_id] = {
+            'updated_at': gold[extract_id],
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+            'cells': cells,
+        }
+        logger.info(f"[{extract_id}] Cube: {cells:,} cells ({time.time() - start:.2f}s)")
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    save_meta(cube_dir, new)
+    _drop_old_generations(cube_dir, new['generation'])
+    return len(to_write)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Build or update the memory-mapped measure cube from the gold quality tables'
+    )
+    parser.add_argument('--cube-dir', required=True, help='Directory of the cube files')
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    parser.add_argument('--force', action='store_true', help='Rebuild every extract, ignoring build state')
+
+    args = parser.parse_args()
+
+    logger.info("Connecting to marketplace database...")
+    conn = get_connection(args.db_url)
+
+    try:
+        start_time = time.time()
+        written = update_cube(conn, args.cube_dir, force=args.force)
+        logger.info(f"Wrote {written} extract(s) in {time.time() - start_time:.1f} seconds")
+    finally:
+        conn.close()
+
+    cube = open_cube(args.cube_dir)
+    logger.info(f"Cube: {len(cube['extracts'])} extracts × {len(cube['ccns']):,} CCNs × "
+                f"{len(cube['measures'])} measures, {int(cube['valid'].sum()):,} scored cells")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Rolling Feature Engine for Every Facility-Measure Series
+
+Computes trailing-window features for every (ccn, measure_code) series across
+extracts, for all measures in gold.nh_quality_mds / gold.nh_quality_claims,
+and writes them to metrics.nh_measure_features in one pass. Trend and
+deterioration screens read these precomputed values instead of running
+window functions over the fact tables.
+
+Features per (ccn, measure_code, extract_id) row present in gold:
+    score              MDS four_quarter_avg / Claims adjusted_score (NULL if suppressed)
+    score_change       score - score of the previous extract (NULL unless both scored)
+    change_streak      consecutive extracts the score has moved in the same
+                       direction, signed: +3 = up three extracts running,
+                       -2 = down two, 0 = unchanged or no previous score
+    mean_<w>m          AVG over the trailing w extracts
+    stddev_<w>m        STDDEV_POP over the trailing w extracts
+    slope_<w>m         REGR_SLOPE(score, calendar month) over the trailing w
+                       extracts (per month, so reporting gaps do not steepen it)
+
+A window covers the trailing w extracts loaded in gold, the same slots for
+every facility. This is not a per-facility ROWS frame as in
+metrics.crid_monthly: a facility that skipped an extract does not reach
+further back, it just has fewer scores in the window. Suppressed or missing
+scores are ignored (as the SQL aggregates ignore NULL), and the slope needs
+two scored months in the window.
+
+Every series is a column of a dense (extract × series) array, and all windows
+come from cumulative sums along the extract axis, so the cost is a few array
+passes per measure regardless of the window lengths.
+
+Input (one of):
+    gold tables (default)    one COPY per table
+    --parquet-dir DIR        the Parquet mirror written by export_parquet.py
+    --cube-dir DIR           the memory-mapped cube written by measure_cube.py
+
+Usage:
+    python measure_features.py
+    python measure_features.py --cube-dir /path/to/nh_quality_cube
+    python measure_features.py --parquet-dir /path/to/nh_quality_parquet
+"""
+
+import argparse
+import csv
+import logging
+import sys
+import time
+from io import StringIO
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from crid_engine import copy_to_frame
+from materialize_crid import DEFAULT_DB_URL, DEFAULT_ROLLING_WINDOWS, SHADOW_SUFFIX, create_schema, get_connection
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FEATURE_WINDOWS = DEFAULT_ROLLING_WINDOWS
+FEATURE_STATS = ('mean', 'stddev', 'slope')
+
+# measure_type -> (gold table, score column)
+SOURCES = {
+    'mds': ('gold.nh_quality_mds', 'four_quarter_avg'),
+    'claims': ('gold.nh_quality_claims', 'adjusted_score'),
+}
+
+
+def window_columns(windows=FEATURE_WINDOWS) -> List[str]:
+    """Rolling feature column names, e.g. mean_3m, stddev_3m, slope_3m."""
+    return [f"{stat}_{window}m" for window in windows for stat in FEATURE_STATS]
+
+
+OUTPUT_COLUMNS = ['measure_code', 'extract_id', 'ccn', 'score', 'score_change', 'change_streak'] + window_columns()
+
+# Live table; rebuilds load <table>_shadow and swap it in
+OUTPUT_TABLE = 'nh_measure_features'
+
+
+def output_table_ddl(suffix: str = '') -> str:
+    """CREATE TABLE for the live table or its shadow, without keys (added after the load)."""
+    return f"""
+    CREATE TABLE IF NOT EXISTS metrics.{OUTPUT_TABLE}{suffix} (
+        measure_code VARCHAR(10) NOT NULL,
+        extract_id VARCHAR(6) NOT NULL,
+        ccn VARCHAR(6) NOT NULL,
+        score REAL,
+        score_change REAL,
+        change_streak SMALLINT NOT NULL,
+        {', '.join(f'{col} REAL' for col in window_columns())}
+    );
+    """
+
+
+def output_keys_ddl(suffix: str = '') -> str:
+    """Primary key and ccn index; names carry the suffix so shadow and live can coexist."""
+    table = f"metrics.{OUTPUT_TABLE}{suffix}"
+    return f"""
+    ALTER TABLE {table}
+        ADD CONSTRAINT {OUTPUT_TABLE}{suffix}_pkey PRIMARY KEY (measure_code, extract_id, ccn);
+    CREATE INDEX idx_measure_features_ccn{suffix} ON {table}(ccn);
+    """
+
+
+def create_tables(conn):
+    """Create metrics.nh_measure_features if missing."""
+    create_schema(conn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (f"metrics.{OUTPUT_TABLE}",))
+        if not cur.fetchone()[0]:
+            cur.execute(output_table_ddl() + output_keys_ddl())
+    conn.commit()
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+def densify(long: pd.DataFrame) -> Dict:
+    """
+    Long (ccn, extract_id, measure_code, score, has_suppression) rows to the
+    dense layout of measure_cube: {'extracts', 'ccns', 'measures', 'values',
+    'present', 'valid'}, arrays shaped (extracts, ccns, measures).
+    """
+    e, extracts = pd.factorize(long['extract_id'], sort=True)
+    c, ccns = pd.factorize(long['ccn'], sort=True)
+    m, measures = pd.factorize(long['measure_code'], sort=True)
+    shape = (len(extracts), len(ccns), len(measures))
+
+    values = np.full(shape, np.nan)
+    present = np.zeros(shape, dtype=bool)
+    valid = np.zeros(shape, dtype=bool)
+    score = long['score'].to_numpy(dtype=float)
+    values[e, c, m] = score
+    present[e, c, m] = True
+    valid[e, c, m] = ~long['has_suppression'].to_numpy(dtype=bool) & ~np.isnan(score)
+    return {
+        'extracts': list(extracts), 'ccns': list(ccns), 'measures': list(measures),
+        'values': values, 'present': present, 'valid': valid,
+    }
+
+
+def load_dense_from_db(conn) -> Dict:
+    """All scores of both gold tables, one COPY each."""
+    frames = []
+    for table, score_column in SOURCES.values():
+        df = copy_to_frame(conn, f"""
+            SELECT ccn, extract_id, measure_code, {score_column} AS score, has_suppression
+            FROM {table}
+        """, dtype={'ccn': str, 'extract_id': str, 'measure_code': str,
+                    'score': float, 'has_suppression': str})
+        df['has_suppression'] = df['has_suppression'].eq('t')
+        frames.append(df)
+    return densify(pd.concat(frames, ignore_index=True))
+
+
+def load_dense_from_parquet(parquet_dir: str) -> Dict:
+    """All scores from the local Parquet mirror (export_parquet.py)."""
+    import pyarrow.dataset as ds
+
+    frames = []
+    for measure_type, (_, score_column) in SOURCES.items():
+        dataset = ds.dataset(f"{parquet_dir}/measure_type={measure_type}", partitioning='hive')
+        df = dataset.to_table(
+            columns=['ccn', 'extract_id', 'measure_code', score_column, 'has_suppression']
+        ).to_pandas().rename(columns={score_column: 'score'})
+        df['extract_id'] = df['extract_id'].astype(str).str.zfill(6)
+        df['has_suppression'] = df['has_suppression'].fillna(False).astype(bool)
+        frames.append(df)
+    return densify(pd.concat(frames, ignore_index=True))
+
+
+def load_dense_from_cube(cube_dir: str) -> Dict:
+    """Scores straight from the memory-mapped cube (measure_cube.py); nothing is parsed."""
+    from measure_cube import MISSING, open_cube
+
+    cube = open_cube(cube_dir)
+    return {
+        'extracts': cube['extracts'], 'ccns': cube['ccns'], 'measures': list(cube['measures']),
+        'values': cube['score'], 'present': cube['status'] != MISSING, 'valid': cube['valid'],
+    }
+
+
+# ============================================================================
+# COMPUTATION
+# ============================================================================
+
+def _trailing_sum(a: np.ndarray, window: int) -> np.ndarray:
+    """Sum over the trailing `window` rows (clipped at the first row) of every column."""
+    cumulative = np.zeros((a.shape[0] + 1,) + a.shape[1:])
+    np.cumsum(a, axis=0, out=cumulative[1:])
+    start = np.maximum(np.arange(a.shape[0]) + 1 - window, 0)
+    return cumulative[1:] - cumulative[start]
+
+
+def month_index(extracts: List[str]) -> np.ndarray:
+    """Calendar month number per extract (as materialize_crid.month_index_sql()), relative to the first."""
+    months = np.array([int(e[:4]) * 12 + int(e[4:]) for e in extracts], dtype=float)
+    return months - months[0]
+
+
+def series_features(values: np.ndarray, valid: np.ndarray, x: np.ndarray, windows=FEATURE_WINDOWS) -> Dict[str, np.ndarray]:
+    """
+    Features of every series (column) of an (extracts, series) array, scored
+    where valid. x is the month index per extract. Returns (extracts, series)
+    arrays keyed by output column.
+    """
+    y = np.where(valid, values, 0.0)
+    n_valid = valid.astype(float)
+    xs = x[:, None] * n_valid
+
+    features = {'score': np.where(valid, values, np.nan)}
+    change = np.full(values.shape, np.nan)
+    both = valid[1:] & valid[:-1]
+    change[1:][both] = (values[1:] - values[:-1])[both]
+    features['score_change'] = change
+
+    direction = np.nan_to_num(np.sign(change)).astype(np.int16)
+    streak = np.zeros(values.shape, dtype=np.int16)
+    run = np.zeros(values.shape[1], dtype=np.int16)
+    for t in range(values.shape[0]):
+        same = (direction[t] != 0) & (direction[t] == direction[t - 1]) if t else np.zeros_like(run, dtype=bool)
+        run = np.where(same, run + 1, (direction[t] != 0).astype(np.int16))
+        streak[t] = run * direction[t]
+    features['change_streak'] = streak
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for window in windows:
+            n = _trailing_sum(n_valid, window)
+            sy = _trailing_sum(y, window)
+            syy = _trailing_sum(y * y, window)
+            sx = _trailing_sum(xs, window)
+            sxx = _trailing_sum(xs * x[:, None], window)
+            sxy = _trailing_sum(y * x[:, None], window)
+
+            mean = sy / n
+            features[f"mean_{window}m"] = mean
+            features[f"stddev_{window}m"] = np.sqrt(np.maximum(syy / n - mean * mean, 0.0))
+            denominator = n * sxx - sx * sx
+            features[f"slope_{window}m"] = np.where(denominator > 1e-9, (n * sxy - sx * sy) / denominator, np.nan)
+    return features
+
+
+def measure_frame(dense: Dict, m: int, x: np.ndarray, windows=FEATURE_WINDOWS) -> pd.DataFrame:
+    """Feature rows of one measure, for every (ccn, extract) present in gold."""
+    values = np.asarray(dense['values'][:, :, m], dtype=float)
+    valid = np.asarray(dense['valid'][:, :, m])
+    present = np.asarray(dense['present'][:, :, m])
+    features = series_features(values, valid, x, windows)
+
+    e, c = np.nonzero(present)
+    df = pd.DataFrame({
+        'measure_code': dense['measures'][m],
+        'extract_id': np.asarray(dense['extracts'])[e],
+        'ccn': np.asarray(dense['ccns'])[c],
+    })
+    for column, array in features.items():
+        df[column] = array[e, c]
+    return df
+
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def _rename_output_objects(cur, from_suffix: str, to_suffix: str):
+    """Rename the features table together with its primary key and index."""
+    old, new = f"{OUTPUT_TABLE}{from_suffix}", f"{OUTPUT_TABLE}{to_suffix}"
+    cur.execute(f"ALTER TABLE metrics.{old} RENAME TO {new}")
+    cur.execute(f"ALTER TABLE metrics.{new} RENAME CONSTRAINT {old}_pkey TO {new}_pkey")
+    cur.execute(f"ALTER INDEX metrics.idx_measure_features_ccn{from_suffix} RENAME TO idx_measure_features_ccn{to_suffix}")
+
+
+def swap_in_shadow(conn, lock_timeout: str = '10s'):
+    """
+    Replace metrics.nh_measure_features with the shadow table in one short
+    transaction. The old table is dropped without CASCADE, so views on it
+    make the swap fail instead of disappearing.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"SET LOCAL lock_timeout = '{lock_timeout}'")
+        cur.execute(f"DROP TABLE IF EXISTS metrics.{OUTPUT_TABLE}")
+        _rename_output_objects(cur, SHADOW_SUFFIX, '')
+    conn.commit()
+
+
+def write_features(conn, dense: Dict) -> int:
+    """
+    Rebuild metrics.nh_measure_features: load the shadow table one measure
+    at a time (bounded memory), key and analyze it, then swap it in. Readers
+    keep the old table until the swap. Returns rows written.
+    """
+    x = month_index(dense['extracts'])
+    float_columns = ['score', 'score_change'] + window_columns()
+    shadow = f"metrics.{OUTPUT_TABLE}{SHADOW_SUFFIX}"
+    rows = 0
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {shadow}")
+        cur.execute(output_table_ddl(SHADOW_SUFFIX))
+        for m, measure_code in enumerate(dense['measures']):
+            df = measure_frame(dense, m, x)
+            df[float_columns] = df[float_columns].round(6)
+
+            buffer = StringIO()
+            df[OUTPUT_COLUMNS].to_csv(buffer, index=False, header=False, na_rep='', quoting=csv.QUOTE_MINIMAL)
+            buffer.seek(0)
+            cur.copy_expert(
+                f"COPY {shadow} ({','.join(OUTPUT_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+                buffer
+            )
+            rows += len(df)
+        cur.execute(output_keys_ddl(SHADOW_SUFFIX))
+        cur.execute(f"ANALYZE {shadow}")
+    conn.commit()
+
+    swap_in_shadow(conn)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compute rolling features for every facility-measure series into metrics.nh_measure_features'
+    )
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--parquet-dir', help='Read scores from the Parquet mirror (export_parquet.py)')
+    source.add_argument('--cube-dir', help='Read scores from the measure cube (measure_cube.py)')
+
+    args = parser.parse_args()
+
+    logger.info("Connecting to marketplace database...")
+    conn = get_connection(args.db_url)
+
+    try:
+        create_tables(conn)
+        start_time = time.time()
+        if args.cube_dir:
+            logger.info(f"Reading scores from measure cube: {args.cube_dir}")
+            dense = load_dense_from_cube(args.cube_dir)
+        elif args.parquet_dir:
+            logger.info(f"Reading scores from Parquet mirror: {args.parquet_dir}")
+            dense = load_dense_from_parquet(args.parquet_dir)
+        else:
+            logger.info("Pulling scores from gold tables...")
+            dense = load_dense_from_db(conn)
+        logger.info(
+            f"{len(dense['extracts'])} extracts × {len(dense['ccns']):,} CCNs × {len(dense['measures'])} measures "
+            f"loaded in {time.time() - start_time:.1f} seconds"
+        )
+
+        start_time = time.time()
+        rows = write_features(conn, dense)
+        logger.info(f"Wrote {rows:,} feature rows in {time.time() - start_time:.1f} seconds")
+    finally:
+        conn.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Mergeable Quantile Sketches for Quality Measure Scores
+
+DDSketch-style sketches (Masson et al., VLDB 2019): every value x > 0 is
+counted in bucket ceil(log_gamma(x)) with gamma = (1 + alpha) / (1 - alpha),
+so any quantile is returned within relative error alpha of a true value of
+that rank, whatever the distribution. Sketches with the same alpha merge by
+adding bucket counts, so a month, a state, all states or several months are
+all answered from the stored (measure, extract, state) sketches without
+touching the fact tables.
+
+ingest_fast.process_month builds one sketch per measure × state (plus state
+= 'US' for national) from the parsed files and stores them in
+gold.nh_quality_sketches. Scores are MDS four_quarter_avg and Claims
+adjusted_score; null (suppressed) scores are not counted.
+
+A sketch is a plain dict (stored as JSONB):
+    {'alpha': 0.01, 'count': n, 'zero': count of |x| < MIN_VALUE,
+     'min': .., 'max': .., 'pos': [first bucket index, [counts...]],
+     'neg': [first bucket index, [counts...]]}
+
+Usage:
+    # Percentiles of measure 410 in state 01 for one month
+    python quantile_sketch.py --measure 410 --extract 202407 --state 01 --quantile 0.25 0.5 0.9
+
+    # Where does a score of 12.5 rank nationally over the last year?
+    python quantile_sketch.py --measure 410 --from 202308 --to 202407 --rank 12.5
+"""
+
+import argparse
+import math
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+DEFAULT_ALPHA = 0.01
+MIN_VALUE = 1e-9
+
+
+def new_sketch(alpha: float = DEFAULT_ALPHA) -> Dict:
+    return {'alpha': alpha, 'count': 0, 'zero': 0, 'min': None, 'max': None, 'pos': [0, []], 'neg': [0, []]}
+
+
+def _gamma_log(alpha: float) -> float:
+    return math.log((1 + alpha) / (1 - alpha))
+
+
+def _add_to_store(store: List, indexes: np.ndarray, counts: np.ndarray) -> List:
+    """Add counts at bucket indexes to a [offset, counts] store; returns the new store."""
+    offset, values = store
+    if not len(indexes):
+        return store
+    lo = int(indexes.min()) if not values else min(offset, int(indexes.min()))
+    hi = int(indexes.max()) if not values else max(offset + len(values) - 1, int(indexes.max()))
+    dense = np.zeros(hi - lo + 1, dtype=np.int64)
+    if values:
+        dense[offset - lo:offset - lo + len(values)] = values
+    np.add.at(dense, indexes - lo, counts)
+    return [lo, dense.tolist()]
+
+
+def add_values(sketch: Dict, values: Iterable[float]) -> Dict:
+    """Add values (NaN ignored) to a sketch in place; returns the sketch."""
+    x = np.asarray(values, dtype=np.float64)
+    x = x[~np.isnan(x)]
+    if not len(x):
+        return sketch
+
+    log_gamma = _gamma_log(sketch['alpha'])
+    for key, part in (('pos', x[x >= MIN_VALUE]), ('neg', -x[x <= -MIN_VALUE])):
+        if len(part):
+            indexes, counts = np.unique(np.ceil(np.log(part) / log_gamma).astype(np.int64), return_counts=True)
+            sketch[key] = _add_to_store(sketch[key], indexes, counts)
+    sketch['zero'] += int(np.count_nonzero(np.abs(x) < MIN_VALUE))
+    sketch['count'] += len(x)
+    sketch['min'] = float(x.min()) if sketch['min'] is None else min(sketch['min'], float(x.min()))
+    sketch['max'] = float(x.max()) if sketch['max'] is None else max(sketch['max'], float(x.max()))
+    return sketch
+
+
+def build_sketch(values: Iterable[float], alpha: float = DEFAULT_ALPHA) -> Dict:
+    return add_values(new_sketch(alpha), values)
+
+
+def merge_sketches(sketches: Iterable[Dict]) -> Dict:
+    """Merge sketches (same alpha) into a new sketch."""
+    merged = None
+    for sketch in sketches:
+        if merged is None:
+            merged = new_sketch(sketch['alpha'])
+        elif sketch['alpha'] != merged['alpha']:
+            raise ValueError(f"Cannot merge sketches with alpha {sketch['alpha']} and {merged['alpha']}")
+        for key in ('pos', 'neg'):
+            offset, counts = sketch[key]
+            if counts:
+                merged[key] = _add_to_store(
+                    merged[key], np.arange(offset, offset + len(counts)), np.asarray(counts, dtype=np.int64)
+                )
+        merged['zero'] += sketch['zero']
+        merged['count'] += sketch['count']
+        for key, pick in (('min', min), ('max', max)):
+            if sketch[key] is not None:
+                merged[key] = sketch[key] if merged[key] is None else pick(merged[key], sketch[key])
+    return merged if merged is not None else new_sketch()
+
+
+def _ordered_buckets(sketch: Dict):
+    """(representative values, cumulative counts) in ascending value order, as arrays."""
+    gamma = (1 + sketch['alpha']) / (1 - sketch['alpha'])
+    neg_offset, neg = sketch['neg']
+    pos_offset, pos = sketch['pos']
+    values = np.concatenate([
+        -2 * gamma ** np.arange(neg_offset + len(neg) - 1, neg_offset - 1, -1, dtype=np.float64) / (gamma + 1),
+        [0.0],
+        2 * gamma ** np.arange(pos_offset, pos_offset + len(pos), dtype=np.float64) / (gamma + 1),
+    ])
+    counts = np.concatenate([neg[::-1], [sketch['zero']], pos]).astype(np.int64)
+    return values, np.cumsum(counts)
+
+
+def sketch_quantile(sketch: Dict, q: float) -> Optional[float]:
+    """Value at quantile q (0..1), within relative error alpha; None for an empty sketch."""
+    if not sketch['count']:
+        return None
+    if not 0 <= q <= 1:
+        raise ValueError(f"quantile must be within [0, 1], got {q}")
+    values, cumulative = _ordered_buckets(sketch)
+    i = min(int(np.searchsorted(cumulative, q * (sketch['count'] - 1), side='right')), len(values) - 1)
+    return min(max(float(values[i]), sketch['min']), sketch['max'])
+
+
+def sketch_rank(sketch: Dict, value: float) -> Optional[float]:
+    """
+    Share of values <= value (0..1); None for an empty sketch. Values that
+    share value's bucket (within relative distance alpha) count half.
+    """
+    if not sketch['count']:
+        return None
+    if value < sketch['min']:
+        return 0.0
+    if value >= sketch['max']:
+        return 1.0
+
+    log_gamma = _gamma_log(sketch['alpha'])
+    if abs(value) < MIN_VALUE:
+        below = sum(sketch['neg'][1])
+        return (below + sketch['zero'] / 2) / sketch['count']
+
+    key = 'pos' if value > 0 else 'neg'
+    index = math.ceil(math.log(abs(value)) / log_gamma)
+    offset, counts = sketch[key]
+    position = min(max(index - offset, 0), len(counts))
+    within = counts[index - offset] if 0 <= index - offset < len(counts) else 0
+    if key == 'pos':
+        below = sum(sketch['neg'][1]) + sketch['zero'] + sum(counts[:position])
+    else:  # larger |x| is further down the distribution
+        below = sum(counts[position + 1:]) if index - offset >= 0 else sum(counts)
+    return (below + within / 2) / sketch['count']
+
+
+# ============================================================================
+# LOOKUP CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Percentile and rank lookups from gold.nh_quality_sketches'
+    )
+    parser.add_argument('--measure', required=True, help='Measure code, e.g. 410')
+    parser.add_argument('--extract', action='append', help='Extract id (repeatable)')
+    parser.add_argument('--from', dest='from_extract', help='First extract id of a range')
+    parser.add_argument('--to', dest='to_extract', help='Last extract id of a range')
+    parser.add_argument('--state', action='append', help="State code (repeatable; default: national 'US')")
+    parser.add_argument('--quantile', type=float, nargs='+', default=[0.25, 0.5, 0.75], help='Quantiles (0..1)')
+    parser.add_argument('--rank', type=float, nargs='+', default=[], help='Scores to rank')
+    parser.add_argument('--db-url', help='PostgreSQL connection URL')
+
+    args = parser.parse_args()
+
+    import psycopg2
+    from ingest_fast import DEFAULT_DB_URL
+
+    where, params = ["measure_code = %s", "state = ANY(%s)"], [args.measure, args.state or ['US']]
+    if args.extract:
+        where.append("extract_id = ANY(%s)")
+        params.append(args.extract)
+    if args.from_extract:
+        where.append("extract_id >= %s")
+        params.append(args.from_extract)
+    if args.to_extract:
+        where.append("extract_id <= %s")
+        params.append(args.to_extract)
+
+    conn = psycopg2.connect(args.db_url or DEFAULT_DB_URL)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT sketch FROM gold.nh_quality_sketches WHERE {' AND '.join(where)}", params)
+            rows = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+    if not rows:
+        print("No sketches match.")
+        return 1
+
+    start = time.perf_counter()
+    sketch = merge_sketches(rows)
+    quantiles = [(q, sketch_quantile(sketch, q)) for q in args.quantile]
+    ranks = [(v, sketch_rank(sketch, v)) for v in args.rank]
+    elapsed_us = (time.perf_counter() - start) * 1e6
+
+    print(f"\nMeasure {args.measure}: {len(rows)} sketch(es), {sketch['count']:,} scores "
+          f"(relative error <= {sketch['alpha']:.0%})")
+    for q, value in quantiles:
+        print(f"    p{q * 100:g}: {value:.4f}")
+    for v, share in ranks:
+        print(f"    rank of {v:g}: {share:.2%} of scores at or below")
+    print(f"    merged and answered in {elapsed_us:.0f} µs\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
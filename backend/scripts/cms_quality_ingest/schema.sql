@@ -15,7 +15,12 @@ DROP TABLE IF EXISTS staging.nh_quality_mds_raw CASCADE;
 DROP TABLE IF EXISTS staging.nh_quality_claims_raw CASCADE;
 DROP TABLE IF EXISTS gold.nh_quality_mds CASCADE;
 DROP TABLE IF EXISTS gold.nh_quality_claims CASCADE;
+DROP TABLE IF EXISTS gold.nh_crid_inputs CASCADE;
+DROP TABLE IF EXISTS gold.nh_quality_benchmarks CASCADE;
+DROP TABLE IF EXISTS gold.nh_quality_sketches CASCADE;
+DROP TABLE IF EXISTS gold.nh_extract_validation CASCADE;
 DROP TABLE IF EXISTS gold.nh_quality_extracts CASCADE;
+DROP TABLE IF EXISTS gold.nh_composite_definitions CASCADE;
 DROP TABLE IF EXISTS gold.nh_measure_definitions CASCADE;
 DROP TABLE IF EXISTS gold.nh_ingest_log CASCADE;
 
@@ -189,6 +194,12 @@ CREATE TABLE gold.nh_quality_claims (
     CONSTRAINT gold_claims_unique UNIQUE (extract_id, ccn, measure_code)
 );
 
+-- gold.nh_extract_validation, gold.nh_crid_inputs, gold.nh_quality_benchmarks
+-- and gold.nh_quality_sketches are defined in ingest_fast.py, and
+-- gold.nh_composite_definitions in composite_materialize.py (those scripts
+-- also create them on databases set up earlier). `ingest_fast.py
+-- --setup-schema` runs that DDL after this file.
+
 -- Measure definitions reference table
 CREATE TABLE gold.nh_measure_definitions (
     measure_code VARCHAR(10) PRIMARY KEY,
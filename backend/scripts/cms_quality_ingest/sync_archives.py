@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Sync Monthly CMS Nursing Home Archives from an HTTP Mirror
+
+Replaces downloading the monthly nursing_homes_* archives into
+cms_historical_data by hand. The mirror publishes the archives next to a
+SHA256SUMS index (`sha256sum` format: "<hex>  <file name>"); this script
+
+    1. reads the index and skips every archive the ingest manifest already
+       records with the same hash
+    2. downloads the rest concurrently into <data-dir>/.downloads, resuming
+       partial files with HTTP Range requests (a server that ignores Range
+       restarts the file)
+    3. verifies each download against its SHA-256
+    4. unpacks each archive into <data-dir>/<archive name>/ (through a temp
+       directory and a rename, so ingest never sees half-written files)
+    5. ingests the archive's month(s) with ingest_fast.process_month as soon
+       as it is unpacked, while the other downloads are still running
+
+The ingest manifest (.ingest_manifest.json, see ingest_fast.py) gains an
+'archives' entry per synced archive, so later runs only fetch new or replaced
+archives. Run it from cron shortly after CMS publishes, then
+`materialize_crid.py --incremental`.
+
+Usage:
+    python sync_archives.py --mirror-url https://mirror.example.org/cms/nursing_homes \\
+        --data-dir /path/to/cms_historical_data
+
+    # List what would be downloaded
+    python sync_archives.py --mirror-url http://localhost:8000 --data-dir /tmp/cms --dry-run
+
+    # Download and unpack only
+    python sync_archives.py --mirror-url http://localhost:8000 --data-dir /tmp/cms --no-ingest
+"""
+
+import argparse
+import concurrent.futures
+import fnmatch
+import logging
+import os
+import shutil
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import psycopg2
+
+from ingest_fast import (
+    DEFAULT_DB_URL,
+    MANIFEST_FILE,
+    create_benchmarks_table,
+    create_crid_inputs_table,
+    create_extract_validation_table,
+    create_sketches_table,
+    file_sha256,
+    get_loaded_extracts,
+    load_file_manifest,
+    make_staging_unlogged,
+    manifest_months,
+    process_month,
+    save_file_manifest,
+    scan_quality_files,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIRROR_URL = os.environ.get('CMS_MIRROR_URL')
+DEFAULT_INDEX = 'SHA256SUMS'
+DEFAULT_PATTERN = 'nursing_homes_*.zip'
+DOWNLOAD_DIR = '.downloads'
+
+CHUNK_BYTES = 1024 * 1024
+REQUEST_TIMEOUT = 60
+DOWNLOAD_ATTEMPTS = 5
+
+
+class ChecksumError(ValueError):
+    """A downloaded archive does not match the mirror's SHA-256."""
+
+
+# ============================================================================
+# MIRROR
+# ============================================================================
+
+def archive_url(mirror_url: str, name: str) -> str:
+    return mirror_url.rstrip('/') + '/' + urllib.parse.quote(name)
+
+
+def fetch_index(mirror_url: str, index: str, pattern: str) -> Dict[str, str]:
+    """{archive name: sha256} for every index entry matching pattern."""
+    with urllib.request.urlopen(archive_url(mirror_url, index), timeout=REQUEST_TIMEOUT) as response:
+        text = response.read().decode('utf-8')
+
+    archives = {}
+    for line in text.splitlines():
+        parts = line.strip().split(maxsplit=1)
+        if len(parts) != 2:
+            continue
+        digest, name = parts[0].lower(), parts[1].lstrip('*')
+        if fnmatch.fnmatchcase(name, pattern):
+            archives[name] = digest
+    return archives
+
+
+def download_archive(mirror_url: str, name: str, sha256: str, download_dir: Path) -> Path:
+    """
+    Download one archive to download_dir/<name>, resuming from <name>.part.
+    Retries with backoff on network errors; raises ChecksumError (after
+    discarding the file) if the finished download does not match sha256.
+    """
+    path = download_dir / name
+    part = download_dir / f"{name}.part"
+    if path.exists() and file_sha256(path) == sha256:
+        return path
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        offset = part.stat().st_size if part.exists() else 0
+        request = urllib.request.Request(archive_url(mirror_url, name))
+        if offset:
+            request.add_header('Range', f"bytes={offset}-")
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                if offset and response.status != 206:
+                    offset = 0  # server ignored the Range header; start over
+                expected = response.headers.get('Content-Length')
+                with open(part, 'ab' if offset else 'wb') as f:
+                    shutil.copyfileobj(response, f, CHUNK_BYTES)
+            # urllib returns short reads silently when the connection drops
+            if expected is not None and part.stat().st_size - offset < int(expected):
+                raise ConnectionError(f"connection closed after {part.stat().st_size - offset:,} of {int(expected):,} bytes")
+            break
+        except urllib.error.HTTPError as e:
+            if e.code == 416:  # .part already holds the whole file (or more)
+                break
+            if e.code < 500 or attempt == DOWNLOAD_ATTEMPTS:
+                raise
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == DOWNLOAD_ATTEMPTS:
+                raise
+            logger.warning(f"{name}: {e}; retrying from byte {part.stat().st_size if part.exists() else 0:,}")
+        time.sleep(2 ** attempt)
+
+    actual = file_sha256(part)
+    if actual != sha256:
+        part.unlink()
+        raise ChecksumError(f"SHA-256 {actual} does not match the mirror index ({sha256})")
+    os.replace(part, path)
+    return path
+
+
+def unpack_archive(archive: Path, data_dir: Path) -> Path:
+    """
+    Unpack archive into data_dir/<archive stem>/ and return that directory.
+    The archive is extracted to a temp directory first and renamed into
+    place, replacing an earlier version of the same archive.
+    """
+    target = data_dir / archive.stem
+    tmp_dir = data_dir / f".{archive.stem}.tmp"
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+
+    with zipfile.ZipFile(archive) as zf:
+        for member in zf.infolist():
+            destination = (tmp_dir / member.filename).resolve()
+            if not destination.is_relative_to(tmp_dir.resolve()):
+                raise ValueError(f"{archive.name}: unsafe member path {member.filename}")
+        zf.extractall(tmp_dir)
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp_dir, target)
+    return target
+
+
+def fetch_and_unpack(mirror_url: str, name: str, sha256: str, data_dir: Path, keep_archives: bool) -> Path:
+    """Worker: download, verify and unpack one archive."""
+    download_dir = data_dir / DOWNLOAD_DIR
+    download_dir.mkdir(exist_ok=True)
+
+    start = time.time()
+    archive = download_archive(mirror_url, name, sha256, download_dir)
+    size = archive.stat().st_size
+    target = unpack_archive(archive, data_dir)
+    if not keep_archives:
+        archive.unlink()
+    logger.info(f"{name}: {size / 1024 / 1024:.1f} MB downloaded and unpacked in {time.time() - start:.1f}s")
+    return target
+
+
+# ============================================================================
+# SYNC
+# ============================================================================
+
+def pending_archives(index: Dict[str, str], manifest: Dict) -> List[Tuple[str, str]]:
+    """(name, sha256) of index entries the manifest does not record with the same hash."""
+    synced = manifest.get('archives', {})
+    return [(name, digest) for name, digest in sorted(index.items())
+            if synced.get(name, {}).get('sha256') != digest]
+
+
+def months_in_dir(data_dir: Path, manifest: Dict, directory: Path) -> List[str]:
+    """Extract ids whose quality files sit under directory."""
+    prefix = directory.relative_to(data_dir).as_posix() + '/'
+    return sorted({entry['extract_id'] for rel_file, entry in manifest['files'].items()
+                   if Path(rel_file).as_posix().startswith(prefix)})
+
+
+def sync(args) -> int:
+    data_dir = Path(args.data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = Path(args.manifest) if args.manifest else data_dir / MANIFEST_FILE
+    manifest = scan_quality_files(str(data_dir), load_file_manifest(manifest_path))
+    manifest.setdefault('archives', {})
+
+    index = fetch_index(args.mirror_url, args.index, args.pattern)
+    todo = pending_archives(index, manifest)
+    logger.info(f"Mirror lists {len(index)} archive(s); {len(todo)} new or changed")
+    if args.dry_run or not todo:
+        for name, _ in todo:
+            logger.info(f"  would download {name}")
+        return 0
+
+    if not args.no_ingest:
+        conn = psycopg2.connect(args.db_url)
+        try:
+            if not args.skip_unlogged:
+                make_staging_unlogged(conn)
+            create_crid_inputs_table(conn)
+            create_benchmarks_table(conn)
+            create_sketches_table(conn)
+            create_extract_validation_table(conn)
+            loaded = get_loaded_extracts(conn)
+        finally:
+            conn.close()
+
+    start_time = time.time()
+    errors = []
+    synced = ingested = 0
+    downloaders = concurrent.futures.ThreadPoolExecutor(args.workers, thread_name_prefix='download')
+    # One ingest worker by default: months are loaded in the order they land
+    ingesters = concurrent.futures.ThreadPoolExecutor(args.ingest_workers, thread_name_prefix='ingest')
+    try:
+        pending = {
+            downloaders.submit(fetch_and_unpack, args.mirror_url, name, digest, data_dir, args.keep_archives):
+                ('download', name, digest)
+            for name, digest in todo
+        }
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                kind, name, detail = pending.pop(future)
+
+                if kind == 'download':
+                    try:
+                        target = future.result()
+                    except Exception as e:
+                        logger.error(f"{name}: {e}")
+                        errors.append(f"{name}: {e}")
+                        continue
+                    synced += 1
+
+                    # Only the new directory (and data_dir itself) are listed again
+                    manifest = scan_quality_files(str(data_dir), manifest)
+                    manifest['archives'][name] = {'sha256': detail, 'directory': target.name}
+                    save_file_manifest(manifest_path, manifest)
+                    if args.no_ingest:
+                        continue
+
+                    months = manifest_months(str(data_dir), manifest)
+                    for extract_id in months_in_dir(data_dir, manifest, target):
+                        hashes = months[extract_id]['hashes']
+                        if extract_id in loaded and manifest['ingested'].setdefault(extract_id, hashes) == hashes:
+                            logger.info(f"[{extract_id}] Already loaded from these files, skipping")
+                            continue
+                        # a month loaded from other files is reloaded
+                        force = extract_id in loaded
+                        future = ingesters.submit(
+                            process_month, args.db_url, extract_id,
+                            months[extract_id]['mds'], months[extract_id]['claims'],
+                            force, args.allow_anomalies
+                        )
+                        pending[future] = ('ingest', extract_id, months[extract_id]['hashes'])
+                        logger.info(f"[{extract_id}] Queued for ingestion")
+                else:
+                    result = future.result()
+                    if result['error']:
+                        errors.append(f"{name}: {result['error']}")
+                    elif not result['skipped']:
+                        ingested += 1
+                        manifest['ingested'][name] = detail
+                        save_file_manifest(manifest_path, manifest)
+    finally:
+        downloaders.shutdown(wait=True)
+        ingesters.shutdown(wait=True)
+
+    if args.cube_dir and ingested:
+        from measure_cube import update_cube
+        conn = psycopg2.connect(args.db_url)
+        try:
+            update_cube(conn, args.cube_dir)
+        finally:
+            conn.close()
+
+    logger.info("=" * 60)
+    logger.info("SYNC COMPLETE")
+    logger.info(f"  Archives synced: {synced} of {len(todo)}")
+    logger.info(f"  Months ingested: {ingested}")
+    logger.info(f"  Elapsed time: {time.time() - start_time:.1f} seconds")
+    if errors:
+        logger.warning(f"  Errors: {len(errors)}")
+        for e in errors:
+            logger.warning(f"    {e}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Download new monthly CMS nursing home archives from a mirror and ingest them'
+    )
+    parser.add_argument('--mirror-url', default=DEFAULT_MIRROR_URL,
+                        help='Base URL of the archive mirror (default: $CMS_MIRROR_URL)')
+    parser.add_argument('--data-dir', required=True, help='Path to cms_historical_data folder')
+    parser.add_argument('--db-url', default=DEFAULT_DB_URL, help='PostgreSQL connection URL')
+    parser.add_argument('--index', default=DEFAULT_INDEX, help=f'Checksum index on the mirror (default: {DEFAULT_INDEX})')
+    parser.add_argument('--pattern', default=DEFAULT_PATTERN, help=f'Archive name pattern (default: {DEFAULT_PATTERN})')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent downloads (default: 4)')
+    parser.add_argument('--ingest-workers', type=int, default=1, help='Months ingested in parallel (default: 1, max: 4)')
+    parser.add_argument('--manifest', help=f'File manifest path (default: <data-dir>/{MANIFEST_FILE})')
+    parser.add_argument('--cube-dir', help='Update the memory-mapped measure cube (measure_cube.py) after ingestion')
+    parser.add_argument('--keep-archives', action='store_true', help=f'Keep downloaded archives in <data-dir>/{DOWNLOAD_DIR}')
+    parser.add_argument('--no-ingest', action='store_true', help='Download and unpack only')
+    parser.add_argument('--dry-run', action='store_true', help='List archives that would be downloaded')
+    parser.add_argument('--skip-unlogged', action='store_true', help='Skip UNLOGGED optimization')
+    parser.add_argument('--allow-anomalies', action='store_true',
+                        help='Load months whose profile is anomalous against the previous extract')
+
+    args = parser.parse_args()
+    if not args.mirror_url:
+        parser.error('--mirror-url (or CMS_MIRROR_URL) is required')
+    args.workers = max(args.workers, 1)
+    args.ingest_workers = min(max(args.ingest_workers, 1), 4)
+
+    return sync(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tests for sync_archives.py against a local http.server mirror.
+
+The mirror is a temp directory with a SHA256SUMS index, served by a
+SimpleHTTPRequestHandler that also answers Range requests (206, or 416 past
+the end of the file), so resumed downloads take the same path as against a
+real mirror.
+
+Usage:
+    python -m pytest test_sync_archives.py
+    python -m unittest test_sync_archives
+"""
+
+import hashlib
+import http.server
+import sys
+import tempfile
+import threading
+import unittest
+import zipfile
+from functools import partial
+from pathlib import Path
+from unittest import mock
+
+import sync_archives
+from sync_archives import ChecksumError, download_archive, fetch_index, unpack_archive
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Static files with single-range support; records the Range header of every request."""
+
+    ranges = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        range_header = self.headers.get('Range')
+        path = Path(self.translate_path(self.path))
+        type(self).ranges.append(range_header)
+        if not range_header or not path.is_file():
+            return super().send_head()
+
+        start = int(range_header.split('=', 1)[1].split('-', 1)[0])
+        size = path.stat().st_size
+        if start >= size:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{size}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+
+        f = open(path, 'rb')
+        f.seek(start)
+        self.send_response(206)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Range', f"bytes {start}-{size - 1}/{size}")
+        self.send_header('Content-Length', str(size - start))
+        self.end_headers()
+        return f
+
+
+def make_archive(path: Path, members: dict) -> str:
+    """Write a zip with {member name: text} and return its SHA-256."""
+    with zipfile.ZipFile(path, 'w') as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class SyncArchivesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.mirror = root / 'mirror'
+        self.data_dir = root / 'data'
+        self.download_dir = root / 'downloads'
+        for directory in (self.mirror, self.data_dir, self.download_dir):
+            directory.mkdir()
+
+        self.name = 'nursing_homes_Jan2024.zip'
+        self.digest = make_archive(self.mirror / self.name, {
+            'nursing_homes_Jan2024/NH_QualityMsr_MDS_Jan2024.csv': 'CMS Certification Number (CCN),Measure Code\n' * 2000,
+            'nursing_homes_Jan2024/NH_QualityMsr_Claims_Jan2024.csv': 'CMS Certification Number (CCN),Measure Code\n',
+        })
+        (self.mirror / 'SHA256SUMS').write_text(
+            f"{self.digest}  {self.name}\n{'0' * 64}  README.txt\n"
+        )
+
+        RangeRequestHandler.ranges = []
+        handler = partial(RangeRequestHandler, directory=str(self.mirror))
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def test_fetch_index_filters_by_pattern(self):
+        index = fetch_index(self.url, 'SHA256SUMS', 'nursing_homes_*.zip')
+        self.assertEqual(index, {self.name: self.digest})
+
+    def test_resumes_partial_download_with_range(self):
+        archive = (self.mirror / self.name).read_bytes()
+        half = len(archive) // 2
+        (self.download_dir / f"{self.name}.part").write_bytes(archive[:half])
+
+        path = download_archive(self.url, self.name, self.digest, self.download_dir)
+
+        self.assertEqual(path.read_bytes(), archive)
+        self.assertEqual(RangeRequestHandler.ranges, [f"bytes={half}-"])
+        self.assertFalse((self.download_dir / f"{self.name}.part").exists())
+
+    def test_complete_part_file_is_kept_on_416(self):
+        archive = (self.mirror / self.name).read_bytes()
+        (self.download_dir / f"{self.name}.part").write_bytes(archive)
+
+        path = download_archive(self.url, self.name, self.digest, self.download_dir)
+
+        self.assertEqual(path.read_bytes(), archive)
+        self.assertEqual(RangeRequestHandler.ranges, [f"bytes={len(archive)}-"])
+
+    def test_checksum_mismatch_discards_download(self):
+        wrong = hashlib.sha256(b'something else').hexdigest()
+
+        with self.assertRaises(ChecksumError) as raised:
+            download_archive(self.url, self.name, wrong, self.download_dir)
+
+        self.assertIn(self.digest, str(raised.exception))
+        self.assertIn(wrong, str(raised.exception))
+        self.assertEqual(list(self.download_dir.iterdir()), [])
+
+    def test_unpack_rejects_member_outside_target(self):
+        archive = self.download_dir / 'nursing_homes_Feb2024.zip'
+        make_archive(archive, {
+            'nursing_homes_Feb2024/NH_QualityMsr_MDS_Feb2024.csv': 'x\n',
+            '../../evil.txt': 'x\n',
+        })
+
+        with self.assertRaisesRegex(ValueError, 'unsafe member path'):
+            unpack_archive(archive, self.data_dir)
+
+        self.assertFalse((self.data_dir / 'nursing_homes_Feb2024').exists())
+        self.assertFalse((self.data_dir.parent / 'evil.txt').exists())
+
+    def test_sync_downloads_and_unpacks_once(self):
+        argv = ['sync_archives.py', '--mirror-url', self.url, '--data-dir', str(self.data_dir), '--no-ingest']
+        with mock.patch.object(sys, 'argv', argv):
+            self.assertEqual(sync_archives.main(), 0)
+            self.assertTrue((self.data_dir / 'nursing_homes_Jan2024' / 'nursing_homes_Jan2024'
+                             / 'NH_QualityMsr_MDS_Jan2024.csv').exists())
+            self.assertFalse((self.data_dir / sync_archives.DOWNLOAD_DIR / self.name).exists())
+
+            # The manifest records the archive, so a second run fetches nothing
+            RangeRequestHandler.ranges = []
+            self.assertEqual(sync_archives.main(), 0)
+        self.assertEqual(RangeRequestHandler.ranges, [None])
+
+
+if __name__ == '__main__':
+    unittest.main()
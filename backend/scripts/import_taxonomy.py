@@ -1,12 +1,30 @@
 #!/usr/bin/env python3
 """
 Import Contract Taxonomy and Naming Conventions into SQLite database
+
+Each workbook is opened once with openpyxl's streaming read-only reader, and
+every table is written with executemany inside a single transaction.
+
+By default every table is cleared and reinserted. With --sync, rows are
+matched on their natural key instead (facilities.facility_id, vendor
+canonical_name + raw_name, and name for categories, subcategories, document
+types and tags): only new rows are inserted, changed rows updated, and rows
+missing from the workbook soft-deleted (status = 0), so ids stay stable.
+
+Usage:
+    python import_taxonomy.py          # replace everything
+    python import_taxonomy.py --sync   # diff against the workbooks
+
+Requires openpyxl (pip install -r requirements.txt).
 """
 
+import argparse
 import sqlite3
-import pandas as pd
+import time
 import os
 
+from openpyxl import load_workbook
+
 # Paths
 DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'database.sqlite')
 TAXONOMY_FILE = '/Users/nikolashulewsky/Downloads/Contract_Taxonomy (2).xlsx'
@@ -132,166 +150,239 @@ def create_tables(conn):
     conn.commit()
     print("Tables created successfully!")
 
-def import_facilities(conn):
-    """Import facilities from Naming Conventions Excel"""
-    df = pd.read_excel(NAMING_FILE, sheet_name='Facilities')
-    cursor = conn.cursor()
-
-    # Clear existing data
-    cursor.execute('DELETE FROM facilities')
-
-    count = 0
-    for _, row in df.iterrows():
+def read_workbook(path, sheet_names):
+    """
+    Read the given sheets of a workbook in one pass: {sheet name: [row dict]}.
+    Rows are keyed by the header row; empty cells are None and blank rows
+    are kept (as None-only dicts) so row positions match the sheet.
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = {}
+        for sheet_name in sheet_names:
+            rows = workbook[sheet_name].iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else None for h in next(rows, ())]
+            records = [dict(zip(header, values)) for values in rows]
+            # Read-only sheets report trailing formatted-but-empty rows; drop them
+            while records and all(v is None for v in records[-1].values()):
+                records.pop()
+            sheets[sheet_name] = records
+        return sheets
+    finally:
+        workbook.close()
+
+def text(row, column, default=None):
+    """Stripped cell text, or default when the cell is empty"""
+    value = row.get(column)
+    return str(value).strip() if value is not None else default
+
+def is_blank(row):
+    return all(v is None for v in row.values())
+
+def build_rows(records, build, label):
+    """Turn sheet rows into insert tuples, reporting (and skipping) rows that fail to convert"""
+    rows = []
+    for idx, row in enumerate(records):
+        if is_blank(row):
+            continue
         try:
-            cursor.execute('''
-                INSERT INTO facilities (facility_id, facility_group, raw_name, name, short_name, line, legal_entity, address, city, state)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                str(row.get('Facilty ID', '')).strip() if pd.notna(row.get('Facilty ID')) else None,
-                str(row.get('Group', '')).strip() if pd.notna(row.get('Group')) else None,
-                str(row.get('Name on Raw Data', '')).strip() if pd.notna(row.get('Name on Raw Data')) else None,
-                str(row.get('New Name (or Folder)', '')).strip() if pd.notna(row.get('New Name (or Folder)')) else None,
-                str(row.get('Short_Name', '')).strip() if pd.notna(row.get('Short_Name')) else None,
-                str(row.get('Line', '')).strip() if pd.notna(row.get('Line')) else None,
-                str(row.get('Legal', '')).strip() if pd.notna(row.get('Legal')) else None,
-                str(row.get('Address', '')).strip() if pd.notna(row.get('Address')) else None,
-                str(row.get('City', '')).strip() if pd.notna(row.get('City')) else None,
-                str(row.get('State', '')).strip() if pd.notna(row.get('State')) else None,
-            ))
-            count += 1
+            rows.append(build(idx, row))
         except Exception as e:
-            print(f"Error importing facility row: {e}")
+            print(f"Error importing {label} row {idx}: {e}")
+    return rows
+
+def insert_rows(cursor, table, columns, rows):
+    """executemany INSERT OR IGNORE; rows violating a UNIQUE or NOT NULL constraint are skipped. Returns rows inserted"""
+    placeholders = ', '.join('?' for _ in columns)
+    cursor.executemany(
+        f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+        rows
+    )
+    inserted = cursor.rowcount
+    if inserted < len(rows):
+        print(f"Skipped {len(rows) - inserted} {table} rows with a duplicate key or a missing required value")
+    return inserted
+
+def sync_rows(cursor, table, key_columns, columns, rows, insert_only=()):
+    """
+    Diff rows against the table on key_columns: insert new keys, update
+    changed or soft-deleted rows, and soft-delete (status = 0) active rows
+    whose key is not in rows. insert_only columns are set on insert and never
+    compared. Returns counts per action
+    """
+    compared = [c for c in columns if c not in insert_only]
+    key_index = [columns.index(c) for c in key_columns]
+    compared_index = [columns.index(c) for c in compared]
+
+    cursor.execute(f"SELECT id, status, {', '.join(compared)} FROM {table} ORDER BY id")
+    existing = {}
+    deactivate = []
+    for row_id, status, *values in cursor.fetchall():
+        key = tuple(values[compared.index(c)] for c in key_columns)
+        if key in existing:
+            # Keys duplicated by earlier full imports: keep the oldest row
+            if status != 0:
+                deactivate.append((row_id,))
+            continue
+        existing[key] = (row_id, status, tuple(values))
+
+    inserts, updates, seen = [], [], set()
+    for row in rows:
+        key = tuple(row[i] for i in key_index)
+        if all(v is None for v in key) or key in seen:
+            continue
+        seen.add(key)
+        values = tuple(row[i] for i in compared_index)
+        if key not in existing:
+            inserts.append(row)
+            continue
+        row_id, status, current = existing[key]
+        if status != 1 or current != values:
+            updates.append(values + (row_id,))
+    deactivate += [(row_id,) for key, (row_id, status, _) in existing.items() if key not in seen and status != 0]
+    if len(seen) < len(rows):
+        print(f"Skipped {len(rows) - len(seen)} {table} rows with a duplicate or empty key")
+
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+        inserts
+    )
+    cursor.executemany(
+        f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in compared)}, status = 1, "
+        f"updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        updates
+    )
+    cursor.executemany(
+        f"UPDATE {table} SET status = 0, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        deactivate
+    )
+    return {
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'deactivated': len(deactivate),
+        'unchanged': len(seen) - len(inserts) - len(updates),
+    }
 
-    conn.commit()
-    print(f"Imported {count} facilities")
-
-def import_functional_categories(conn):
-    """Import functional categories from Contract Taxonomy Excel"""
-    df = pd.read_excel(TAXONOMY_FILE, sheet_name='Functional Categories')
-    cursor = conn.cursor()
+def write_rows(cursor, table, key_columns, columns, rows, sync, insert_only=()):
+    """Replace the table with rows, or with sync=True diff them in on key_columns. Returns counts per action"""
+    if sync:
+        return sync_rows(cursor, table, key_columns, columns, rows, insert_only)
 
     # Clear existing data
-    cursor.execute('DELETE FROM functional_categories')
-
-    count = 0
-    for _, row in df.iterrows():
-        try:
-            cursor.execute('''
-                INSERT INTO functional_categories (name, description, example_subcategories, sort_order)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                str(row.get('Functional Category', '')).strip(),
-                str(row.get('Description', '')).strip() if pd.notna(row.get('Description')) else None,
-                str(row.get('Example Subcategories', '')).strip() if pd.notna(row.get('Example Subcategories')) else None,
-                int(row.get('#', count + 1)),
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Error importing category row: {e}")
+    cursor.execute(f'DELETE FROM {table}')
+    return {'inserted': insert_rows(cursor, table, columns, rows)}
 
-    conn.commit()
-    print(f"Imported {count} functional categories")
+def import_facilities(conn, records, sync=False):
+    """Import facilities from the Naming Conventions 'Facilities' sheet"""
+    cursor = conn.cursor()
 
-def import_service_subcategories(conn):
-    """Import service subcategories from Contract Taxonomy Excel"""
-    df = pd.read_excel(TAXONOMY_FILE, sheet_name='Service Subcategories')
+    rows = build_rows(records, lambda idx, row: (
+        text(row, 'Facilty ID'),
+        text(row, 'Group'),
+        text(row, 'Name on Raw Data'),
+        text(row, 'New Name (or Folder)'),
+        text(row, 'Short_Name'),
+        text(row, 'Line'),
+        text(row, 'Legal'),
+        text(row, 'Address'),
+        text(row, 'City'),
+        text(row, 'State'),
+    ), 'facility')
+    return write_rows(cursor, 'facilities', ['facility_id'], [
+        'facility_id', 'facility_group', 'raw_name', 'name', 'short_name',
+        'line', 'legal_entity', 'address', 'city', 'state',
+    ], rows, sync)
+
+def sort_order(row, idx):
+    """'#' column, or the 1-based row position when the sheet has no '#' column"""
+    return int(row['#']) if '#' in row else idx + 1
+
+def import_functional_categories(conn, records, sync=False):
+    """Import functional categories from the Contract Taxonomy 'Functional Categories' sheet"""
     cursor = conn.cursor()
 
-    # Clear existing data
-    cursor.execute('DELETE FROM service_subcategories')
+    rows = build_rows(records, lambda idx, row: (
+        text(row, 'Functional Category', ''),
+        text(row, 'Description'),
+        text(row, 'Example Subcategories'),
+        sort_order(row, idx),
+    ), 'category')
+    return write_rows(cursor, 'functional_categories', ['name'], [
+        'name', 'description', 'example_subcategories', 'sort_order',
+    ], rows, sync)
+
+def import_service_subcategories(conn, records, sync=False):
+    """Import service subcategories from the Contract Taxonomy 'Service Subcategories' sheet"""
+    cursor = conn.cursor()
 
     # Get category ID mapping
     cursor.execute('SELECT id, name FROM functional_categories')
     category_map = {row[1]: row[0] for row in cursor.fetchall()}
 
-    count = 0
-    for _, row in df.iterrows():
-        try:
-            category_name = str(row.get('Functional Category', '')).strip()
-            category_id = category_map.get(category_name)
-
-            cursor.execute('''
-                INSERT INTO service_subcategories (functional_category_id, name, department, sort_order)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                category_id,
-                str(row.get('Service Subcategory', '')).strip(),
-                str(row.get('Department', '')).strip() if pd.notna(row.get('Department')) else None,
-                int(row.get('#', count + 1)),
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Error importing subcategory row: {e}")
-
-    conn.commit()
-    print(f"Imported {count} service subcategories")
-
-def import_document_types(conn):
-    """Import document types from Contract Taxonomy Excel"""
-    df = pd.read_excel(TAXONOMY_FILE, sheet_name='Document Types')
+    rows = build_rows(records, lambda idx, row: (
+        category_map.get(text(row, 'Functional Category', '')),
+        text(row, 'Service Subcategory', ''),
+        text(row, 'Department'),
+        sort_order(row, idx),
+    ), 'subcategory')
+    return write_rows(cursor, 'service_subcategories', ['name'], [
+        'functional_category_id', 'name', 'department', 'sort_order',
+    ], rows, sync)
+
+def import_document_types(conn, records, sync=False):
+    """Import document types from the Contract Taxonomy 'Document Types' sheet"""
     cursor = conn.cursor()
 
-    # Clear existing data
-    cursor.execute('DELETE FROM document_types')
-
-    count = 0
-    for _, row in df.iterrows():
-        try:
-            cursor.execute('''
-                INSERT INTO document_types (name, primary_category, description, sort_order)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                str(row.get('Document Type', '')).strip(),
-                str(row.get('Category', '')).strip() if pd.notna(row.get('Category')) else None,
-                str(row.get('Description', '')).strip() if pd.notna(row.get('Description')) else None,
-                int(row.get('#', count + 1)),
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Error importing document type row: {e}")
-
-    conn.commit()
-    print(f"Imported {count} document types")
-
-def import_vendors(conn):
-    """Import vendors from Naming Conventions Excel"""
-    df = pd.read_excel(NAMING_FILE, sheet_name='Vendors')
+    rows = build_rows(records, lambda idx, row: (
+        text(row, 'Document Type', ''),
+        text(row, 'Category'),
+        text(row, 'Description'),
+        sort_order(row, idx),
+    ), 'document type')
+    return write_rows(cursor, 'document_types', ['name'], [
+        'name', 'primary_category', 'description', 'sort_order',
+    ], rows, sync)
+
+def import_vendors(conn, records, sync=False):
+    """Import vendors from the Naming Conventions 'Vendors' sheet"""
     cursor = conn.cursor()
 
-    # Clear existing data
-    cursor.execute('DELETE FROM vendors')
-
-    count = 0
-    for idx, row in df.iterrows():
-        try:
-            # Generate vendor ID
-            vendor_id = f"VND-{str(idx + 1).zfill(4)}"
-
-            cursor.execute('''
-                INSERT INTO vendors (vendor_id, raw_name, canonical_name, vendor_type, cleaned_type, notes)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                vendor_id,
-                str(row.get('Vendor Name', '')).strip() if pd.notna(row.get('Vendor Name')) else None,
-                str(row.get('Cleaned Vendor', '')).strip() if pd.notna(row.get('Cleaned Vendor')) else str(row.get('Vendor Name', '')).strip(),
-                str(row.get('Type/Specialty', '')).strip() if pd.notna(row.get('Type/Specialty')) else None,
-                str(row.get('Cleaned Type', '')).strip() if pd.notna(row.get('Cleaned Type')) else None,
-                str(row.get('Notes', '')).strip() if pd.notna(row.get('Notes')) else None,
-            ))
-            count += 1
-        except Exception as e:
-            print(f"Error importing vendor row {idx}: {e}")
-
-    conn.commit()
-    print(f"Imported {count} vendors")
-
-def create_document_tags(conn):
-    """Create initial document tags based on document type categories"""
+    rows = build_rows(records, lambda idx, row: (
+        # Vendor ID from the sheet row position
+        f"VND-{str(idx + 1).zfill(4)}",
+        text(row, 'Vendor Name'),
+        text(row, 'Cleaned Vendor', text(row, 'Vendor Name', '')),
+        text(row, 'Type/Specialty'),
+        text(row, 'Cleaned Type'),
+        text(row, 'Notes'),
+    ), 'vendor')
+
+    if sync:
+        # Matched vendors keep their vendor ID; new ones continue the numbering
+        cursor.execute('SELECT canonical_name, raw_name, vendor_id FROM vendors ORDER BY id')
+        vendor_ids = {}
+        for canonical_name, raw_name, vendor_id in cursor.fetchall():
+            vendor_ids.setdefault((canonical_name, raw_name), vendor_id)
+        next_number = max((int(v[4:]) for v in vendor_ids.values() if v and v[4:].isdigit()), default=0) + 1
+        for i, row in enumerate(rows):
+            key = (row[2], row[1])
+            if key not in vendor_ids:
+                vendor_ids[key] = f"VND-{str(next_number).zfill(4)}"
+                next_number += 1
+            rows[i] = (vendor_ids[key],) + row[1:]
+
+    # A canonical vendor has one row per raw name it was recorded under
+    return write_rows(cursor, 'vendors', ['canonical_name', 'raw_name'], [
+        'vendor_id', 'raw_name', 'canonical_name', 'vendor_type', 'cleaned_type', 'notes',
+    ], rows, sync, insert_only=['vendor_id'])
+
+def create_document_tags(conn, sync=False):
+    """Create initial document tags and assign them to document types by category and name"""
     cursor = conn.cursor()
 
-    # Clear existing data
-    cursor.execute('DELETE FROM document_type_tag_assignments')
-    cursor.execute('DELETE FROM document_tags')
+    if not sync:
+        # Clear existing data
+        cursor.execute('DELETE FROM document_type_tag_assignments')
 
     # Define tags with groups
     tags = [
@@ -330,19 +421,7 @@ def create_document_tags(conn):
         ('Auto-Renewal', 'Priority', 'Has auto-renewal clause'),
     ]
 
-    count = 0
-    for name, group, description in tags:
-        try:
-            cursor.execute('''
-                INSERT INTO document_tags (name, tag_group, description)
-                VALUES (?, ?, ?)
-            ''', (name, group, description))
-            count += 1
-        except Exception as e:
-            print(f"Error creating tag {name}: {e}")
-
-    conn.commit()
-    print(f"Created {count} document tags")
+    tag_counts = write_rows(cursor, 'document_tags', ['name'], ['name', 'tag_group', 'description'], tags, sync)
 
     # Now create default tag assignments for document types
     # Map document type categories to relevant tags
@@ -357,13 +436,13 @@ def create_document_tags(conn):
     }
 
     # Get document types and tags
-    cursor.execute('SELECT id, name, primary_category FROM document_types')
+    cursor.execute('SELECT id, name, primary_category FROM document_types WHERE status = 1')
     doc_types = cursor.fetchall()
 
-    cursor.execute('SELECT id, name FROM document_tags')
+    cursor.execute('SELECT id, name FROM document_tags WHERE status = 1')
     tag_map = {row[1]: row[0] for row in cursor.fetchall()}
 
-    assignment_count = 0
+    assignments = []
     for doc_id, doc_name, category in doc_types:
         tags_to_assign = category_tag_mapping.get(category, [])
 
@@ -389,19 +468,36 @@ def create_document_tags(conn):
         for tag_name in tags_to_assign:
             tag_id = tag_map.get(tag_name)
             if tag_id:
-                try:
-                    cursor.execute('''
-                        INSERT OR IGNORE INTO document_type_tag_assignments (document_type_id, tag_id)
-                        VALUES (?, ?)
-                    ''', (doc_id, tag_id))
-                    assignment_count += 1
-                except Exception as e:
-                    pass
-
-    conn.commit()
-    print(f"Created {assignment_count} tag assignments")
+                assignments.append((doc_id, tag_id))
+
+    assignments = set(assignments)
+    removed = set()
+    if sync:
+        cursor.execute('SELECT document_type_id, tag_id FROM document_type_tag_assignments')
+        current = set(cursor.fetchall())
+        removed = current - assignments
+        assignments -= current
+        # Assignments have no status; stale ones are deleted
+        cursor.executemany('''
+            DELETE FROM document_type_tag_assignments WHERE document_type_id = ? AND tag_id = ?
+        ''', sorted(removed))
+
+    cursor.executemany('''
+        INSERT OR IGNORE INTO document_type_tag_assignments (document_type_id, tag_id)
+        VALUES (?, ?)
+    ''', sorted(assignments))
+    return tag_counts, {'inserted': cursor.rowcount, **({'deleted': len(removed)} if sync else {})}
+
+def describe(counts):
+    """'3 inserted, 1 updated, ...' from a write_rows result"""
+    return ', '.join(f"{n} {action}" for action, n in counts.items())
 
 def main():
+    parser = argparse.ArgumentParser(description='Import the contract taxonomy and naming conventions workbooks')
+    parser.add_argument('--sync', action='store_true',
+                        help='Diff against existing rows on natural keys (stable ids, soft deletes) instead of replacing them')
+    args = parser.parse_args()
+
     print(f"Connecting to database: {DB_PATH}")
     conn = sqlite3.connect(DB_PATH)
 
@@ -409,23 +505,35 @@ def main():
         print("\n1. Creating tables...")
         create_tables(conn)
 
-        print("\n2. Importing facilities...")
-        import_facilities(conn)
-
-        print("\n3. Importing functional categories...")
-        import_functional_categories(conn)
-
-        print("\n4. Importing service subcategories...")
-        import_service_subcategories(conn)
-
-        print("\n5. Importing document types...")
-        import_document_types(conn)
-
-        print("\n6. Importing vendors...")
-        import_vendors(conn)
-
-        print("\n7. Creating document tags...")
-        create_document_tags(conn)
+        print("\n2. Reading workbooks...")
+        start = time.perf_counter()
+        naming = read_workbook(NAMING_FILE, ['Facilities', 'Vendors'])
+        taxonomy = read_workbook(TAXONOMY_FILE, ['Functional Categories', 'Service Subcategories', 'Document Types'])
+        print(f"Read {NAMING_FILE} and {TAXONOMY_FILE} ({time.perf_counter() - start:.2f}s)")
+
+        # Every table is written in one transaction: a failed import leaves the database as it was
+        steps = [
+            ('facilities', lambda: import_facilities(conn, naming['Facilities'], args.sync)),
+            ('functional categories', lambda: import_functional_categories(conn, taxonomy['Functional Categories'], args.sync)),
+            ('service subcategories', lambda: import_service_subcategories(conn, taxonomy['Service Subcategories'], args.sync)),
+            ('document types', lambda: import_document_types(conn, taxonomy['Document Types'], args.sync)),
+            ('vendors', lambda: import_vendors(conn, naming['Vendors'], args.sync)),
+        ]
+        for step, (label, run) in enumerate(steps, start=3):
+            print(f"\n{step}. {'Syncing' if args.sync else 'Importing'} {label}...")
+            start = time.perf_counter()
+            counts = run()
+            print(f"{label.capitalize()}: {describe(counts)} ({time.perf_counter() - start:.3f}s)")
+
+        print(f"\n{len(steps) + 3}. Creating document tags...")
+        start = time.perf_counter()
+        tag_counts, assignment_counts = create_document_tags(conn, args.sync)
+        print(f"Document tags: {describe(tag_counts)}; tag assignments: {describe(assignment_counts)} "
+              f"({time.perf_counter() - start:.3f}s)")
+
+        start = time.perf_counter()
+        conn.commit()
+        print(f"Committed ({time.perf_counter() - start:.3f}s)")
 
         print("\n" + "=" * 50)
         print("IMPORT COMPLETE!")
@@ -435,10 +543,13 @@ def main():
         cursor = conn.cursor()
         tables = ['facilities', 'functional_categories', 'service_subcategories', 'document_types', 'document_tags', 'vendors']
         for table in tables:
-            cursor.execute(f'SELECT COUNT(*) FROM {table}')
-            count = cursor.fetchone()[0]
-            print(f"  {table}: {count} rows")
+            cursor.execute(f'SELECT COUNT(*), COALESCE(SUM(status = 1), 0) FROM {table}')
+            count, active = cursor.fetchone()
+            print(f"  {table}: {count} rows ({active} active)")
 
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         conn.close()
 